@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.categories import tree
+from apps.categories.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Category.path (ruta materializada) para todo el árbol.'
+
+    def handle(self, *args, **options):
+        categories = {
+            category.pk: category
+            for category in Category.objects.only('id', 'parent_id', 'path')
+        }
+
+        def path_of(category):
+            if category.parent_id is None:
+                return f'{category.pk}/'
+            return f'{path_of(categories[category.parent_id])}{category.pk}/'
+
+        changed = []
+        for category in categories.values():
+            path = path_of(category)
+            if category.path != path:
+                category.path = path
+                changed.append(category)
+        Category.objects.bulk_update(changed, ['path'], batch_size=500)
+        # bulk_update no emite signals
+        tree.invalidate()
+        self.stdout.write(self.style.SUCCESS(f'{len(changed)} categorías actualizadas'))
@@ -1,8 +1,11 @@
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.text import slugify
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from apps.common.slugs import UniqueSlugMixin
 
 
-class Category(models.Model):
+class Category(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField(blank=True)
@@ -10,6 +13,9 @@ class Category(models.Model):
                             help_text='Nombre del ícono (ej: lucide icon name)')
     parent = models.ForeignKey('self', on_delete=models.CASCADE,
                                null=True, blank=True, related_name='children')
+    path = models.CharField(max_length=255, blank=True, db_index=True,
+                            editable=False,
+                            help_text='Ruta materializada de ids: "1/5/12/"')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -17,16 +23,31 @@ class Category(models.Model):
         ordering = ['name']
         verbose_name_plural = 'categories'
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.name
 
-
-class Tag(models.Model):
+    def save(self, *args, **kwargs):
+        parent_path = self.parent.path if self.parent_id else ''
+        if self.path and parent_path.startswith(self.path):
+            raise ValidationError('Una categoría no puede colgar de sí misma ni de sus hijas')
+        super().save(*args, **kwargs)
+        self._move_subtree(f'{parent_path}{self.pk}/')
+
+    def _move_subtree(self, path):
+        """Actualiza ``path`` propio y de los descendientes en un solo UPDATE."""
+        old_path = self.path
+        if path == old_path:
+            return
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+            )
+        else:
+            Category.objects.filter(pk=self.pk).update(path=path)
+        self.path = path
+
+
+class Tag(UniqueSlugMixin, models.Model):
     name = models.CharField(max_length=50, unique=True)
     slug = models.SlugField(max_length=50, unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -35,10 +56,5 @@ class Tag(models.Model):
         db_table = 'tags'
         ordering = ['name']
 
-    def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.name
\ No newline at end of file
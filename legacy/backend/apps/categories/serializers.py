@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Category, Tag
+from .tree import get_tree
 
 class CategorySerializer(serializers.ModelSerializer):
     property_count = serializers.IntegerField(read_only=True)
@@ -11,9 +12,18 @@ class CategorySerializer(serializers.ModelSerializer):
                   'parent', 'children', 'property_count', 'created_at']
     
     def get_children(self, obj):
-        if obj.children.exists():
-            return CategorySerializer(obj.children.all(), many=True).data
+        # Nodos de tree.annotated() traen sus hijas; si no, del árbol cacheado
+        children = getattr(obj, 'tree_children', None)
+        if children is None:
+            children = get_tree().children(obj.pk)
+        if children:
+            return CategorySerializer(children, many=True).data
         return None
+    
+    def validate_parent(self, value):
+        if value and self.instance and value.pk in get_tree().descendant_ids(self.instance.pk):
+            raise serializers.ValidationError('No puede colgar de sí misma ni de sus hijas')
+        return value
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
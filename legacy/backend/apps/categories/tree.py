@@ -0,0 +1,95 @@
+"""Árbol de categorías armado en memoria.
+
+Una sola query trae todas las categorías con el conteo de propiedades
+publicadas directamente en cada una; el árbol (hijas por padre) y los
+conteos acumulados del subárbol se arman en Python. Para filtrar en la base
+por subárbol se usa ``Category.path`` (``category__path__startswith``). El
+resultado se guarda en el caché de feeds con una etiqueta versionada que se
+invalida al cambiar una categoría o el estado/categoría de una propiedad.
+"""
+import copy
+from collections import defaultdict
+
+from django.db.models import Count, Q
+
+from apps.properties import cache
+
+CACHE_KEY = 'categories:tree'
+TREE_TAG = cache.CATEGORY_TREE_TAG
+
+
+class CategoryTree:
+
+    def __init__(self, categories):
+        self.nodes = {category.pk: category for category in categories}
+        self.by_slug = {category.slug: category for category in categories}
+        self._children = defaultdict(list)
+        for category in sorted(categories, key=lambda c: c.name):
+            self._children[category.parent_id].append(category)
+        self.counts = {}
+        for root in self.roots():
+            self._count(root)
+
+    def _count(self, category):
+        self.counts[category.pk] = category.published_count + sum(
+            self._count(child) for child in self.children(category.pk)
+        )
+        return self.counts[category.pk]
+
+    def roots(self):
+        return self._children[None]
+
+    def children(self, pk):
+        return self._children.get(pk, [])
+
+    def get(self, value):
+        """Categoría por slug o id (``None`` si no existe)."""
+        if value in self.by_slug:
+            return self.by_slug[value]
+        try:
+            return self.nodes.get(int(value))
+        except (TypeError, ValueError):
+            return None
+
+    def descendant_ids(self, pk):
+        """Id de la categoría y de todo su subárbol."""
+        ids = [pk]
+        for child in self.children(pk):
+            ids += self.descendant_ids(child.pk)
+        return ids
+
+    def annotated(self, categories):
+        """Copias con ``property_count`` (subárbol) y ``tree_children`` armados."""
+        result = []
+        for category in categories:
+            node = copy.copy(self.nodes.get(category.pk, category))
+            node.property_count = self.counts.get(category.pk, 0)
+            node.tree_children = self.annotated(self.children(category.pk))
+            result.append(node)
+        return result
+
+
+def build():
+    from .models import Category
+
+    categories = list(Category.objects.annotate(
+        published_count=Count('properties', filter=Q(properties__status='published')),
+    ).order_by())
+    return CategoryTree(categories)
+
+
+def get_tree():
+    store = cache.get_cache()
+    entry = store.get(CACHE_KEY)
+    if entry is not None and cache.get_versions([TREE_TAG]) == entry['versions']:
+        return entry['tree']
+    # Versión antes de consultar: un cambio concurrente deja la entrada vieja
+    versions = cache.get_versions([TREE_TAG])
+    tree = build()
+    store.set(CACHE_KEY, {'versions': versions, 'tree': tree})
+    return tree
+
+
+def invalidate():
+    # También invalida las páginas con categorías (``cache.dependency_tags``)
+    cache.invalidate([TREE_TAG])
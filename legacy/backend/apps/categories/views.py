@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, AllowAny
 from .models import Category, Tag
 from .serializers import CategorySerializer, TagSerializer
+from .tree import get_tree
 
 
 class ReadOnlyOrAdmin(AllowAny):
@@ -20,12 +21,31 @@ class CategoryViewSet(viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [ReadOnlyOrAdmin]
     lookup_field = 'slug'
+    query_budget = {'list': 1, 'retrieve': 2, 'all': 1}
+
+    # Lecturas desde el árbol en memoria: 0 queries con el árbol cacheado,
+    # 1 para armarlo. property_count = publicadas en todo el subárbol.
+
+    def list(self, request, *args, **kwargs):
+        tree = get_tree()
+        page = self.paginate_queryset(tree.annotated(tree.roots()))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        node = get_tree().by_slug.get(kwargs[self.lookup_field])
+        if node is None or node.parent_id is not None:
+            # Como el queryset: el detalle es solo de categorías raíz
+            return super().retrieve(request, *args, **kwargs)
+        serializer = self.get_serializer(get_tree().annotated([node])[0])
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def all(self, request):
         """Todas las categorías (incluyendo hijas)."""
-        categories = Category.objects.all()
-        serializer = self.get_serializer(categories, many=True)
+        tree = get_tree()
+        categories = sorted(tree.nodes.values(), key=lambda category: category.name)
+        serializer = self.get_serializer(tree.annotated(categories), many=True)
         return Response(serializer.data)
 
 
@@ -0,0 +1,46 @@
+"""Queries independientes en paralelo desde vistas async.
+
+El ORM async de Django (``aget``, ``acount``, ``aaggregate``...) corre cada
+query con ``sync_to_async`` en el hilo del request, así que dos ``await``
+dentro de un ``asyncio.gather`` igual se ejecutan una tras otra.
+``gather(*calls)`` corre cada callable (código ORM síncrono) en un hilo
+propio, con su propia conexión, y devuelve los resultados en orden.
+
+Dentro de una transacción (``ATOMIC_REQUESTS``, tests) las otras conexiones
+no verían lo no confirmado: ahí los callables corren en serie en el hilo del
+request.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from . import querybudget
+
+
+def in_transaction():
+    return any(
+        connection.in_atomic_block
+        for connection in connections.all(initialized_only=True)
+    )
+
+
+def _isolated(call):
+    def run():
+        # Igual que un request: conexiones de este hilo según CONN_MAX_AGE
+        close_old_connections()
+        try:
+            with querybudget.attach():
+                return call()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather(*calls):
+    """``[call() for call in calls]``, en paralelo cuando se puede."""
+    if len(calls) < 2 or await sync_to_async(in_transaction)():
+        return [await sync_to_async(call)() for call in calls]
+    return list(await asyncio.gather(*(
+        sync_to_async(_isolated(call), thread_sensitive=False)() for call in calls
+    )))
@@ -0,0 +1,214 @@
+"""Lecturas en réplicas con "read-your-writes".
+
+``PrimaryReplicaRouter`` manda a una réplica las lecturas de los modelos de
+``DATABASE_REPLICAS['APPS']`` (propiedades, categorías, usuarios) y todo lo
+demás (escrituras, otras apps, migraciones) al primario (``default``). Por
+defecto todo va al primario: solo ``ReplicaRoutingMiddleware`` habilita las
+réplicas, y solo en requests seguros (GET/HEAD/OPTIONS).
+
+Vuelven al primario:
+
+* el resto del request, en cuanto escribe algo (``db_for_write``);
+* las lecturas dentro de una transacción abierta en el primario;
+* un cliente que escribió en los últimos ``STICKY_SECONDS``. La marca va
+  en el caché ``CACHE`` (``feeds``: Redis/Memcached en producción), que
+  tiene que ser compartido entre workers para que la vea el siguiente
+  request. El cliente es el usuario del JWT (id del token firmado, sin
+  tocar la base: todos sus tokens y dispositivos), la sesión o IP + user
+  agent; se decide antes de autenticar;
+* una réplica que no conecta, durante ``RETRY_SECONDS``.
+
+Las conexiones son persistentes (``CONN_MAX_AGE``) y se verifican al
+reusarse (``CONN_HEALTH_CHECKS``). Para probar en local basta declarar otra
+base como réplica (``DB_REPLICAS=localhost:5433`` o ``localhost/otra_db``;
+con SQLite, un segundo alias apuntando a una copia del archivo).
+"""
+import contextvars
+import hashlib
+import itertools
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'APPS': ['properties', 'categories', 'users'],
+    'STICKY_SECONDS': 5,
+    'RETRY_SECONDS': 30,
+    'CACHE': 'feeds',  # marcas de escritura reciente; compartido entre workers
+}
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Estado por request (se copia a los hilos de sync_to_async)
+_use_replicas = contextvars.ContextVar('use_replicas', default=False)
+_wrote = contextvars.ContextVar('wrote', default=None)
+
+_down = {}  # alias -> monotonic hasta el que no se reintenta
+_down_lock = threading.Lock()
+_cycle = itertools.count()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'DATABASE_REPLICAS', {})}
+
+
+def get_cache():
+    return caches[get_config()['CACHE']]
+
+
+def token_user_id(request):
+    """Id de usuario de un access token válido en ``Authorization`` (sin query)."""
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) != 2 or parts[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(parts[1]).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def client_key(request):
+    """Cliente para la marca de escritura reciente (sin autenticar todavía)."""
+    user_id = token_user_id(request)
+    if user_id is not None:
+        return f'primary:user:{user_id}'
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    identity = f'session:{session}' if session else '|'.join((
+        request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip()
+        or request.META.get('REMOTE_ADDR', ''),
+        request.META.get('HTTP_USER_AGENT', ''),
+    ))
+    digest = hashlib.blake2b(identity.encode(), digest_size=12).hexdigest()
+    return f'primary:{digest}'
+
+
+def in_transaction(connection):
+    # Como atomic(durable=True): no cuenta la transacción que TestCase abre por test
+    return any(not block._from_testcase for block in connection.atomic_blocks)
+
+
+def available(alias):
+    """La réplica conecta (o ya estaba conectada); si no, se saltea un rato."""
+    with _down_lock:
+        if _down.get(alias, 0) > time.monotonic():
+            return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError as exc:
+        logger.warning('Réplica %s no disponible: %s', alias, exc)
+        with _down_lock:
+            _down[alias] = time.monotonic() + get_config()['RETRY_SECONDS']
+        return False
+    return True
+
+
+def reset():
+    """Olvida las réplicas marcadas como caídas."""
+    with _down_lock:
+        _down.clear()
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        config = get_config()
+        if (not config['REPLICAS'] or not _use_replicas.get()
+                or model._meta.app_label not in config['APPS']
+                or in_transaction(connections[DEFAULT_DB_ALIAS])):
+            return None  # primario (o la base de la instancia de los hints)
+        replicas = config['REPLICAS']
+        # Round-robin desde una posición distinta en cada lectura
+        start = next(_cycle)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if available(alias):
+                return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Lo que sigue del request lee lo recién escrito
+        _use_replicas.set(False)
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote.append(model)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_config()['REPLICAS']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return db not in get_config()['REPLICAS']
+
+
+class ReplicaRoutingMiddleware:
+    """Habilita las réplicas en requests seguros y marca a quien escribe."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        config = get_config()
+        if (config['REPLICAS']
+                and settings.CACHES[config['CACHE']]['BACKEND'] in LOCAL_CACHE_BACKENDS):
+            logger.warning('DATABASE_REPLICAS["CACHE"] (%s) es local del proceso: con varios '
+                           'workers un cliente puede leer de una réplica justo después '
+                           'de escribir', config['CACHE'])
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['REPLICAS']:
+            return self.get_response(request)
+        key = client_key(request)
+        use_replicas = request.method in SAFE_METHODS and not get_cache().get(key)
+        wrote = []
+        tokens = (_use_replicas.set(use_replicas), _wrote.set(wrote))
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replicas.reset(tokens[0])
+            _wrote.reset(tokens[1])
+        if wrote:
+            get_cache().set(key, True, config['STICKY_SECONDS'])
+        return response
+
+    async def __acall__(self, request):
+        # Las variables de contexto pasan a los hilos de sync_to_async y
+        # vuelven con lo que cambió db_for_write
+        config = get_config()
+        if not config['REPLICAS']:
+            return await self.get_response(request)
+        key = client_key(request)
+        use_replicas = request.method in SAFE_METHODS and not await get_cache().aget(key)
+        wrote = []
+        tokens = (_use_replicas.set(use_replicas), _wrote.set(wrote))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replicas.reset(tokens[0])
+            _wrote.reset(tokens[1])
+        if wrote:
+            await get_cache().aset(key, True, config['STICKY_SECONDS'])
+        return response
@@ -0,0 +1,342 @@
+"""Derivados de imágenes (thumbnail, card, full en WebP y JPEG).
+
+Los modelos declaran qué campos procesar y dónde guardar el resultado::
+
+    image_sources = ('featured_image', 'gallery')   # ImageField o lista de URLs
+    # image_variants = JSONField(...)
+
+Flujo:
+
+* ``dedupe_upload`` (pre_save) guarda los originales subidos con nombre por
+  hash de contenido (``<prefijo>/ab/abcd….jpg``); si ya existe no se vuelve a
+  escribir.
+* ``schedule`` (post_save, al confirmar la transacción) manda
+  ``process(label, pk)`` a un pool de procesos; nada de Pillow corre en el
+  request. Sin ``IMAGE_DERIVATIVES['ASYNC']`` se procesa en línea.
+* ``process`` genera los derivados de cada fuente y guarda en
+  ``image_variants``::
+
+      {'featured_image': {'source': ..., 'hash': ..., 'thumbnail': {'webp': url, 'jpeg': url}, ...},
+       'gallery': [{...}, ...]}
+
+  Los derivados viven en ``derivatives/<hash>/``: un original repetido (mismo
+  contenido) no se vuelve a procesar. Al terminar, el proceso que encoló
+  (no el del pool) emite ``variants_ready``: las invalidaciones de caché
+  tienen que correr donde se sirven las respuestas.
+
+Las fuentes son nombres del storage o URLs bajo ``MEDIA_URL``; una URL
+http(s) externa solo si su host está en ``IMAGE_DERIVATIVES['ALLOWED_HOSTS']``
+y resuelve a direcciones públicas (las fuentes las cargan los agentes).
+"""
+import functools
+import hashlib
+import io
+import ipaddress
+import logging
+import multiprocessing
+import os
+import posixpath
+import socket
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Caja máxima por variante (nunca se agranda el original)
+VARIANTS = {
+    'thumbnail': (320, 240),
+    'card': (640, 480),
+    'full': (1600, 1200),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVES_DIR = 'derivatives'
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 10
+DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    # Hosts externos de los que se pueden bajar originales
+    'ALLOWED_HOSTS': [],
+}
+# Lo que queda en ``image_variants`` (y ve el cliente) cuando una fuente falla
+SOURCE_ERROR = 'No se pudo procesar la imagen'
+
+# sender=modelo, pk=id de la instancia procesada
+variants_ready = Signal()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'IMAGE_DERIVATIVES', {})}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# --- Originales ---
+
+def dedupe_upload(field_file, prefix):
+    """Guarda un archivo recién subido con nombre por hash; reusa el existente."""
+    if not field_file or field_file._committed:
+        return
+    field_file.seek(0)
+    data = field_file.read()
+    digest = content_hash(data)
+    ext = posixpath.splitext(field_file.name)[1].lower()
+    name = f'{prefix}/{digest[:2]}/{digest}{ext}'
+    if not field_file.storage.exists(name):
+        # Directo al storage: FieldFile.save() volvería a anteponer upload_to
+        name = field_file.storage.save(name, ContentFile(data))
+    field_file.name = name
+    field_file._committed = True
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Una redirección podría llevar a un host no permitido
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def check_remote_source(url):
+    """Rechaza URLs fuera de ``ALLOWED_HOSTS`` o que resuelven a direcciones internas."""
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host not in {allowed.lower() for allowed in get_config()['ALLOWED_HOSTS']}:
+        raise ValueError(f'Host no permitido: {host!r}')
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    for *_, sockaddr in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP):
+        address = ipaddress.ip_address(sockaddr[0])
+        if not address.is_global:
+            raise ValueError(f'{host!r} resuelve a una dirección no pública: {address}')
+
+
+def read_source(source, storage=default_storage):
+    """Bytes de un nombre de storage, una URL bajo MEDIA_URL o una URL permitida."""
+    if settings.MEDIA_URL and source.startswith(settings.MEDIA_URL):
+        source = source[len(settings.MEDIA_URL):]
+    elif source.startswith(('http://', 'https://')):
+        check_remote_source(source)
+        with _opener.open(source, timeout=DOWNLOAD_TIMEOUT) as response:
+            data = response.read(MAX_DOWNLOAD_BYTES + 1)
+        if len(data) > MAX_DOWNLOAD_BYTES:
+            raise ValueError(f'Imagen demasiado grande: {source}')
+        return data
+    elif '://' in source:
+        raise ValueError(f'Esquema no permitido: {source}')
+    with storage.open(source, 'rb') as fh:
+        return fh.read()
+
+
+# --- Derivados ---
+
+def render(data):
+    """``{variante: {formato: bytes}}`` de una imagen."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        rendered = {}
+        for variant, size in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.Resampling.LANCZOS)
+            rendered[variant] = {}
+            for fmt, (pil_format, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                rendered[variant][fmt] = buffer.getvalue()
+    return rendered
+
+
+def variant_name(digest, variant, fmt):
+    return f'{DERIVATIVES_DIR}/{digest[:2]}/{digest}/{variant}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def derive(source, storage=default_storage):
+    """Entrada de ``image_variants`` para una fuente (renderiza solo si hace falta)."""
+    data = read_source(source, storage)
+    digest = content_hash(data)
+    names = {variant: {fmt: variant_name(digest, variant, fmt) for fmt in FORMATS}
+             for variant in VARIANTS}
+    if not all(storage.exists(name) for formats in names.values() for name in formats.values()):
+        for variant, formats in render(data).items():
+            for fmt, content in formats.items():
+                if not storage.exists(names[variant][fmt]):
+                    storage.save(names[variant][fmt], ContentFile(content))
+    entry = {'source': source, 'hash': digest}
+    for variant, formats in names.items():
+        entry[variant] = {fmt: storage.url(name) for fmt, name in formats.items()}
+    return entry
+
+
+def current_sources(instance):
+    """``{campo: fuente o lista de fuentes}`` según ``image_sources``."""
+    sources = {}
+    for field in instance.image_sources:
+        value = getattr(instance, field)
+        if isinstance(value, (list, tuple)):
+            sources[field] = [str(item) for item in value if item]
+        else:
+            sources[field] = value.name if value else None
+    return sources
+
+
+def recorded_sources(variants):
+    sources = {}
+    for field, entry in (variants or {}).items():
+        if isinstance(entry, list):
+            sources[field] = [item['source'] for item in entry]
+        else:
+            sources[field] = entry['source'] if entry else None
+    return sources
+
+
+def needs_processing(instance):
+    recorded = recorded_sources(instance.image_variants)
+    return any(recorded.get(field, [] if isinstance(source, list) else None) != source
+               for field, source in current_sources(instance).items())
+
+
+def build_variants(instance, storage=default_storage):
+    """Nuevo ``image_variants``, reusando las entradas cuya fuente no cambió.
+
+    Una fuente que falla queda registrada con un ``error`` genérico (el detalle
+    va al log; no se reintenta hasta ``process_images --force``).
+    """
+    known = {}
+    for entry in (instance.image_variants or {}).values():
+        for item in entry if isinstance(entry, list) else [entry]:
+            if item:
+                known[item['source']] = item
+
+    def entry_for(source):
+        if source in known:
+            return known[source]
+        try:
+            return derive(source, storage)
+        except Exception as exc:
+            logger.warning('No se pudieron generar derivados de %s: %s', source, exc)
+            return {'source': source, 'error': SOURCE_ERROR}
+
+    variants = {}
+    for field, source in current_sources(instance).items():
+        if isinstance(source, list):
+            variants[field] = [entry_for(item) for item in source]
+        else:
+            variants[field] = entry_for(source) if source else None
+    return variants
+
+
+def process(label, pk, force=False):
+    """Genera y guarda los derivados de una instancia (en el pool o en línea).
+
+    Devuelve si guardó algo; quien la llama emite ``variants_ready`` (``notify``).
+    """
+    model = apps.get_model(label)
+    try:
+        instance = model._default_manager.get(pk=pk)
+    except model.DoesNotExist:
+        return False
+    if not force and not needs_processing(instance):
+        return False
+    if force:
+        instance.image_variants = {}
+    fields = {'image_variants': build_variants(instance)}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        fields['updated_at'] = timezone.now()
+    # update(): sin signals (no se vuelve a encolar)
+    model._default_manager.filter(pk=pk).update(**fields)
+    return True
+
+
+def notify(label, pk):
+    """Emite ``variants_ready`` en este proceso (el que sirve respuestas)."""
+    variants_ready.send(sender=apps.get_model(label), pk=pk)
+
+
+# --- Pool ---
+
+def process_in_worker(label, pk, force=False):
+    """``process`` en un proceso del pool: conexiones como en un request.
+
+    En línea (``ASYNC`` apagado, ``process_images`` sin ``--workers``) la
+    conexión es la del request o el comando y no se toca.
+    """
+    close_old_connections()
+    try:
+        return process(label, pk, force)
+    finally:
+        close_old_connections()
+
+
+def _init_worker():
+    # Procesos "spawn": configurar Django sin heredar conexiones del padre
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def make_pool(workers=None):
+    return ProcessPoolExecutor(
+        max_workers=workers or get_config()['WORKERS'],
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    )
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = make_pool()
+        return _pool
+
+
+def _on_done(label, pk, future):
+    # Corre en el proceso padre (hilo del pool)
+    if future.exception() is not None:
+        logger.error('Falló el procesamiento de imágenes', exc_info=future.exception())
+    elif future.result():
+        notify(label, pk)
+
+
+def submit(label, pk):
+    if not get_config()['ASYNC']:
+        if process(label, pk):
+            notify(label, pk)
+        return
+    future = get_pool().submit(process_in_worker, label, pk)
+    future.add_done_callback(functools.partial(_on_done, label, pk))
+
+
+def schedule(instance):
+    """Encola ``instance`` si sus fuentes cambiaron, al confirmar la transacción."""
+    if needs_processing(instance):
+        label, pk = instance._meta.label_lower, instance.pk
+        transaction.on_commit(lambda: submit(label, pk), robust=True)
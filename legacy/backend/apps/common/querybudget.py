@@ -0,0 +1,225 @@
+"""Presupuesto de queries por acción de la API.
+
+``QueryBudgetMiddleware`` mide cada request con ``connection.execute_wrapper``
+(sin depender de ``DEBUG``) y lo etiqueta como ``<basename>.<acción>`` del
+ViewSet, por ejemplo ``property.list`` o ``inquiry.stats``:
+
+* ``queries``: cantidad de queries;
+* ``repeated``: queries con el mismo SQL que otra del request (patrón N+1);
+* ``db_ms``: tiempo dentro de la base;
+* ``non_db_ms``: el resto del request (middlewares, vista, serializers y
+  render, sin desglosar).
+
+Cada ViewSet declara su presupuesto por acción::
+
+    query_budget = {'list': 4, 'retrieve': {'queries': 5, 'repeated': 0}}
+
+Las vistas de clase de Django (p. ej. las async) declaran además ``basename``
+y reciben la acción en ``as_view(action=...)``. Las queries que una vista
+async lanza en otros hilos (``apps.common.asyncdb``) se suman al perfil del
+request con ``attach()``.
+
+En tests (fixture ``query_budget`` de ``conftest.py``) exceder el
+presupuesto hace fallar el test. En producción los excesos se loguean siempre
+y el resto se muestrea con ``QUERY_BUDGET['SAMPLE_RATE']``.
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('apps.querybudget')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,  # fracción de requests dentro del presupuesto a loguear
+}
+
+_listeners = []
+_current = contextvars.ContextVar('query_profile', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_BUDGET', {})}
+
+
+class RequestProfile:
+    """Métricas de un request; se usa como ``execute_wrapper``."""
+
+    def __init__(self, path, keep_sql=False):
+        self.path = path
+        self.tag = None
+        self.budget = None
+        self.status_code = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.total_time = 0.0
+        self._statements = Counter()
+        self._keep_sql = keep_sql
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.db_time += elapsed
+                self.queries += 1
+                self._statements[sql] += 1
+
+    def finish(self, response):
+        self.total_time = time.perf_counter() - self._started
+        self.status_code = response.status_code
+        if not self._keep_sql and not self.violations():
+            self._statements.clear()
+
+    @property
+    def repeated(self):
+        return sum(count - 1 for count in self._statements.values())
+
+    def repeated_statements(self):
+        return {sql: count for sql, count in self._statements.items() if count > 1}
+
+    def violations(self):
+        """Métricas que superan el presupuesto: {métrica: (valor, límite)}."""
+        if self.budget is None:
+            return {}
+        limits = self.budget if isinstance(self.budget, dict) else {'queries': self.budget}
+        values = {'queries': self.queries, 'repeated': self.repeated}
+        return {
+            metric: (values[metric], limit)
+            for metric, limit in limits.items() if values[metric] > limit
+        }
+
+    def as_dict(self):
+        return {
+            'tag': self.tag,
+            'path': self.path,
+            'status': self.status_code,
+            'queries': self.queries,
+            'repeated': self.repeated,
+            'db_ms': round(self.db_time * 1000, 2),
+            'non_db_ms': round((self.total_time - self.db_time) * 1000, 2),
+        }
+
+    def __str__(self):
+        return ' '.join(f'{key}={value}' for key, value in self.as_dict().items())
+
+
+def view_tag(view_func, method):
+    """``(basename.acción, presupuesto)`` de una vista de ViewSet, o ``(None, None)``."""
+    view_class = getattr(view_func, 'view_class', None)
+    if getattr(view_class, 'basename', None):
+        action = view_func.view_initkwargs.get('action', getattr(view_class, 'action', None))
+        return f'{view_class.basename}.{action}', getattr(view_class, 'query_budget', {}).get(action)
+    cls = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if cls is None or not actions:
+        return None, None
+    action = actions.get(method.lower())
+    basename = view_func.initkwargs.get('basename') or cls.__name__
+    return f'{basename}.{action}', getattr(cls, 'query_budget', {}).get(action)
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        profile, sampled = self.start(request, config)
+        token = _current.set(profile)
+        try:
+            with attach():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(profile, sampled, response)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+        profile, sampled = self.start(request, config)
+        token = _current.set(profile)
+        stack = contextlib.ExitStack()
+        try:
+            # El ORM del request corre en su hilo de sync_to_async
+            # (thread_sensitive): ahí se engancha el execute_wrapper
+            await sync_to_async(stack.enter_context)(attach())
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.finish(profile, sampled, response)
+
+    @staticmethod
+    def start(request, config):
+        sampled = random.random() < config['SAMPLE_RATE']
+        profile = RequestProfile(request.path, keep_sql=sampled or bool(_listeners))
+        request.query_profile = profile
+        return profile, sampled
+
+    def finish(self, profile, sampled, response):
+        profile.finish(response)
+        self.report(profile, sampled)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, 'query_profile', None)
+        if profile is not None:
+            profile.tag, profile.budget = view_tag(view_func, request.method)
+
+    @staticmethod
+    def report(profile, sampled):
+        for listener in _listeners:
+            listener(profile)
+        violations = profile.violations()
+        if violations:
+            logger.warning('query budget exceeded %s exceeded=%s', profile, violations)
+        elif sampled:
+            logger.info('query budget %s', profile)
+
+
+@contextlib.contextmanager
+def attach():
+    """Mide las queries de este hilo en el perfil del request en curso (si hay)."""
+    profile = _current.get()
+    with contextlib.ExitStack() as stack:
+        if profile is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+        yield profile
+
+
+@contextlib.contextmanager
+def record():
+    """Junta los perfiles de los requests hechos dentro del bloque."""
+    profiles = []
+    _listeners.append(profiles.append)
+    try:
+        yield profiles
+    finally:
+        _listeners.remove(profiles.append)
@@ -0,0 +1,119 @@
+"""Asignación de slugs únicos con sufijo ``-N``.
+
+En vez de probar ``slug``, ``slug-1``, ``slug-2``... con una query cada uno,
+se busca el mayor sufijo en uso con una sola query por rango de prefijo
+(``LIKE 'base%'``) y se usa el siguiente. En PostgreSQL el índice ``UNIQUE``
+del slug no sirve para ``LIKE`` con una collation distinta de ``C``; la
+sirve el índice ``varchar_pattern_ops`` (``*_like``) que Django crea junto
+al de un ``SlugField`` con ``unique=True``. Un campo de slug sin ``unique``
+ni ``db_index`` se recorre entero.
+Si dos altas concurrentes eligen el mismo slug, la segunda choca con el
+``UNIQUE`` y ``save_with_slug`` reintenta con un sufijo nuevo.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils.text import slugify
+
+SUFFIX_ROOM = 8  # "-" + hasta 7 dígitos
+MAX_ATTEMPTS = 5
+BULK_CHUNK = 500
+
+
+def base_slug(model, value, field='slug'):
+    max_length = model._meta.get_field(field).max_length
+    base = slugify(value)[:max_length - SUFFIX_ROOM].rstrip('-')
+    return base or model._meta.model_name
+
+
+def _suffix(slug, base):
+    if slug == base:
+        return 0
+    match = re.fullmatch(rf'{re.escape(base)}-(\d+)', slug)
+    return int(match.group(1)) if match else None
+
+
+def next_slug(model, value, field='slug', exclude_pk=None, using=None):
+    """Primer slug libre para ``value`` (una query)."""
+    base = base_slug(model, value, field)
+    taken = (
+        model._default_manager.using(using)
+        .filter(**{f'{field}__startswith': base,
+                   f'{field}__regex': rf'^{re.escape(base)}(-[0-9]+)?$'})
+        .exclude(pk=exclude_pk)
+        # El sufijo más alto es el slug más largo y, a igual largo, el mayor
+        .order_by(Length(field).desc(), f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    if taken is None:
+        return base
+    return f'{base}-{_suffix(taken, base) + 1}'
+
+
+def save_with_slug(instance, save, source, *args, field='slug', **kwargs):
+    """Guarda ``instance`` asignando slug; reintenta si otro alta lo ganó."""
+    model = type(instance)
+    using = kwargs.get('using')
+    for attempt in range(MAX_ATTEMPTS):
+        setattr(instance, field, next_slug(model, source, field, instance.pk, using))
+        try:
+            with transaction.atomic(using=using):
+                return save(*args, **kwargs)
+        except IntegrityError:
+            conflict = model._default_manager.using(using).filter(
+                **{field: getattr(instance, field)}
+            ).exclude(pk=instance.pk).exists()
+            if not conflict or attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def assign_slugs(instances, source_attr, field='slug', using=None):
+    """Asigna slugs únicos a muchas instancias sin guardar (para bulk_create).
+
+    Una query por cada ``BULK_CHUNK`` bases distintas; también resuelve
+    duplicados dentro del mismo lote.
+    """
+    pending = [obj for obj in instances if not getattr(obj, field)]
+    if not pending:
+        return instances
+    model = type(pending[0])
+    bases = {id(obj): base_slug(model, getattr(obj, source_attr), field) for obj in pending}
+    unique_bases = sorted(set(bases.values()))
+
+    highest = {}
+    manager = model._default_manager.using(using)
+    for start in range(0, len(unique_bases), BULK_CHUNK):
+        chunk = unique_bases[start:start + BULK_CHUNK]
+        condition = Q()
+        for base in chunk:
+            condition |= Q(**{f'{field}__startswith': base})
+        chunk_set = set(chunk)
+        for slug in manager.filter(condition).values_list(field, flat=True).iterator():
+            # Un slug puede tener el prefijo de varias bases ("casa", "casa-en-venta")
+            candidates = [slug] + [slug[:i] for i, char in enumerate(slug) if char == '-']
+            for base in candidates:
+                if base in chunk_set:
+                    suffix = _suffix(slug, base)
+                    if suffix is not None:
+                        highest[base] = max(highest.get(base, -1), suffix)
+
+    for obj in pending:
+        base = bases[id(obj)]
+        suffix = highest.get(base, -1) + 1
+        highest[base] = suffix
+        setattr(obj, field, base if suffix == 0 else f'{base}-{suffix}')
+    return instances
+
+
+class UniqueSlugMixin:
+    """Completa ``slug`` desde ``slug_source`` al guardar si viene vacío."""
+    slug_source = 'name'
+
+    def save(self, *args, **kwargs):
+        if getattr(self, 'slug', None):
+            return super().save(*args, **kwargs)
+        return save_with_slug(self, super().save, getattr(self, self.slug_source),
+                              *args, **kwargs)
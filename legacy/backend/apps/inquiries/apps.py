@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class InquiriesConfig(AppConfig):
+    name = 'apps.inquiries'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,100 @@
+"""Contadores de consultas denormalizados en ``Property``.
+
+``inquiry_count`` y ``inquiries_<estado>`` se ajustan con ``UPDATE ... SET
+x = x + CASE id ...`` (atómico, sin leer filas, uno solo para todas las
+propiedades afectadas) en cada alta, cambio de estado o de propiedad y baja
+de una consulta. ``recompute`` los recalcula en bloque.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from apps.properties import cache
+from apps.properties.models import Property
+from .models import Inquiry
+
+STATUS_FIELDS = {status: f'inquiries_{status}' for status, _ in Inquiry.STATUS_CHOICES}
+COUNT_FIELDS = ['inquiry_count', *STATUS_FIELDS.values()]
+
+
+def _groups(state):
+    if not state:
+        return Counter()
+    return Counter({(state['property_id'], state['status']): 1})
+
+
+def apply_deltas(deltas):
+    """``{(property_id, status): delta}`` -> un solo UPDATE con ``CASE``."""
+    by_field = {}
+    for (property_id, status), delta in deltas.items():
+        if delta:
+            for field in ('inquiry_count', STATUS_FIELDS[status]):
+                per_property = by_field.setdefault(field, Counter())
+                per_property[property_id] += delta
+    property_ids = {pk for per_property in by_field.values() for pk in per_property}
+    if not property_ids:
+        return
+    Property.objects.filter(pk__in=property_ids).update(**{
+        field: F(field) + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in per_property.items() if delta],
+            default=Value(0), output_field=IntegerField(),
+        )
+        for field, per_property in by_field.items()
+    })
+    # update() no emite signals: los listados cacheados muestran inquiry_count
+    cache.invalidate([cache.INQUIRIES_TAG]
+                     + [f'property:{property_id}' for property_id in property_ids])
+
+
+def apply_change(previous, current):
+    """Ajusta los contadores entre dos estados (dicts con property_id y
+    status; ``None`` = la consulta no existe)."""
+    apply_changes([(previous, current)])
+
+
+def apply_changes(changes):
+    """Como ``apply_change`` para muchos pares (anterior, actual) a la vez."""
+    deltas = Counter()
+    for previous, current in changes:
+        deltas.update(_groups(current))
+        deltas.subtract(_groups(previous))
+    apply_deltas(deltas)
+
+
+def _count(status=None):
+    inquiries = Inquiry.objects.filter(property=OuterRef('pk')).order_by()
+    if status:
+        inquiries = inquiries.filter(status=status)
+    return Coalesce(
+        Subquery(inquiries.values('property').annotate(count=Count('id')).values('count')),
+        Value(0), output_field=IntegerField(),
+    )
+
+
+def recompute(queryset=None):
+    """Recalcula los contadores con un solo UPDATE (subconsultas por campo)."""
+    queryset = Property.objects.all() if queryset is None else queryset
+    updated = queryset.update(
+        inquiry_count=_count(),
+        **{field: _count(status) for status, field in STATUS_FIELDS.items()},
+    )
+    cache.get_cache().clear()
+    return updated
+
+
+def check():
+    """Propiedades cuyos contadores no coinciden con las consultas reales."""
+    live = Property.objects.annotate(
+        live_count=Count('inquiries'),
+        **{f'live_{field}': Count('inquiries', filter=Q(inquiries__status=status))
+           for status, field in STATUS_FIELDS.items()},
+    ).values('pk', *COUNT_FIELDS, 'live_count',
+             *(f'live_{field}' for field in STATUS_FIELDS.values()))
+    differences = []
+    for row in live.iterator():
+        stored = [row[field] for field in COUNT_FIELDS]
+        expected = [row['live_count']] + [row[f'live_{field}'] for field in STATUS_FIELDS.values()]
+        if stored != expected:
+            differences.append({'property': row['pk'], 'stored': stored, 'live': expected})
+    return differences
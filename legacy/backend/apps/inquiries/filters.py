@@ -0,0 +1,16 @@
+import django_filters
+
+from .models import Inquiry
+
+
+class InquiryFilterSet(django_filters.FilterSet):
+    """Filtros de la bandeja: estado(s), rango de fechas y propiedad."""
+    status = django_filters.MultipleChoiceFilter(choices=Inquiry.STATUS_CHOICES)
+    created_after = django_filters.DateFilter(field_name='created_at', lookup_expr='date__gte')
+    created_before = django_filters.DateFilter(field_name='created_at', lookup_expr='date__lte')
+    property = django_filters.NumberFilter(field_name='property_id')
+    property_slug = django_filters.CharFilter(field_name='property__slug')
+
+    class Meta:
+        model = Inquiry
+        fields = ['is_contacted']
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.inquiries import queue
+
+
+class Command(BaseCommand):
+    help = ('Worker de la cola de consultas: crea las Inquiry pendientes '
+            '(con dedupe) y envía los digests a los agentes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Vaciar la cola y enviar los digests una vez, y salir.')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Segundos de espera sin trabajo (INQUIRY_QUEUE["POLL_INTERVAL"]).')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or queue.get_config()['POLL_INTERVAL']
+        try:
+            while True:
+                close_old_connections()
+                processed = 0
+                while taken := queue.process_pending():
+                    processed += taken
+                sent = queue.send_digests()
+                if processed or sent:
+                    self.stdout.write(f'{processed} consultas procesadas, {sent} digests enviados')
+                if options['once']:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inquiries import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Property.inquiry_count e inquiries_<estado> desde las consultas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo compara los contadores con los conteos en vivo.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = counters.check()
+            for diff in differences:
+                self.stdout.write(f"property {diff['property']}: "
+                                  f"stored={diff['stored']} live={diff['live']}")
+            if differences:
+                raise CommandError(f'{len(differences)} propiedades inconsistentes')
+            self.stdout.write(self.style.SUCCESS('Contadores consistentes'))
+            return
+        total = counters.recompute()
+        self.stdout.write(self.style.SUCCESS(f'{total} propiedades recalculadas'))
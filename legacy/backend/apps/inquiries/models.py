@@ -2,6 +2,44 @@ from django.db import models
 from apps.users.models import User
 from apps.properties.models import Property
 
+class InquiryQuerySet(models.QuerySet):
+    
+    def set_status(self, status):
+        """Cambia el estado de todas las consultas del queryset en un UPDATE.
+        
+        Con ``contacted`` pone los mismos campos que ``mark_as_contacted``.
+        Como ``update()`` no emite signals, ajusta a mano los rollups de
+        stats y los contadores de ``Property``. Devuelve cuántas cambió.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from . import counters, stats
+        
+        fields = {'status': status, 'updated_at': timezone.now()}
+        if status == 'contacted':
+            fields.update(is_contacted=True, contacted_at=fields['updated_at'])
+        with transaction.atomic(using=self.db):
+            rows = list(
+                self.select_for_update(of=('self',)).order_by()
+                .values('pk', 'status', 'client_id', 'property_id', 'property__agent_id')
+            )
+            if not rows:
+                return 0
+            changes = []
+            for row in rows:
+                previous = {
+                    'status': row['status'],
+                    'client_id': row['client_id'],
+                    'agent_id': row['property__agent_id'],
+                    'property_id': row['property_id'],
+                }
+                changes.append((previous, {**previous, 'status': status}))
+            updated = Inquiry.objects.filter(pk__in=[row['pk'] for row in rows]).update(**fields)
+            stats.apply_changes(changes)
+            counters.apply_changes(changes)
+        return updated
+
+
 class Inquiry(models.Model):
     STATUS_CHOICES = [
         ('new', 'Nuevo'),
@@ -26,6 +64,8 @@ class Inquiry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = InquiryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'inquiries'
         ordering = ['-created_at']
@@ -43,4 +83,92 @@ class Inquiry(models.Model):
         self.is_contacted = True
         self.status = 'contacted'
         self.contacted_at = timezone.now()
-        self.save(update_fields=['is_contacted', 'status', 'contacted_at', 'updated_at'])
\ No newline at end of file
+        self.save(update_fields=['is_contacted', 'status', 'contacted_at', 'updated_at'])
+
+class InquiryStatsRollup(models.Model):
+    """Conteo de consultas por estado, por agente (dueño de la propiedad)
+    y por cliente. Mantenido por signals; ``manage.py rebuild_stats``."""
+    AGENT = 'agent'
+    CLIENT = 'client'
+    SCOPE_CHOICES = [
+        (AGENT, 'Agente'),
+        (CLIENT, 'Cliente'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='inquiry_rollups')
+    status = models.CharField(max_length=20, choices=Inquiry.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'inquiry_stats_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'user', 'status'],
+                                    name='unique_inquiry_rollup_group'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope}:{self.user_id}:{self.status} ({self.count})'
+
+
+class InquirySubmission(models.Model):
+    """Consulta recibida por la API, pendiente de procesar (``apps.inquiries.queue``)."""
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    DUPLICATE = 'duplicate'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pendiente'),
+        (PROCESSED, 'Procesada'),
+        (DUPLICATE, 'Duplicada'),
+        (FAILED, 'Fallida'),
+    ]
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE,
+                                 related_name='inquiry_submissions')
+    client = models.ForeignKey(User, on_delete=models.SET_NULL,
+                               null=True, blank=True, related_name='inquiry_submissions')
+    client_name = models.CharField(max_length=200, blank=True)
+    client_email = models.EmailField()
+    client_phone = models.CharField(max_length=20, blank=True)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    inquiry = models.ForeignKey(Inquiry, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='submissions',
+                                help_text='Consulta creada o a la que se sumó')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'inquiry_submissions'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f'Submission {self.pk} ({self.status}) by {self.client_email}'
+
+
+class InquiryNotification(models.Model):
+    """Aviso pendiente al agente; se envían agrupados en un digest por agente."""
+    agent = models.ForeignKey(User, on_delete=models.CASCADE,
+                              related_name='inquiry_notifications')
+    inquiry = models.OneToOneField(Inquiry, on_delete=models.CASCADE,
+                                   related_name='notification')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    claimed_at = models.DateTimeField(blank=True, null=True,
+                                      help_text='Tomada por un worker para enviar')
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        db_table = 'inquiry_notifications'
+        indexes = [
+            models.Index(fields=['sent_at', 'agent']),
+        ]
+
+    def __str__(self):
+        return f'Notification for {self.agent_id} ({self.inquiry_id})'
@@ -0,0 +1,221 @@
+"""Cola de consultas: el endpoint solo inserta, un worker procesa.
+
+``PropertyViewSet.inquire`` guarda un ``InquirySubmission`` (un INSERT) y
+responde 202, sin importar la carga ni lo que tarde el SMTP. El worker
+(``manage.py process_inquiries``) hace el resto:
+
+* ``process_pending`` toma lotes de pendientes (``SKIP LOCKED``: varios
+  workers no se pisan), colapsa las del mismo ``client_email`` + propiedad
+  dentro de ``DEDUPE_WINDOW`` (un mensaje distinto se agrega a la consulta
+  existente) y crea las ``Inquiry`` restantes, cada una con su
+  ``InquiryNotification`` para el agente;
+* ``send_digests`` manda un correo por agente con todas sus consultas sin
+  avisar, cuando la más vieja tiene ``DIGEST_INTERVAL`` segundos o ya son
+  ``DIGEST_MAX``; todos los correos por una sola conexión SMTP. Primero
+  marca los avisos como tomados (``claimed_at``) en una transacción corta y
+  envía fuera de ella: ningún lock queda abierto mientras responde el SMTP.
+  Un aviso tomado hace más de ``CLAIM_TIMEOUT`` (worker caído) se puede
+  volver a tomar; uno que falló ``MAX_ATTEMPTS`` veces no se reintenta.
+
+Sin ``INQUIRY_QUEUE['ASYNC']`` la consulta se procesa en el mismo request
+(los avisos siguen yendo por digest).
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import Inquiry, InquiryNotification, InquirySubmission
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ASYNC': True,
+    'BATCH_SIZE': 100,
+    'DEDUPE_WINDOW': 30 * 60,  # segundos
+    'DIGEST_INTERVAL': 5 * 60,  # segundos
+    'DIGEST_MAX': 20,  # consultas por agente que disparan el digest antes
+    'POLL_INTERVAL': 2,  # segundos entre pases del worker sin trabajo
+    'CLAIM_TIMEOUT': 10 * 60,  # segundos que un digest tomado queda reservado
+    'MAX_ATTEMPTS': 5,  # envíos fallidos antes de dejar el aviso sin reintentar
+}
+SUBMISSION_FIELDS = ('client_name', 'client_email', 'client_phone', 'message')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'INQUIRY_QUEUE', {})}
+
+
+def enqueue(property_obj, client, data):
+    """Encola una consulta validada por ``InquiryCreateSerializer``."""
+    submission = InquirySubmission.objects.create(
+        property=property_obj, client_id=getattr(client, 'pk', None),
+        **{field: data[field] for field in SUBMISSION_FIELDS if field in data},
+    )
+    if not get_config()['ASYNC']:
+        process_pending(ids=[submission.pk])
+    return submission
+
+
+def _dedupe_key(property_id, email):
+    return property_id, email.lower()
+
+
+def _recent_inquiries(batch, window):
+    """Consultas que pueden absorber a las del lote, por ``_dedupe_key``."""
+    recent = {}
+    emails = {s.client_email.lower() for s in batch}
+    candidates = Inquiry.objects.annotate(email=Lower('client_email')).filter(
+        property_id__in={s.property_id for s in batch},
+        email__in=emails,
+        created_at__gte=min(s.created_at for s in batch) - window,
+    ).order_by('created_at').only('pk', 'property_id', 'client_email', 'message', 'created_at')
+    for inquiry in candidates:
+        recent[_dedupe_key(inquiry.property_id, inquiry.client_email)] = inquiry
+    return recent
+
+
+def process_pending(limit=None, ids=None):
+    """Procesa un lote de pendientes; devuelve cuántas tomó."""
+    config = get_config()
+    window = timedelta(seconds=config['DEDUPE_WINDOW'])
+    with transaction.atomic():
+        pending = InquirySubmission.objects.filter(status=InquirySubmission.PENDING)
+        if ids is not None:
+            pending = pending.filter(pk__in=ids)
+        batch = list(
+            pending.select_for_update(skip_locked=True, of=('self',))
+            .select_related('property').order_by('pk')[:limit or config['BATCH_SIZE']]
+        )
+        if not batch:
+            return 0
+
+        recent = _recent_inquiries(batch, window)
+        appended = {}
+        notifications = []
+        now = timezone.now()
+        for submission in batch:
+            key = _dedupe_key(submission.property_id, submission.client_email)
+            existing = recent.get(key)
+            if existing is not None and existing.created_at >= submission.created_at - window:
+                message = submission.message.strip()
+                if message and message not in existing.message:
+                    existing.message = f'{existing.message}\n\n{message}'
+                    appended[existing.pk] = existing
+                submission.status, submission.inquiry = InquirySubmission.DUPLICATE, existing
+            else:
+                try:
+                    with transaction.atomic():
+                        inquiry = Inquiry.objects.create(
+                            property=submission.property, client_id=submission.client_id,
+                            **{field: getattr(submission, field) for field in SUBMISSION_FIELDS},
+                        )
+                except Exception as exc:
+                    logger.exception('No se pudo procesar la consulta %s', submission.pk)
+                    submission.status, submission.error = InquirySubmission.FAILED, str(exc)
+                else:
+                    recent[key] = inquiry
+                    notifications.append(InquiryNotification(
+                        agent_id=submission.property.agent_id, inquiry=inquiry))
+                    submission.status, submission.inquiry = InquirySubmission.PROCESSED, inquiry
+            submission.processed_at = now
+
+        for inquiry in appended.values():
+            # update(): el mensaje no mueve stats ni contadores
+            Inquiry.objects.filter(pk=inquiry.pk).update(message=inquiry.message, updated_at=now)
+        InquiryNotification.objects.bulk_create(notifications)
+        InquirySubmission.objects.bulk_update(
+            batch, ['status', 'inquiry', 'error', 'processed_at'])
+    return len(batch)
+
+
+def digest_message(agent, notifications):
+    lines = []
+    for notification in notifications:
+        inquiry = notification.inquiry
+        contact = ' '.join(filter(None, [
+            inquiry.client_name, f'<{inquiry.client_email}>', inquiry.client_phone,
+        ]))
+        lines.append(f'- {inquiry.property.title}: {contact}\n  {inquiry.message}')
+    count = len(notifications)
+    subject = f'{count} consulta nueva' if count == 1 else f'{count} consultas nuevas'
+    return EmailMessage(subject, '\n\n'.join(lines), to=[agent.email])
+
+
+def claimable(now, config):
+    """Avisos sin enviar, con intentos disponibles y sin un worker que los tenga."""
+    return InquiryNotification.objects.filter(
+        sent_at__isnull=True, attempts__lt=config['MAX_ATTEMPTS'],
+    ).filter(
+        Q(claimed_at__isnull=True)
+        | Q(claimed_at__lt=now - timedelta(seconds=config['CLAIM_TIMEOUT']))
+    )
+
+
+def claim_digests(now, config):
+    """Toma los avisos de los digests que corresponden; devuelve sus ids."""
+    unsent = claimable(now, config)
+    due = unsent.values('agent_id').annotate(
+        count=Count('id'), oldest=Min('created_at'),
+    ).filter(
+        Q(oldest__lte=now - timedelta(seconds=config['DIGEST_INTERVAL']))
+        | Q(count__gte=config['DIGEST_MAX'])
+    ).order_by()
+    agent_ids = [row['agent_id'] for row in due]
+    if not agent_ids:
+        return []
+    with transaction.atomic():
+        ids = list(
+            unsent.filter(agent_id__in=agent_ids)
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('pk', flat=True)
+        )
+        InquiryNotification.objects.filter(pk__in=ids).update(claimed_at=now)
+    return ids
+
+
+def send_digests(now=None, connection=None):
+    """Envía los digests que corresponden; devuelve cuántos correos salieron."""
+    config = get_config()
+    now = now or timezone.now()
+    ids = claim_digests(now, config)
+    if not ids:
+        return 0
+
+    notifications = list(
+        InquiryNotification.objects.filter(pk__in=ids)
+        .select_related('agent', 'inquiry__property').order_by('agent_id', 'created_at')
+    )
+    sent = 0
+    delivered, failed = [], []
+    connection = connection or get_connection()
+    with connection:  # una sola conexión SMTP para todos
+        for _, group in groupby(notifications, key=lambda n: n.agent_id):
+            group = list(group)
+            agent = group[0].agent
+            if not agent.email:
+                delivered += group  # nadie a quien avisar
+                continue
+            try:
+                connection.send_messages([digest_message(agent, group)])
+            except Exception:
+                logger.exception('No se pudo enviar el digest al agente %s', agent.pk)
+                failed += group
+            else:
+                delivered += group
+                sent += 1
+
+    InquiryNotification.objects.filter(pk__in=[n.pk for n in delivered]).update(sent_at=now)
+    # Se liberan para el próximo pase, con un intento menos
+    InquiryNotification.objects.filter(pk__in=[n.pk for n in failed]).update(
+        attempts=F('attempts') + 1, claimed_at=None)
+    exhausted = [n.pk for n in failed if n.attempts + 1 >= config['MAX_ATTEMPTS']]
+    if exhausted:
+        logger.error('Avisos sin enviar tras %s intentos: %s', config['MAX_ATTEMPTS'], exhausted)
+    return sent
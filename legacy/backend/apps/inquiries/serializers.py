@@ -9,16 +9,13 @@ class InquiryCreateSerializer(serializers.ModelSerializer):
         fields = ['client_name', 'client_email', 'client_phone', 'message']
     
     def create(self, validated_data):
+        """Encola la consulta (``apps.inquiries.queue``); devuelve el ``InquirySubmission``."""
+        from .queue import enqueue
+
         property_obj = self.context.get('property')
         request = self.context.get('request')
         client = request.user if request and request.user.is_authenticated else None
-
-        inquiry = Inquiry.objects.create(
-            property=property_obj,
-            client=client,
-            **validated_data
-        )
-        return inquiry
+        return enqueue(property_obj, client, validated_data)
 
 class InquirySerializer(serializers.ModelSerializer):
     property = PropertyListSerializer(read_only=True)
@@ -38,4 +35,10 @@ class InquiryAdminSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Inquiry
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class InquiryBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                max_length=500)
+    status = serializers.ChoiceField(choices=Inquiry.STATUS_CHOICES)
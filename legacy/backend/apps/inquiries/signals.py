@@ -0,0 +1,72 @@
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.properties.models import Property
+from . import counters, stats
+from .models import Inquiry, InquiryStatsRollup
+
+
+def _current_state(instance):
+    return {
+        'status': instance.status,
+        'client_id': instance.client_id,
+        'agent_id': instance.property.agent_id,
+        'property_id': instance.property_id,
+    }
+
+
+@receiver(pre_save, sender=Inquiry)
+def remember_previous_state(sender, instance, raw=False, using=None, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_state = None
+        return
+    row = sender.objects.using(using).filter(pk=instance.pk).values(
+        'status', 'client_id', 'property__agent_id', 'property_id',
+    ).first()
+    instance._previous_state = row and {
+        'status': row['status'],
+        'client_id': row['client_id'],
+        'agent_id': row['property__agent_id'],
+        'property_id': row['property_id'],
+    }
+
+
+@receiver(post_save, sender=Inquiry)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stats.apply_change(getattr(instance, '_previous_state', None),
+                       _current_state(instance))
+
+
+@receiver(post_delete, sender=Inquiry)
+def update_stats_on_delete(sender, instance, **kwargs):
+    stats.apply_change(_current_state(instance), None)
+
+
+@receiver(post_save, sender=Inquiry)
+def update_property_counters_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    counters.apply_change(getattr(instance, '_previous_state', None),
+                          _current_state(instance))
+
+
+@receiver(post_delete, sender=Inquiry)
+def update_property_counters_on_delete(sender, instance, **kwargs):
+    counters.apply_change(_current_state(instance), None)
+
+
+@receiver(post_save, sender=Property)
+def move_stats_on_agent_change(sender, instance, raw=False, **kwargs):
+    """Si la propiedad cambia de agente, sus consultas cambian de bandeja."""
+    previous = getattr(instance, '_previous_state', None)
+    if raw or not previous or previous['agent_id'] == instance.agent_id:
+        return
+    deltas = {}
+    by_status = instance.inquiries.values('status').annotate(count=Count('id')).order_by()
+    for row in by_status:
+        deltas[(InquiryStatsRollup.AGENT, previous['agent_id'], row['status'])] = -row['count']
+        deltas[(InquiryStatsRollup.AGENT, instance.agent_id, row['status'])] = row['count']
+    stats.apply_deltas(deltas)
@@ -0,0 +1,115 @@
+"""Rollups incrementales para ``/inquiries/stats/``.
+
+Se cuenta cada consulta dos veces: para el agente dueño de la propiedad y
+para el cliente que la envió (si estaba autenticado), por estado.
+"""
+import operator
+from collections import Counter
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+
+from .models import Inquiry, InquiryStatsRollup
+
+
+def _groups(state):
+    if not state:
+        return Counter()
+    groups = Counter()
+    if state.get('agent_id'):
+        groups[(InquiryStatsRollup.AGENT, state['agent_id'], state['status'])] += 1
+    if state.get('client_id'):
+        groups[(InquiryStatsRollup.CLIENT, state['client_id'], state['status'])] += 1
+    return groups
+
+
+def apply_deltas(deltas):
+    """Crea los grupos que falten y aplica todos los deltas en un UPDATE."""
+    deltas = {group: delta for group, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    groups = [Q(scope=scope, user_id=user_id, status=status)
+              for scope, user_id, status in sorted(deltas)]
+    with transaction.atomic():
+        InquiryStatsRollup.objects.bulk_create([
+            InquiryStatsRollup(scope=scope, user_id=user_id, status=status)
+            for scope, user_id, status in sorted(deltas)
+        ], ignore_conflicts=True)
+        InquiryStatsRollup.objects.filter(reduce(operator.or_, groups)).update(
+            count=F('count') + Case(
+                *[When(group, then=Value(deltas[key]))
+                  for group, key in zip(groups, sorted(deltas))],
+                default=Value(0), output_field=IntegerField(),
+            ),
+        )
+
+
+def apply_change(previous, current):
+    """Ajusta los rollups entre dos estados (dicts con status, agent_id y
+    client_id; ``None`` = la consulta no existe)."""
+    apply_changes([(previous, current)])
+
+
+def apply_changes(changes):
+    """Como ``apply_change`` para muchos pares (anterior, actual) a la vez."""
+    deltas = Counter()
+    for previous, current in changes:
+        deltas.update(_groups(current))
+        deltas.subtract(_groups(previous))
+    apply_deltas(deltas)
+
+
+def compute_rollups():
+    rollups = {}
+    inquiries = Inquiry.objects.order_by()
+    for row in inquiries.values('property__agent_id', 'status').annotate(count=Count('id')):
+        rollups[(InquiryStatsRollup.AGENT, row['property__agent_id'], row['status'])] = row['count']
+    for row in (inquiries.filter(client__isnull=False)
+                .values('client_id', 'status').annotate(count=Count('id'))):
+        rollups[(InquiryStatsRollup.CLIENT, row['client_id'], row['status'])] = row['count']
+    return rollups
+
+
+def rebuild():
+    rollups = compute_rollups()
+    with transaction.atomic():
+        InquiryStatsRollup.objects.all().delete()
+        InquiryStatsRollup.objects.bulk_create([
+            InquiryStatsRollup(scope=scope, user_id=user_id, status=status, count=count)
+            for (scope, user_id, status), count in rollups.items()
+        ])
+    return len(rollups)
+
+
+def check():
+    expected = compute_rollups()
+    stored = {
+        (r.scope, r.user_id, r.status): r.count
+        for r in InquiryStatsRollup.objects.filter(count__gt=0)
+    }
+    return [
+        {'group': f'{scope}:{user_id}:{status}',
+         'stored': stored.get((scope, user_id, status)),
+         'live': expected.get((scope, user_id, status))}
+        for scope, user_id, status in sorted(expected.keys() | stored.keys())
+        if stored.get((scope, user_id, status)) != expected.get((scope, user_id, status))
+    ]
+
+
+def read_stats(scope, user):
+    """Respuesta de ``/inquiries/stats/`` en una sola query."""
+    counts = dict(
+        InquiryStatsRollup.objects.filter(scope=scope, user_id=user.pk, count__gt=0)
+        .values_list('status', 'count')
+    )
+    return {
+        'total': sum(counts.values()),
+        'new': counts.get('new', 0),
+        'contacted': counts.get('contacted', 0),
+        'closed': counts.get('closed', 0),
+        'by_status': [
+            {'status': status, 'count': counts[status]}
+            for status, _ in Inquiry.STATUS_CHOICES if status in counts
+        ],
+    }
@@ -0,0 +1,92 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from apps.properties.pagination import KeysetPagination
+from . import stats as inquiry_stats
+from .filters import InquiryFilterSet
+from .models import Inquiry, InquiryStatsRollup
+from .serializers import InquirySerializer, InquiryAdminSerializer, InquiryBulkStatusSerializer
+
+class InquiryViewSet(viewsets.ModelViewSet):
+    queryset = Inquiry.objects.all()
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filterset_class = InquiryFilterSet
+    ordering_fields = ['created_at', 'updated_at', 'contacted_at', 'status', 'property']
+    query_budget = {
+        'list': {'queries': 4, 'repeated': 0},
+        'stats': 2,
+        'bulk_status': 10,
+        'mark_contacted': 10,
+    }
+    
+    def get_serializer_class(self):
+        if self.request.user.role in ['admin', 'agent']:
+            return InquiryAdminSerializer
+        return InquirySerializer
+    
+    def get_queryset(self):
+        user = self.request.user
+        # Plan fijo para la bandeja: todo lo que anidan los serializers
+        # (propiedad con agente/categoría/tags y cliente) en 2 queries
+        base_qs = Inquiry.objects.select_related(
+            'client', 'property__agent', 'property__category',
+        ).prefetch_related('property__tags')
+        if user.role in ['admin', 'agent']:
+            # Agentes ven consultas de sus propiedades
+            return base_qs.filter(property__agent_id=user.pk)
+        # Clientes ven sus propias consultas
+        return base_qs.filter(client_id=user.pk)
+    
+    @action(detail=True, methods=['post'])
+    def mark_contacted(self, request, pk=None):
+        """Marcar consulta como contactada"""
+        inquiry = self.get_object()
+        inquiry.mark_as_contacted()
+        return Response({'success': True, 'status': inquiry.status})
+    
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """Cambiar el estado de varias consultas en un solo UPDATE.
+
+        Body: ``{"ids": [...], "status": "contacted"}``. Solo se tocan las
+        consultas de la bandeja del usuario.
+        """
+        if request.user.role not in ['admin', 'agent']:
+            return Response({'detail': 'Solo agentes pueden cambiar estados'},
+                            status=status.HTTP_403_FORBIDDEN)
+        serializer = InquiryBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data['status']
+        updated = Inquiry.objects.filter(
+            pk__in=serializer.validated_data['ids'],
+            property__agent_id=request.user.pk,
+        ).set_status(new_status)
+        return Response({'success': True, 'updated': updated, 'status': new_status})
+    
+    @action(detail=True, methods=['post'])
+    def add_note(self, request, pk=None):
+        """Agregar nota interna"""
+        inquiry = self.get_object()
+        note = request.data.get('note', '')
+        
+        if note:
+            inquiry.notes = f"{inquiry.notes}\n{note}" if inquiry.notes else note
+            inquiry.save(update_fields=['notes', 'updated_at'])
+        
+        return Response({'success': True, 'notes': inquiry.notes})
+    
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Estadísticas de consultas desde los rollups (1 query).
+
+        ``?check=1`` (solo admin) agrega las diferencias contra los datos en vivo.
+        """
+        user = request.user
+        scope = (InquiryStatsRollup.AGENT if user.role in ['admin', 'agent']
+                 else InquiryStatsRollup.CLIENT)
+        data = inquiry_stats.read_stats(scope, user)
+        if request.query_params.get('check') and user.role == 'admin':
+            data['check'] = {'differences': inquiry_stats.check()}
+        return Response(data)
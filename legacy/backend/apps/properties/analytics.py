@@ -0,0 +1,292 @@
+"""Analítica de precios por grupo: percentiles, precio por m² e histogramas.
+
+``Snapshot`` baja las propiedades visibles (publicadas y disponibles, como
+el listado público) en columnas compactas (pk, precio, superficie y códigos
+enteros de operación, ciudad y tipo) con una query. ``group_stats`` calcula
+todos los grupos de un nivel (``LEVELS``: operación; + ciudad; + tipo; +
+ciudad y tipo; venta y alquiler nunca se mezclan) con group-bys
+vectorizados: un orden por (grupo, valor), los percentiles por aritmética
+de índices sobre el tramo de cada grupo y sumas e histogramas con
+``bincount``. El precio por m² es ``price / area``
+de las que tienen ``area > 0``.
+
+``PriceAnalytics`` guarda los resultados por versión del snapshot
+(``Max(updated_at)`` y cantidad de visibles, 1 query). Cuando la versión
+cambia trae solo las filas con ``updated_at`` posterior al snapshot, las
+aplica sobre las columnas y recalcula únicamente los grupos tocados (por
+los valores anteriores y los nuevos). Si después de aplicarlas la cantidad
+no cuadra (hubo bajas), rehace el snapshot completo. Cada proceso tiene el
+suyo (``get_analytics``).
+"""
+import threading
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .models import Property
+
+DIMENSIONS = ('operation', 'city', 'property_type')
+LEVELS = {
+    'operation': ('operation',),
+    'city': ('operation', 'city'),
+    'property_type': ('operation', 'property_type'),
+    'city,property_type': ('operation', 'city', 'property_type'),
+}
+PERCENTILES = {'p10': 10, 'median': 50, 'p90': 90}
+HISTOGRAM_BINS = 10
+CODE_BITS = 20  # bits por dimensión en el código de grupo (hasta ~1M valores)
+
+
+ROW_FIELDS = ('pk', 'status', 'is_available', 'price', 'area', *DIMENSIONS, 'updated_at')
+
+
+def published():
+    """Lo que ve el público: publicadas y disponibles."""
+    return Property.objects.filter(status='published', is_available=True)
+
+
+def read_version():
+    summary = published().order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+    return summary['last'], summary['count']
+
+
+class Snapshot:
+    """Visibles en columnas NumPy; ``codes[dim]`` indexa ``vocabulary[dim]``."""
+
+    def __init__(self):
+        self.vocabulary = {dim: [] for dim in DIMENSIONS}
+        self._codes = {dim: {} for dim in DIMENSIONS}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.price = np.zeros(0, dtype=np.float64)
+        self.area = np.zeros(0, dtype=np.float64)
+        self.codes = {dim: np.zeros(0, dtype=np.int32) for dim in DIMENSIONS}
+        self.active = np.zeros(0, dtype=bool)
+        self.rows = {}  # pk -> fila
+        self.last_updated = None
+
+    @classmethod
+    def load(cls):
+        snapshot = cls()
+        snapshot.apply(list(published().values_list(*ROW_FIELDS)))
+        return snapshot
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def code(self, dim, value):
+        codes = self._codes[dim]
+        if value not in codes:
+            codes[value] = len(self.vocabulary[dim])
+            self.vocabulary[dim].append(value)
+        return codes[value]
+
+    def group_codes(self, level, rows=None):
+        """Código entero del grupo de ``level`` para cada fila (o ``rows``).
+
+        No depende del tamaño de los vocabularios: un valor nuevo no cambia
+        los códigos de los grupos que ya estaban.
+        """
+        combined = np.zeros(len(self.ids) if rows is None else len(rows), dtype=np.int64)
+        for dim in LEVELS[level]:
+            codes = self.codes[dim] if rows is None else self.codes[dim][rows]
+            combined = (combined << CODE_BITS) | codes
+        return combined
+
+    def apply(self, rows):
+        """Aplica filas de ``ROW_FIELDS``.
+
+        Devuelve los índices de las filas cuyos valores cambiaron o que se
+        agregaron.
+        """
+        touched, new = [], []
+        for pk, status, is_available, price, area, *values, updated_at in rows:
+            visible = status == 'published' and is_available
+            if self.last_updated is None or updated_at > self.last_updated:
+                self.last_updated = updated_at
+            row = self.rows.get(pk)
+            if row is None:
+                if visible:
+                    new.append((pk, float(price), float(area or 0), values))
+                continue
+            codes = [self.code(dim, value) for dim, value in zip(DIMENSIONS, values)]
+            state = (visible, float(price), float(area or 0), *codes)
+            current = (self.active[row], self.price[row], self.area[row],
+                       *(self.codes[dim][row] for dim in DIMENSIONS))
+            if state == current:
+                continue
+            self.active[row], self.price[row], self.area[row] = state[:3]
+            for dim, code in zip(DIMENSIONS, codes):
+                self.codes[dim][row] = code
+            touched.append(row)
+        if new:
+            start = len(self.ids)
+            self.ids = np.append(self.ids, [pk for pk, *_ in new])
+            self.price = np.append(self.price, [price for _, price, _, _ in new])
+            self.area = np.append(self.area, [area for _, _, area, _ in new])
+            for i, dim in enumerate(DIMENSIONS):
+                self.codes[dim] = np.append(self.codes[dim], [
+                    self.code(dim, values[i]) for *_, values in new]).astype(np.int32)
+            self.active = np.append(self.active, np.ones(len(new), dtype=bool))
+            for offset, (pk, *_) in enumerate(new):
+                self.rows[pk] = start + offset
+            touched += range(start, start + len(new))
+        return touched
+
+
+def _percentiles(values, starts, counts):
+    """Percentiles (interpolación lineal) de cada tramo ``values[start:start+count]``."""
+    result = {}
+    for name, q in PERCENTILES.items():
+        position = starts + (counts - 1) * (q / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+        result[name] = values[low] * (1 - fraction) + values[high] * fraction
+    return result
+
+
+def _distribution(groups, values):
+    """Stats de ``values`` por grupo denso ``groups`` (0..n-1, todos presentes)."""
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    counts = np.bincount(groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    minimum, maximum = values[starts], values[starts + counts - 1]
+    stats = {
+        'count': counts,
+        'min': minimum,
+        'max': maximum,
+        'mean': np.bincount(groups, weights=values) / counts,
+        **_percentiles(values, starts, counts),
+    }
+    # Histograma de HISTOGRAM_BINS tramos iguales entre el mínimo y el máximo del grupo
+    width = (maximum - minimum) / HISTOGRAM_BINS
+    safe_width = np.where(width > 0, width, 1)
+    bins = np.minimum(((values - minimum[groups]) / safe_width[groups]).astype(np.int64),
+                      HISTOGRAM_BINS - 1)
+    stats['histogram'] = np.bincount(
+        groups * HISTOGRAM_BINS + bins, minlength=len(counts) * HISTOGRAM_BINS,
+    ).reshape(len(counts), HISTOGRAM_BINS)
+    stats['width'] = width
+    return stats
+
+
+def _summary(stats, i, fields):
+    summary = {field: round(float(stats[field][i]), 2) for field in fields}
+    edges = stats['min'][i] + stats['width'][i] * np.arange(HISTOGRAM_BINS + 1)
+    summary['histogram'] = {
+        'edges': [round(float(edge), 2) for edge in edges],
+        'counts': stats['histogram'][i].tolist(),
+    }
+    return summary
+
+
+def group_stats(snapshot, level, codes=None):
+    """``{código de grupo: resultado}`` de ``level``; con ``codes``, solo esos grupos."""
+    rows = np.flatnonzero(snapshot.active)
+    combined = snapshot.group_codes(level, rows)
+    if codes is not None:
+        keep = np.isin(combined, list(codes))
+        rows, combined = rows[keep], combined[keep]
+    if not len(rows):
+        return {}
+    keys, groups = np.unique(combined, return_inverse=True)
+    prices = _distribution(groups, snapshot.price[rows])
+
+    area = snapshot.area[rows]
+    with_area = area > 0
+    per_m2 = {}
+    if with_area.any():
+        area_keys, area_groups = np.unique(groups[with_area], return_inverse=True)
+        stats = _distribution(area_groups, snapshot.price[rows][with_area] / area[with_area])
+        per_m2 = {int(group): i for i, group in enumerate(area_keys)}
+
+    results = {}
+    first_rows = rows[np.unique(groups, return_index=True)[1]]
+    for i, key in enumerate(keys.tolist()):
+        row = first_rows[i]
+        result = {dim: snapshot.vocabulary[dim][snapshot.codes[dim][row]]
+                  for dim in LEVELS[level]}
+        result['count'] = int(prices['count'][i])
+        result['price'] = _summary(prices, i, ('min', *PERCENTILES, 'max', 'mean'))
+        result['price_per_m2'] = (_summary(stats, per_m2[i], (*PERCENTILES, 'mean'))
+                                  if i in per_m2 else None)
+        results[key] = result
+    return results
+
+
+class PriceAnalytics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.snapshot = None
+        self.version = None
+        self.results = {}  # nivel -> {código de grupo: resultado}
+
+    def refresh(self, version=None):
+        """Pone los resultados al día con ``version`` (``read_version()``)."""
+        version = version or read_version()
+        with self._lock:
+            if version == self.version:
+                return self.results
+            if self.snapshot is None or self.snapshot.last_updated is None:
+                self._rebuild(version)
+                return self.results
+            snapshot = self.snapshot
+            # Todas las cambiadas: las que dejaron de ser visibles también salen
+            changed = list(Property.objects.filter(updated_at__gte=snapshot.last_updated)
+                           .values_list(*ROW_FIELDS))
+            # Grupos de cada fila antes de aplicar: de los que salen las que cambiaron
+            before = {level: snapshot.group_codes(level) for level in LEVELS}
+            touched = snapshot.apply(changed)
+            if len(snapshot) != version[1]:
+                self._rebuild(version)  # bajas: no aparecen entre las filas cambiadas
+                return self.results
+            for level in LEVELS:
+                old = before[level][[row for row in touched if row < len(before[level])]]
+                codes = set(old.tolist()) | set(snapshot.group_codes(level, touched).tolist())
+                if not codes:
+                    continue
+                fresh = group_stats(snapshot, level, codes)
+                for code in codes:
+                    self.results[level].pop(code, None)
+                self.results[level].update(fresh)
+            self.version = version
+            return self.results
+
+    def _rebuild(self, version):
+        self.snapshot = Snapshot.load()
+        self.results = {level: group_stats(self.snapshot, level) for level in LEVELS}
+        self.version = version
+
+    def query(self, group_by=(), **filters):
+        """Grupos por ``operation`` + ``group_by`` que cumplen ``filters`` (dim -> valor).
+
+        El nivel es el que agrupa por las dimensiones pedidas y las filtradas;
+        los grupos salen de mayor a menor cantidad.
+        """
+        dims = {'operation', *group_by, *filters}
+        level = next(level for level, fields in LEVELS.items() if set(fields) == dims)
+        groups = [group for group in self.refresh()[level].values()
+                  if all(group[dim] == value for dim, value in filters.items())]
+        return sorted(groups, key=lambda group: (
+            -group['count'], *(group[dim] for dim in LEVELS[level])))
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = PriceAnalytics()
+    return _analytics
+
+
+def reset():
+    global _analytics
+    with _analytics_lock:
+        _analytics = None
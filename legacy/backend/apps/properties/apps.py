@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class PropertiesConfig(AppConfig):
+    name = 'apps.properties'
+    default_auto_field = 'django.db.models.BigAutoField'
+
+    def ready(self):
+        from . import checks, search, signals  # noqa: F401
+
+        post_migrate.connect(search.install_schema, sender=self)
@@ -0,0 +1,15 @@
+from django.urls import path, re_path
+from .async_views import AsyncPropertyView
+from .views import FEEDS
+
+urlpatterns = [
+    path('', AsyncPropertyView.as_view(action='list'), name='property-async-list'),
+    path('stats/', AsyncPropertyView.as_view(action='stats'), name='property-async-stats'),
+    *[
+        path(f'{feed}/', AsyncPropertyView.as_view(action=feed), name=f'property-async-{feed}')
+        for feed in FEEDS
+    ],
+    # Mismo lookup que el router de DRF
+    re_path(r'^(?P<slug>[^/.]+)/$', AsyncPropertyView.as_view(action='retrieve'),
+            name='property-async-detail'),
+]
@@ -0,0 +1,142 @@
+"""Lectura async (ASGI) de propiedades: listado, detalle, feeds y stats.
+
+Mismas rutas que PropertyViewSet bajo ``/api/async/properties/`` y mismas
+respuestas. Cada request arma un ``PropertyViewSet`` para reusar
+autenticación, permisos, ``get_queryset`` por rol, filtros, paginación,
+serializers, caché de feeds y GET condicional; cambia cómo se esperan las
+queries:
+
+* lo síncrono que puede consultar (auth JWT, filtros como ``?search=`` o
+  ``?category_tree=``, serialización) corre con ``sync_to_async`` sin
+  bloquear el event loop;
+* lo independiente va en paralelo con ``asyncdb.gather``: los rollups y el
+  top de ciudades de ``stats``; la página y el ``?count=`` del listado.
+
+Los validadores del listado y los feeds salen de las versiones del caché de
+feeds, como en la vista síncrona (con el 304 antes de filtrar o consultar).
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework.response import Response
+
+from apps.common import asyncdb
+
+from . import cache, conditional, stats as property_stats
+from .views import FEEDS, PropertyViewSet, _is_admin
+
+ACTIONS = ('list', 'retrieve', 'stats', *FEEDS)
+
+
+class AsyncPropertyView(View):
+    """``as_view(action=...)`` con una de ``ACTIONS``."""
+    action = None
+    basename = 'property-async'
+    query_budget = {action: PropertyViewSet.query_budget[action] for action in ACTIONS}
+
+    async def get(self, request, **kwargs):
+        viewset = PropertyViewSet(
+            basename='property', detail=self.action == 'retrieve',
+            action_map={'get': self.action, 'head': self.action},
+        )
+        viewset.args, viewset.kwargs = (), kwargs
+        drf_request = viewset.initialize_request(request, **kwargs)
+        viewset.request = drf_request
+        viewset.headers = viewset.default_response_headers
+        try:
+            await sync_to_async(viewset.initial)(drf_request, **kwargs)
+            if self.action in FEEDS:
+                response = await self.feed(viewset, drf_request)
+            else:
+                response = await getattr(self, self.action)(viewset, drf_request, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(viewset.handle_exception)(exc)
+        return viewset.finalize_response(drf_request, response, **kwargs)
+
+    async def list(self, viewset, request):
+        response = await sync_to_async(conditional.not_modified)(request, self.action)
+        if response is not None:
+            return response
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+        paginator = viewset.paginator
+        page_qs = paginator.prepare(queryset, request)
+
+        def render(rows, count):
+            paginator.count = count
+            page = paginator.set_page(rows)
+            return paginator.get_paginated_response(viewset.get_serializer(page, many=True).data)
+
+        return await self.conditional_response(
+            request,
+            fetch=[lambda: list(page_qs), functools.partial(paginator.get_count, queryset)],
+            render=render, anonymous_only=True,
+        )
+
+    async def feed(self, viewset, request):
+        response = await sync_to_async(conditional.not_modified)(request, self.action)
+        if response is not None:
+            return response
+        feed_qs = await sync_to_async(viewset.get_feed_queryset)()  # trending lee su ranking
+        return await self.conditional_response(
+            request,
+            fetch=[lambda: list(feed_qs)],
+            render=viewset.feed_response,
+        )
+
+    async def conditional_response(self, request, fetch, render, anonymous_only=False):
+        """GET condicional + caché de feeds, como ``@conditional() @cached_feed()``.
+
+        ``fetch``: callables independientes (ORM síncrono); sus resultados van
+        a ``render``, que arma la ``Response``.
+        """
+        key, data, versions = await sync_to_async(cache.lookup)(request, self.action)
+        if data is not None:
+            response = cache.hit(data)
+        else:
+            results = await asyncdb.gather(*fetch)
+            response = await sync_to_async(render)(*results)
+            versions = await sync_to_async(cache.page_versions)(versions, response)
+            await sync_to_async(cache.store)(
+                key, versions, response, cache.caches_data(request, anonymous_only))
+        return await sync_to_async(conditional.finish)(request, self.action, response, versions)
+
+    async def retrieve(self, viewset, request, slug):
+        pending = None
+        if conditional.has_validators(request):
+            # Validadores sin cargar la propiedad; solo se carga si no es 304
+            row = await sync_to_async(conditional.detail_row)(viewset, slug)
+            if row is not None:
+                pending = await sync_to_async(viewset.record_view)(
+                    request, row['pk'], row['agent_id'])
+                etag, last_modified = await sync_to_async(conditional.detail_validators)(
+                    request, self.action, row, row['views_count'] + pending)
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified)
+                if response is not None:
+                    conditional.set_headers(response, request, etag, last_modified)
+                    return response
+        instance = await sync_to_async(viewset.get_object)()  # 404
+        if pending is None:
+            pending = await sync_to_async(viewset.record_view)(
+                request, instance.pk, instance.agent_id)
+        instance.views_count += pending
+        row = {field: getattr(instance, field) for field in conditional.DETAIL_FIELDS}
+        etag, last_modified = await sync_to_async(conditional.detail_validators)(
+            request, self.action, row, instance.views_count)
+        data = await sync_to_async(lambda: viewset.get_serializer(instance).data)()
+        response = Response(data)
+        conditional.set_headers(response, request, etag, last_modified)
+        return response
+
+    async def stats(self, viewset, request):
+        calls = [property_stats.read_totals, property_stats.read_top_cities]
+        check = request.query_params.get('check') and _is_admin(request.user)
+        if check:
+            calls += [property_stats.live_stats, property_stats.check]
+        totals, cities, *checked = await asyncdb.gather(*calls)
+        data = property_stats.build_stats(totals, cities)
+        if check:
+            data['check'] = {'live': checked[0], 'differences': checked[1]}
+        return Response(data)
@@ -0,0 +1,514 @@
+"""Benchmark de la API REST sobre catálogos sintéticos.
+
+``seed(size)`` carga con ``bulk_create`` un catálogo reproducible (agentes,
+clientes, árbol de categorías, tags, propiedades e inquiries) y reconstruye
+lo que mantienen los signals: índice full-text, rollups y contadores.
+``run(catalog)`` recorre los escenarios con ``APIClient`` (middleware,
+permisos y serializers incluidos) y mide por escenario:
+
+* latencia p50/p95/p99 (ms);
+* queries y tiempo en la base (``apps.common.querybudget``);
+* memoria pico de Python (``tracemalloc``, en una pasada aparte).
+
+Los resultados son JSON; ``compare(baseline, current)`` lista regresiones.
+Ver los comandos ``benchmark_api`` y ``benchmark_compare``.
+
+``throughput(catalog)`` compara requests/s de las lecturas de propiedades por
+WSGI (``/api/``, un hilo por worker) y por ASGI (``/api/async/``, requests
+concurrentes en un event loop), pasando por los handlers reales de Django.
+
+``naive_price_stats(level)`` es la analítica de precios hecha como antes de
+``apps.properties.analytics``: una query por grupo y percentiles en Python.
+La usa ``benchmark_analytics`` como referencia de tiempos y de resultados.
+"""
+import asyncio
+import datetime
+import io
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.common import querybudget
+from apps.common.slugs import assign_slugs
+from apps.inquiries import counters
+from apps.inquiries import stats as inquiry_stats
+
+from . import analytics, cache, search
+from . import stats as property_stats
+from .counters import get_view_counter
+from .models import Property
+from .views import FEEDS
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+BATCH_SIZE = 2_000
+ORDERINGS = ['price', '-price', '-published_at', '-views_count', 'created_at',
+             'area', '-inquiry_count']
+# Umbrales de compare(): relativo y absoluto (ruido de máquina)
+THRESHOLD = 0.2
+MIN_MS = 1.0
+MIN_KB = 64
+
+
+@dataclass
+class Catalog:
+    """Referencias del catálogo sembrado que usan los escenarios."""
+    size: int
+    seed: int
+    agent: object
+    client: object
+    category: object
+    root_category: object
+    tag: object
+    property: object
+
+
+def parse_size(value):
+    """``'10k'`` o ``'10000'`` -> 10000."""
+    return SIZES.get(value) or int(value)
+
+
+def seed(size, seed=42):
+    """Carga un catálogo de ``size`` propiedades y devuelve un ``Catalog``."""
+    import factory.random
+
+    from . import factories
+
+    factory.random.reseed_random(seed)
+    rng = factory.random.randgen
+    User = factories.AgentFactory._meta.model
+
+    agents = User.objects.bulk_create(
+        factories.AgentFactory.build_batch(max(5, size // 200)), batch_size=BATCH_SIZE)
+    clients = User.objects.bulk_create(
+        factories.UserFactory.build_batch(max(10, size // 20)), batch_size=BATCH_SIZE)
+
+    # Árbol de 3 niveles: save() arma los paths materializados
+    leaves, roots = [], factories.CategoryFactory.create_batch(6)
+    for root in roots:
+        for child in factories.CategoryFactory.create_batch(3, parent=root):
+            leaves += factories.CategoryFactory.create_batch(2, parent=child)
+    tags = factories.TagFactory.create_batch(20)
+
+    # Los agentes más activos concentran más propiedades (como en producción)
+    agent_weights = [1 / (rank + 1) for rank in range(len(agents))]
+    Through = Property.tags.through
+    for start in range(0, size, BATCH_SIZE):
+        batch = [
+            factories.PropertyFactory.build(
+                agent=rng.choices(agents, weights=agent_weights)[0],
+                category=rng.choice(leaves),
+            )
+            for _ in range(min(BATCH_SIZE, size - start))
+        ]
+        for prop in batch:
+            prop.sync_coordinates()
+        Property.objects.bulk_create(assign_slugs(batch, 'title'))
+        Through.objects.bulk_create([
+            Through(property_id=prop.pk, tag_id=tag.pk)
+            for prop in batch for tag in rng.sample(tags, rng.randint(0, 3))
+        ])
+
+    published = list(Property.objects.filter(status='published').only('pk'))
+    Inquiry = factories.InquiryFactory._meta.model
+    for start in range(0, size // 2, BATCH_SIZE):
+        Inquiry.objects.bulk_create([
+            factories.InquiryFactory.build(
+                property=rng.choice(published),
+                client=rng.choice(clients) if rng.random() < 0.7 else None,
+            )
+            for _ in range(min(BATCH_SIZE, size // 2 - start))
+        ])
+
+    # bulk_create no emite signals: se reconstruye lo derivado
+    search.install_schema()
+    search.reindex(Property.objects.all(), batch_size=BATCH_SIZE)
+    property_stats.rebuild()
+    inquiry_stats.rebuild()
+    counters.recompute()
+    cache.get_cache().clear()
+
+    return Catalog(
+        size=size, seed=seed,
+        agent=agents[0],
+        client=clients[0],
+        category=leaves[0],
+        root_category=roots[0],
+        tag=tags[0],
+        property=Property.objects.filter(status='published', is_available=True).first(),
+    )
+
+
+def scenarios(catalog):
+    """``[(nombre, usuario, url, params)]``; usuario ``None`` = anónimo."""
+    prop = catalog.property
+    lat, lng = prop.latitude, prop.longitude
+    filters = {
+        'operation': {'operation': 'sale'},
+        'property_type': {'property_type': 'apartment'},
+        'category': {'category': catalog.category.pk},
+        'category_tree': {'category_tree': catalog.root_category.slug},
+        'city': {'city': prop.city},
+        'state': {'state': prop.state},
+        'rooms': {'rooms': 3},
+        'bathrooms': {'bathrooms': 2},
+        'is_featured': {'is_featured': 'true'},
+        'price_range': {'price_min': 1_000_000, 'price_max': 4_000_000},
+        'area_range': {'area_min': 100, 'area_max': 300},
+        'rooms_min': {'rooms_min': 3},
+        'bathrooms_min': {'bathrooms_min': 2},
+        'tag': {'tag': catalog.tag.slug},
+        'search': {'search': prop.city},
+        'within': {'within': f'{lat - 0.1},{lng - 0.1},{lat + 0.1},{lng + 0.1}'},
+        'near': {'near': f'{lat},{lng}', 'radius': 5},
+    }
+    result = [('list', None, '/api/properties/', {})]
+    result += [(f'list.filter.{name}', None, '/api/properties/', params)
+               for name, params in filters.items()]
+    result += [(f'list.ordering.{ordering}', None, '/api/properties/', {'ordering': ordering})
+               for ordering in ORDERINGS]
+    result += [
+        ('list.agent', catalog.agent, '/api/properties/', {}),
+        ('search', None, '/api/properties/search/', {'search': prop.city}),
+        ('search.filtered', None, '/api/properties/search/',
+         {'operation': 'sale', 'rooms_min': 2, 'tag': catalog.tag.slug}),
+        ('nearest', None, '/api/properties/nearest/', {'lat': lat, 'lng': lng}),
+        ('suggest', None, '/api/properties/suggest/', {'q': prop.city[:3]}),
+        ('detail', None, f'/api/properties/{prop.slug}/', {}),
+        ('stats', None, '/api/properties/stats/', {}),
+        ('analytics', None, '/api/properties/analytics/', {'group_by': 'city'}),
+        ('categories', None, '/api/categories/all/', {}),
+    ]
+    result += [(f'feed.{feed}', None, f'/api/properties/{feed}/', {})
+               for feed in ('featured', 'for_sale', 'for_rent', 'trending', 'recent')]
+    result += [
+        ('inbox', catalog.agent, '/api/inquiries/', {}),
+        ('inbox.filtered', catalog.agent, '/api/inquiries/', {'status': ['new', 'contacted']}),
+        ('inbox.stats', catalog.agent, '/api/inquiries/stats/', {}),
+        ('inbox.client', catalog.client, '/api/inquiries/', {}),
+    ]
+    return result
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _quantile(ordered, q):
+    """Percentil ``q`` con interpolación lineal (como ``numpy.percentile``)."""
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def naive_price_stats(level):
+    """``[resultado]`` de ``level`` con una query por grupo (sin histogramas)."""
+    fields = analytics.LEVELS[level]
+    published = analytics.published()
+    results = []
+    for group in published.order_by(*fields).values(*fields).distinct():
+        rows = list(published.filter(**group).order_by('price').values_list('price', 'area'))
+        prices = [float(price) for price, _ in rows]
+        per_m2 = sorted(float(price) / area for price, area in rows if area and area > 0)
+        result = {**group, 'count': len(prices), 'price': {
+            'min': prices[0], 'max': prices[-1], 'mean': statistics.fmean(prices),
+            **{name: _quantile(prices, q) for name, q in analytics.PERCENTILES.items()},
+        }}
+        result['price_per_m2'] = {
+            'mean': statistics.fmean(per_m2),
+            **{name: _quantile(per_m2, q) for name, q in analytics.PERCENTILES.items()},
+        } if per_m2 else None
+        results.append(result)
+    return results
+
+
+def price_stats_mismatches(expected, actual, tolerance=0.01):
+    """Grupos en que ``actual`` (``PriceAnalytics``) difiere de ``naive_price_stats``."""
+    def key(group):
+        return tuple(group[field] for field in analytics.DIMENSIONS if field in group)
+
+    def close(a, b):
+        return abs(a - b) <= tolerance * max(1, abs(a))
+
+    actual = {key(group): group for group in actual}
+    mismatches = []
+    for group in expected:
+        found = actual.pop(key(group), None)
+        ok = found is not None and found['count'] == group['count'] and all(
+            close(value, found['price'][name]) for name, value in group['price'].items())
+        if ok and group['price_per_m2'] is not None:
+            ok = found['price_per_m2'] is not None and all(
+                close(value, found['price_per_m2'][name])
+                for name, value in group['price_per_m2'].items())
+        if not ok:
+            mismatches.append(key(group))
+    return mismatches + list(actual)
+
+
+def measure(client, url, params, repeat=20, warm=False):
+    """Métricas de ``repeat`` GET; sin ``warm`` se vacía el caché de feeds antes de cada uno."""
+    store = cache.get_cache()
+
+    def request():
+        if not warm:
+            store.clear()
+        return client.get(url, params)
+
+    response = request()  # calentamiento (imports, compilación de serializers)
+    timings = []
+    with querybudget.record() as profiles:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        request()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'queries': max((profile.queries for profile in profiles), default=0),
+        'db_ms': round(statistics.median([profile.db_time * 1000 for profile in profiles] or [0]), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(catalog, repeat=20, warm=False, only=None, progress=None):
+    """Corre los escenarios (los que contienen ``only``) y devuelve el JSON de resultados."""
+    results = {}
+    # Perfiles siempre activos y sin logs muestreados durante la corrida
+    with override_settings(QUERY_BUDGET={'ENABLED': True, 'SAMPLE_RATE': 0.0},
+                           ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, user, url, params in scenarios(catalog):
+            if only and only not in name:
+                continue
+            client = APIClient()
+            if user is not None:
+                client.force_authenticate(user=user)
+            results[name] = measure(client, url, params, repeat=repeat, warm=warm)
+            if progress:
+                progress(name, results[name])
+    get_view_counter().reset()
+    return {
+        'meta': {
+            'size': catalog.size,
+            'seed': catalog.seed,
+            'repeat': repeat,
+            'warm': warm,
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'created_at': timezone.now().isoformat(timespec='seconds'),
+        },
+        'scenarios': results,
+    }
+
+
+def throughput_scenarios(catalog):
+    """``[(nombre, usuario, ruta)]``; cada ruta se sirve bajo ``/api/`` y ``/api/async/``."""
+    result = [
+        ('list', None, 'properties/'),
+        ('list.agent', catalog.agent, 'properties/'),
+        ('detail', None, f'properties/{catalog.property.slug}/'),
+        ('stats', None, 'properties/stats/'),
+    ]
+    result += [(f'feed.{feed}', None, f'properties/{feed}/') for feed in FEEDS]
+    return result
+
+
+def _split(total, workers):
+    return [total // workers + (i < total % workers) for i in range(workers)]
+
+
+def _burst_metrics(timings, statuses, elapsed):
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'errors': sum(code >= 400 for code in statuses),
+    }
+
+
+def wsgi_burst(path, headers, concurrency, requests):
+    """``requests`` GET por ``WSGIHandler`` desde ``concurrency`` hilos."""
+    app = get_wsgi_application()
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        **{f'HTTP_{name.upper().replace("-", "_")}': value for name, value in headers.items()},
+    }
+
+    def worker(count):
+        timings, statuses = [], []
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = app({**environ, 'wsgi.input': io.BytesIO()},
+                               lambda status, headers: statuses.append(int(status[:3])))
+                b''.join(response)
+                response.close()  # request_finished, como un servidor WSGI
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return timings, statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        chunks = list(pool.map(worker, _split(requests, concurrency)))
+    elapsed = time.perf_counter() - start
+    return _burst_metrics([t for timings, _ in chunks for t in timings],
+                          [s for _, statuses in chunks for s in statuses], elapsed)
+
+
+async def asgi_burst(path, headers, concurrency, requests):
+    """``requests`` GET por ``ASGIHandler`` con ``concurrency`` en vuelo."""
+    app = get_asgi_application()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+    }
+
+    async def request(statuses):
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                await asyncio.Event().wait()  # sin desconexión: Django cancela la espera
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await app(scope, receive, send)
+
+    async def worker(count):
+        timings, statuses = [], []
+        for _ in range(count):
+            start = time.perf_counter()
+            await request(statuses)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, statuses
+
+    start = time.perf_counter()
+    chunks = await asyncio.gather(*(worker(count) for count in _split(requests, concurrency)))
+    elapsed = time.perf_counter() - start
+    return _burst_metrics([t for timings, _ in chunks for t in timings],
+                          [s for _, statuses in chunks for s in statuses], elapsed)
+
+
+def throughput(catalog, concurrency=8, requests=200, only=None, progress=None):
+    """Throughput WSGI contra ASGI por escenario de ``throughput_scenarios``.
+
+    Cada hilo/request usa su propia conexión: el catálogo tiene que estar
+    confirmado (no sirve dentro de la transacción de ``run``). El caché de
+    feeds se vacía antes de cada ráfaga; los feeds y el listado anónimo se
+    sirven del caché después de los primeros requests.
+    """
+    results = {}
+    with override_settings(QUERY_BUDGET={'ENABLED': True, 'SAMPLE_RATE': 0.0},
+                           ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, user, path in throughput_scenarios(catalog):
+            if only and only not in name:
+                continue
+            headers = {}
+            if user is not None:
+                headers['Authorization'] = f'Bearer {AccessToken.for_user(user)}'
+            cache.get_cache().clear()
+            wsgi = wsgi_burst(f'/api/{path}', headers, concurrency, requests)
+            cache.get_cache().clear()
+            asgi = asyncio.run(asgi_burst(f'/api/async/{path}', headers, concurrency, requests))
+            results[name] = {'wsgi': wsgi, 'asgi': asgi,
+                             'speedup': round(asgi['rps'] / wsgi['rps'], 2)}
+            if progress:
+                progress(name, results[name])
+    get_view_counter().reset()
+    return {'concurrency': concurrency, 'requests': requests, 'scenarios': results}
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Regresiones de ``current`` contra ``baseline``.
+
+    Cuenta como regresión cualquier query de más, y un p50/p95 o una memoria
+    pico que crezca más de ``threshold`` (y más que el ruido absoluto).
+    """
+    regressions = []
+
+    def flag(name, metric, before, after):
+        regressions.append({'scenario': name, 'metric': metric,
+                            'baseline': before, 'current': after})
+
+    for name, after in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        if after['status'] != before['status']:
+            flag(name, 'status', before['status'], after['status'])
+        if after['queries'] > before['queries']:
+            flag(name, 'queries', before['queries'], after['queries'])
+        for metric, noise in (('p50_ms', MIN_MS), ('p95_ms', MIN_MS), ('peak_kb', MIN_KB)):
+            if (after[metric] > before[metric] * (1 + threshold)
+                    and after[metric] - before[metric] >= noise):
+                flag(name, metric, before[metric], after[metric])
+    return regressions
+
+
+def mismatched_meta(baseline, current):
+    """Parámetros de corrida que hacen las dos mediciones poco comparables."""
+    return [key for key in ('size', 'seed', 'warm', 'database')
+            if baseline['meta'].get(key) != current['meta'].get(key)]
+
+
+def format_result(name, metrics):
+    return (f'{name:32} p50={metrics["p50_ms"]:8.1f}ms p95={metrics["p95_ms"]:8.1f}ms '
+            f'queries={metrics["queries"]:3} db={metrics["db_ms"]:7.1f}ms '
+            f'peak={metrics["peak_kb"]:8.1f}KB')
+
+
+def format_throughput(name, result):
+    wsgi, asgi = result['wsgi'], result['asgi']
+    return (f'{name:32} wsgi={wsgi["rps"]:8.1f}/s asgi={asgi["rps"]:8.1f}/s '
+            f'x{result["speedup"]:.2f} p95 {wsgi["p95_ms"]:.1f}/{asgi["p95_ms"]:.1f}ms '
+            f'errores {wsgi["errors"]}/{asgi["errors"]}')
+
+
+def format_regression(regression):
+    return (f'{regression["scenario"]} {regression["metric"]}: '
+            f'{regression["baseline"]} -> {regression["current"]}')
+
+
+def default_output(size):
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    return f'benchmark-{size}-{stamp}.json'
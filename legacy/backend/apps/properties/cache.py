@@ -0,0 +1,252 @@
+"""Caché de respuestas para los feeds curados y los listados anónimos.
+
+Las entradas viven en el alias de caché ``feeds`` (LRU acotado: LocMemCache
+con ``MAX_ENTRIES`` en dev, Redis/Memcached compartido en producción) y se
+indexan por acción + query string + clase de visibilidad del usuario.
+
+La invalidación es por etiquetas versionadas: cada entrada guarda la versión
+de las etiquetas de las que depende (propiedades, agentes, categorías y tags
+que contiene, más el "scope" de la acción) y deja de ser válida en cuanto
+alguna cambia desde ``signals.py``. El ``TIMEOUT`` del alias acota lo que
+dura una entrada cuando la invalidación no llega (caché por proceso e
+invalidaciones desde otro proceso; ver ``checks.py``). Las versiones son el
+instante (ns) del último cambio: ``conditional`` arma con ellas el ``ETag``
+y el ``Last-Modified`` de listados y feeds.
+"""
+import functools
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+CACHE_ALIAS = 'feeds'
+# Etiqueta extra para feeds cuyo orden depende de views_count
+VIEWS_TAG = 'views'
+# Listados con ?search=: dependen del texto de tags y categorías
+SEARCH_TAG = 'search'
+# Conteos del árbol de categorías (apps.categories.tree), que se serializan
+# con cada categoría
+CATEGORY_TREE_TAG = 'categories'
+# Contadores de consultas (apps.inquiries.counters)
+INQUIRIES_TAG = 'inquiries'
+# ?ordering= por contadores que cambian sin pasar por Property.save()
+ORDERING_TAGS = {
+    'views_count': VIEWS_TAG,
+    'inquiry_count': INQUIRIES_TAG,
+    'inquiries_new': INQUIRIES_TAG,
+    'inquiries_contacted': INQUIRIES_TAG,
+    'inquiries_qualified': INQUIRIES_TAG,
+    'inquiries_closed': INQUIRIES_TAG,
+}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def visibility_class(user):
+    """anonymous / agent:<id> / admin (mismo criterio que get_queryset)."""
+    if user.is_authenticated and user.role == 'admin':
+        return 'admin'
+    if user.is_authenticated and user.role == 'agent':
+        # Un agente ve además sus propios borradores
+        return f'agent:{user.pk}'
+    return 'anonymous'
+
+
+def caches_data(request, anonymous_only):
+    """¿Se guarda la respuesta o solo sus versiones? (``cached_feed``)"""
+    return not anonymous_only or visibility_class(request.user) == 'anonymous'
+
+
+def scope_tags(action, visibility):
+    if visibility == 'admin':
+        return [f'scope:{action}:admin']
+    tags = [f'scope:{action}:public']
+    if visibility.startswith('agent:'):
+        tags.append(f'scope:{action}:{visibility}')
+    return tags
+
+
+def property_scope_tags(state):
+    """Scopes cuyo contenido puede cambiar por una propiedad en ``state``.
+
+    ``state`` es un dict con status, is_available, is_featured, operation y
+    agent_id (antes o después de guardar).
+    """
+    actions = ['list', 'trending', 'recent']
+    if state['is_featured']:
+        actions.append('featured')
+    actions.append('for_sale' if state['operation'] == 'sale' else 'for_rent')
+    is_public = state['status'] == 'published' and state['is_available']
+    tags = []
+    for action in actions:
+        tags += [f'scope:{action}:admin', f'scope:{action}:agent:{state["agent_id"]}']
+        if is_public:
+            tags.append(f'scope:{action}:public')
+    return tags
+
+
+def dependency_tags(items):
+    """Etiquetas de los objetos incluidos en un payload de PropertyListSerializer."""
+    tags = set()
+
+    def add_category(category):
+        tags.add(f'category:{category["id"]}')
+        for child in category.get('children') or []:
+            add_category(child)
+
+    for item in items:
+        tags.add(f'property:{item["id"]}')
+        # Las visitas volcadas se invalidan aparte (el detalle usa las vivas)
+        tags.add(f'views:{item["id"]}')
+        if item.get('agent'):
+            tags.add(f'user:{item["agent"]["id"]}')
+        if item.get('category'):
+            tags.add(CATEGORY_TREE_TAG)
+            add_category(item['category'])
+        for tag in item.get('tags') or []:
+            tags.add(f'tag:{tag["id"]}')
+    return tags
+
+
+def detail_tags(row):
+    """Etiquetas de un detalle: la propiedad, su agente y su categoría.
+
+    ``row`` trae pk, agent_id y category_id (``conditional.detail_row``).
+    """
+    tags = [f'property:{row["pk"]}', f'user:{row["agent_id"]}']
+    if row['category_id']:
+        tags += [f'category:{row["category_id"]}', CATEGORY_TREE_TAG]
+    return tags
+
+
+def _version_key(tag):
+    return f'v:{tag}'
+
+
+def get_versions(tags):
+    cache = get_cache()
+    keys = {tag: _version_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    missing = {key: time.time_ns() for key in keys.values() if key not in found}
+    if missing:
+        # Versión nueva (no 0/1) para que una etiqueta expulsada por LRU y
+        # recreada nunca coincida con la de una entrada vieja
+        cache.set_many(missing)
+        found.update(missing)
+    return {tag: found[key] for tag, key in keys.items()}
+
+
+def invalidate(tags):
+    # Versión = instante del cambio (sirve de Last-Modified); dos cambios
+    # concurrentes escriben versiones distintas de la anterior igual
+    now = time.time_ns()
+    get_cache().set_many({_version_key(tag): now for tag in set(tags)})
+
+
+def make_key(request, action, visibility):
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha1(
+        f'{request.get_host()}|{query}'.encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'feed:{action}:{visibility}:{digest}'
+
+
+def scope_versions(request, action, visibility):
+    """Versiones de lo que define el contenido de ``action`` para el request."""
+    scopes = scope_tags(action, visibility)
+    if action == 'trending':
+        scopes.append(VIEWS_TAG)
+    if request.query_params.get('search'):
+        scopes.append(SEARCH_TAG)
+    for field in request.query_params.get('ordering', '').split(','):
+        tag = ORDERING_TAGS.get(field.strip().lstrip('-'))
+        if tag and tag not in scopes:
+            scopes.append(tag)
+    return get_versions(scopes)
+
+
+def _current_entry(key):
+    entry = get_cache().get(key)
+    if entry is not None and get_versions(entry['versions']) == entry['versions']:
+        return entry
+    return None
+
+
+def current_versions(request, action):
+    """Versiones de la última respuesta de ``action`` para el request, si siguen vigentes.
+
+    Sirven para los validadores de ``conditional`` sin correr la vista.
+    """
+    entry = _current_entry(make_key(request, action, visibility_class(request.user)))
+    return entry['versions'] if entry is not None else None
+
+
+def lookup(request, action):
+    """``(key, data, versions)`` de la entrada de ``action`` para este request.
+
+    ``data`` es ``None`` si no hay entrada vigente o si solo se guardaron las
+    versiones (visibilidad que no se cachea); en ese caso ``versions`` son las
+    del scope, leídas antes de consultar (si algo cambia mientras se arma la
+    respuesta, la entrada nace ya invalidada).
+    """
+    visibility = visibility_class(request.user)
+    key = make_key(request, action, visibility)
+    entry = _current_entry(key)
+    if entry is not None and 'data' in entry:
+        return key, entry['data'], entry['versions']
+    return key, None, scope_versions(request, action, visibility)
+
+
+def hit(data):
+    return Response(data, headers={'X-Cache': 'HIT'})
+
+
+def page_versions(versions, response):
+    """``versions`` más las de los objetos que contiene la respuesta."""
+    data = response.data
+    items = data['results'] if isinstance(data, dict) else data
+    return {**versions, **get_versions(dependency_tags(items) - set(versions))}
+
+
+def store(key, versions, response, with_data=True):
+    """Guarda la respuesta (200) con ``versions`` (``page_versions``).
+
+    Sin ``with_data`` se guardan solo las versiones, para ``current_versions``.
+    """
+    entry = {'versions': versions}
+    if with_data:
+        entry['data'] = response.data
+        response['X-Cache'] = 'MISS'
+    get_cache().set(key, entry)
+
+
+def cached_feed(anonymous_only=False):
+    """Cachea la respuesta de una acción de PropertyViewSet.
+
+    Con ``anonymous_only`` solo se cachea la clase anónima (anónimos y
+    clientes ven lo mismo); se usa para el listado. Del resto quedan las
+    versiones. La respuesta lleva en ``cache_versions`` las versiones de lo
+    que contiene (para ``conditional``).
+    """
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            key, data, versions = lookup(request, self.action)
+            if data is not None:
+                response = hit(data)
+            else:
+                response = view_func(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                versions = page_versions(versions, response)
+                store(key, versions, response, caches_data(request, anonymous_only))
+            response.cache_versions = versions
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,28 @@
+"""Checks de configuración de la caché de feeds."""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from . import cache
+
+LOCAL_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register()
+def check_shared_feeds_cache(app_configs, **kwargs):
+    """Con el worker de consultas activo, ``feeds`` tiene que ser compartido.
+
+    El worker (``process_inquiries``), ``update_trending`` e
+    ``import_properties`` invalidan desde otro proceso: con un caché por
+    proceso los workers web no se enteran y sirven páginas viejas hasta el
+    ``TIMEOUT`` del alias.
+    """
+    backend = settings.CACHES[cache.CACHE_ALIAS]['BACKEND']
+    if backend != LOCAL_BACKEND or not settings.INQUIRY_QUEUE['ASYNC']:
+        return []
+    return [Warning(
+        f'La caché "{cache.CACHE_ALIAS}" es por proceso ({backend}): las '
+        'invalidaciones de process_inquiries, update_trending e import_properties '
+        'no llegan a los workers web.',
+        hint='Configurar FEEDS_CACHE_BACKEND con un backend compartido (Redis/Memcached).',
+        id='properties.W001',
+    )]
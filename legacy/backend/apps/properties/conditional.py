@@ -0,0 +1,150 @@
+"""GET condicional (``ETag`` / ``Last-Modified``) para listado, detalle y feeds.
+
+Listado y feeds: los validadores salen de las versiones de etiquetas de
+``cache`` que deja ``cached_feed`` en la respuesta (scope de la acción por
+visibilidad, más propiedades, agentes, categorías y tags de la página
+servida). Cualquier alta, cambio, baja o cambio de visibilidad de una
+propiedad mueve la versión de su scope. Las versiones quedan guardadas con
+cada respuesta (también las de visibilidades que no se cachean), así que
+una revalidación vigente se responde 304 sin consultar la base.
+
+Detalle: una query por la fila (``updated_at``, agente y categoría) más las
+visitas vivas (persistidas + pendientes), y las versiones de la propiedad
+(tags, contadores de consultas, imágenes), su agente y su categoría
+(``cache.detail_tags``). Las visitas volcadas no cambian el detalle: en los
+listados van por ``views:<pk>`` de cada fila servida.
+
+El ``ETag`` (fuerte) es el hash de todo eso más la acción, la clase de
+visibilidad (``cache.visibility_class``), el host y el query string.
+``Last-Modified`` es el cambio más reciente (las versiones son instantes),
+con resolución de segundos: el validador preciso es el ``ETag``.
+"""
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import cache
+
+
+def _validators(request, action, parts, last):
+    payload = repr((
+        action, cache.visibility_class(request.user), request.get_host(),
+        sorted(request.query_params.lists()), parts,
+    ))
+    digest = hashlib.sha1(payload.encode(), usedforsecurity=False).hexdigest()
+    # Resolución de segundos, como el header
+    return f'"{digest}"', int(last)
+
+
+def validators(request, action, versions):
+    """``(etag, last_modified)`` de una respuesta con ``versions`` (``cache``)."""
+    last = max(versions.values(), default=0) / 1e9
+    return _validators(request, action, sorted(versions.items()), last)
+
+
+def detail_validators(request, action, row, views):
+    """Validadores del detalle de ``row`` (``detail_row``) con ``views`` visitas."""
+    versions = cache.get_versions(cache.detail_tags(row))
+    updated_at = row['updated_at'].timestamp()
+    last = max(updated_at, *(version / 1e9 for version in versions.values()))
+    return _validators(request, action, (updated_at, views, sorted(versions.items())), last)
+
+
+def has_validators(request):
+    """El cliente revalida (``If-None-Match``/``If-Modified-Since``)."""
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+DETAIL_FIELDS = ('pk', 'agent_id', 'category_id', 'views_count', 'updated_at')
+
+
+def detail_row(view, lookup):
+    """Lo que usan los validadores del detalle, sin cargar la propiedad."""
+    return view.get_queryset().filter(**{view.lookup_field: lookup}).order_by().values(
+        *DETAIL_FIELDS,
+    ).first()
+
+
+def set_headers(response, request, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Authorization'])
+    # Revalidar siempre; lo autenticado no se comparte en CDN
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+
+
+def not_modified(request, action):
+    """304 de listado/feed si el cliente tiene la versión vigente, sin correr la vista.
+
+    Los validadores salen de las versiones guardadas con la última respuesta
+    (``cache.current_versions``); si no hay o cambiaron, ``None``.
+    """
+    if not has_validators(request):
+        return None
+    versions = cache.current_versions(request, action)
+    if versions is None:
+        return None
+    etag, last_modified = validators(request, action, versions)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_headers(response, request, etag, last_modified)
+    return response
+
+
+def finish(request, action, response, versions):
+    """La respuesta (o un 304) con los validadores de ``versions``."""
+    etag, last_modified = validators(request, action, versions)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        response = not_modified
+    set_headers(response, request, etag, last_modified)
+    return response
+
+
+def conditional(detail=False):
+    """Agrega validadores a una acción GET de PropertyViewSet y responde 304.
+
+    Listado y feeds: va por fuera de ``cached_feed``; responde 304 antes de la
+    vista con las versiones guardadas (``not_modified``) y si no, usa las de
+    la respuesta (``cache_versions``).
+    ``detail``: solo la propiedad de la URL, con validadores calculados antes
+    de cargarla; cuenta la visita antes porque ``views_count`` es parte del
+    cuerpo y le pasa a la vista las pendientes (``pending_views``).
+    """
+
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(self, request, *args, **kwargs):
+            if not detail:
+                response = not_modified(request, self.action)
+                if response is not None:
+                    return response
+                response = view_func(self, request, *args, **kwargs)
+                versions = getattr(response, 'cache_versions', None)
+                if response.status_code != 200 or versions is None:
+                    return response
+                return finish(request, self.action, response, versions)
+
+            row = detail_row(self, kwargs[self.lookup_field])
+            if row is None:
+                return view_func(self, request, *args, **kwargs)  # 404
+            pending = self.record_view(request, row['pk'], row['agent_id'])
+            etag, last_modified = detail_validators(
+                request, self.action, row, row['views_count'] + pending)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                # La visita ya está contada: la vista solo suma las pendientes
+                response = view_func(self, request, *args, pending_views=pending, **kwargs)
+                if response.status_code != 200:
+                    return response
+            set_headers(response, request, etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
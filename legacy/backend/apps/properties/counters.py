@@ -0,0 +1,263 @@
+"""Contador de visitas con buffer y flush por lotes.
+
+``PropertyViewSet.retrieve`` ya no hace un ``UPDATE`` + ``refresh_from_db``
+por visita: los incrementos se acumulan en un store (memoria del proceso o
+la caché de Django, compartida entre workers) y se vuelcan en un único
+``UPDATE ... CASE`` cada ``FLUSH_INTERVAL`` segundos o al llegar a
+``FLUSH_THRESHOLD`` visitas pendientes. Al terminar el worker (``atexit``)
+se vuelca lo pendiente. Cada lote se suma también a los buckets por hora
+de ``apps.properties.trending``.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+
+# Enviada tras cada flush con ``property_ids`` (los UPDATE no emiten post_save)
+view_counts_flushed = Signal()
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'STORE': 'apps.properties.counters.MemoryViewStore',
+    'FLUSH_INTERVAL': 30,
+    'FLUSH_THRESHOLD': 100,
+    'DEDUPE_WINDOW': 30 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PROPERTY_VIEW_COUNTER', {})}
+
+
+def client_key(request):
+    """Identifica al visitante: usuario autenticado o IP + user agent."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    ip = forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    digest = hashlib.blake2b(f'{ip}|{agent}'.encode(), digest_size=12)
+    return f'anon:{digest.hexdigest()}'
+
+
+class MemoryViewStore:
+    """Store en memoria del proceso (un buffer por worker).
+
+    Las visitas vistas se guardan en orden de vencimiento (la ventana es
+    fija): cada visita expulsa solo las vencidas del principio. Pasadas
+    ``max_seen`` se expulsan las más viejas aunque no hayan vencido.
+    """
+    max_seen = 100_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._seen = OrderedDict()
+
+    def first_view(self, property_id, client, window):
+        key = (property_id, client)
+        now = time.monotonic()
+        with self._lock:
+            while self._seen:
+                oldest, expires = next(iter(self._seen.items()))
+                if expires > now and len(self._seen) < self.max_seen:
+                    break
+                del self._seen[oldest]
+            if self._seen.get(key, 0) > now:
+                return False
+            self._seen[key] = now + window
+            self._seen.move_to_end(key)
+            return True
+
+    def incr(self, property_id, amount=1):
+        with self._lock:
+            self._pending[property_id] = self._pending.get(property_id, 0) + amount
+            return sum(self._pending.values())
+
+    def pending(self, property_id):
+        return self._pending.get(property_id, 0)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._seen.clear()
+
+
+class CacheViewStore:
+    """Store sobre la caché de Django (p. ej. Redis) compartido entre workers.
+
+    Los contadores viven en la caché; cada proceso solo recuerda qué
+    propiedades tocó (y el último valor que vio de cada una) para saber qué
+    claves drenar y cuántas visitas hay pendientes.
+
+    Drenar es atómico por clave aunque varios workers drenen la misma: cada
+    uno hace ``decr`` por lo que leyó y solo se lleva lo que el resultado
+    prueba que había; si el contador quedó negativo (otro se llevó parte),
+    devuelve la diferencia.
+    """
+    prefix = 'property-views'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = {}
+
+    def _key(self, property_id):
+        return f'{self.prefix}:pending:{property_id}'
+
+    def first_view(self, property_id, client, window):
+        return cache.add(f'{self.prefix}:seen:{property_id}:{client}', 1, window)
+
+    @staticmethod
+    def _add(key, amount):
+        """Suma ``amount`` a ``key`` (creándola si no existe); devuelve el valor nuevo."""
+        if cache.add(key, amount, None):
+            return amount
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            # Expulsada entre el add y el incr
+            cache.add(key, amount, None)
+            return amount
+
+    def incr(self, property_id, amount=1):
+        value = self._add(self._key(property_id), amount)
+        with self._lock:
+            self._dirty[property_id] = value
+            # Visitas pendientes (las de otros workers, hasta donde se vieron)
+            return sum(self._dirty.values())
+
+    def pending(self, property_id):
+        return cache.get(self._key(property_id), 0)
+
+    def drain(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        values = cache.get_many([self._key(pk) for pk in dirty])
+        pending = {}
+        for pk in dirty:
+            key = self._key(pk)
+            amount = values.get(key, 0)
+            if amount <= 0:
+                continue
+            try:
+                # decr (y no delete) para no perder visitas de otros workers
+                remaining = cache.decr(key, amount)
+            except ValueError:
+                continue  # expulsada: no hay nada que llevarse
+            taken = min(amount, max(amount + remaining, 0))
+            if taken < amount:
+                # Otro worker drenó en el medio: devolver lo que no había
+                self._add(key, amount - taken)
+            if taken:
+                pending[pk] = taken
+        return pending
+
+    def clear(self):
+        with self._lock:
+            self._dirty.clear()
+
+
+class ViewCounter:
+
+    def __init__(self, store, flush_interval, flush_threshold, dedupe_window):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.dedupe_window = dedupe_window
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_config()
+        return cls(
+            store=import_string(config['STORE'])(),
+            flush_interval=config['FLUSH_INTERVAL'],
+            flush_threshold=config['FLUSH_THRESHOLD'],
+            dedupe_window=config['DEDUPE_WINDOW'],
+        )
+
+    def record(self, property_id, client):
+        """Registra una visita; devuelve False si es repetida en la ventana."""
+        if not self.store.first_view(property_id, client, self.dedupe_window):
+            return False
+        pending = self.store.incr(property_id)
+        if (pending >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        return True
+
+    def pending(self, property_id):
+        return self.store.pending(property_id)
+
+    def flush(self):
+        """Vuelca los incrementos pendientes en un único UPDATE.
+
+        Devuelve las visitas volcadas. Si el UPDATE falla las deja pendientes
+        y lo registra en el log, sin propagar el error.
+        """
+        from . import trending
+        from .models import Property
+
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            pending = self.store.drain()
+            if not pending:
+                return 0
+            increment = Case(
+                *[When(pk=pk, then=Value(amount)) for pk, amount in pending.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            try:
+                Property.objects.filter(pk__in=pending).update(
+                    views_count=F('views_count') + increment
+                )
+            except Exception:
+                # Devolver al buffer para reintentar en el próximo flush; el
+                # request que lo disparó no tiene por qué fallar
+                logger.exception('No se pudieron volcar las visitas; se reintenta en el próximo flush')
+                for pk, amount in pending.items():
+                    self.store.incr(pk, amount)
+                return 0
+            try:
+                with transaction.atomic():
+                    trending.record_views(pending)
+            except Exception:
+                # views_count ya está guardado: reintentar lo duplicaría
+                logger.exception('No se pudieron registrar las visitas para trending')
+            view_counts_flushed.send(sender=self.__class__, property_ids=list(pending))
+            return sum(pending.values())
+
+    def reset(self):
+        self.store.clear()
+        self._last_flush = time.monotonic()
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = ViewCounter.from_settings()
+                atexit.register(_counter.flush)
+    return _counter
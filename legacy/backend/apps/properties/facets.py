@@ -0,0 +1,97 @@
+"""Conteos por faceta para ``/properties/search/``.
+
+Cada faceta cuenta sobre los resultados con *todos los filtros menos el
+suyo* (así la UI puede mostrar "Venta (120) / Alquiler (45)" con Venta ya
+seleccionado). Todas las facetas salen en una sola query: un ``UNION ALL``
+de un ``GROUP BY`` por faceta, de modo que la base devuelve solo conteos.
+
+Los rangos de precio dependen de la operación (venta y alquiler no se
+comparan): sin ``?operation=`` la faceta ``price`` sale vacía.
+"""
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.db.models.functions import Cast
+
+from .filters import PropertyFilterSet
+
+PRICE_BUCKETS = {
+    'sale': [0, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000],
+    'rent': [0, 5_000, 10_000, 20_000, 40_000, 80_000],
+}
+MAX_VALUES = 20  # por faceta (ciudades y tags pueden ser muchas)
+INTEGER_FACETS = {'rooms', 'bathrooms', 'category'}
+
+
+def _price_bucket(edges):
+    whens = []
+    for low, high in zip(edges, edges[1:]):
+        whens.append(When(price__gte=low, price__lt=high, then=Value(f'{low}-{high}')))
+    return Case(*whens, default=Value(f'{edges[-1]}+'), output_field=CharField())
+
+
+def _text(field):
+    return Cast(F(field), output_field=CharField())
+
+
+def facet_definitions(operation=None):
+    """{faceta: (valor, etiqueta, parámetros de filtro que ignora)}.
+
+    ``price`` solo con una ``operation`` conocida.
+    """
+    blank = Value('', output_field=CharField())
+    definitions = {
+        'operation': (_text('operation'), blank, ['operation']),
+        'property_type': (_text('property_type'), blank, ['property_type']),
+        'city': (_text('city'), blank, ['city']),
+        'rooms': (_text('rooms'), blank, ['rooms', 'rooms_min']),
+        'bathrooms': (_text('bathrooms'), blank, ['bathrooms', 'bathrooms_min']),
+        'category': (_text('category_id'), _text('category__name'),
+                     ['category', 'category_tree']),
+        'tag': (_text('tags__slug'), _text('tags__name'), ['tag']),
+    }
+    if operation in PRICE_BUCKETS:
+        definitions['price'] = (_price_bucket(PRICE_BUCKETS[operation]), blank,
+                                ['price_min', 'price_max'])
+    return definitions
+
+
+def _without(params, names):
+    data = params.copy()
+    for name in names:
+        data.pop(name, None)
+    return data
+
+
+def facet_counts(base_queryset, params):
+    """Conteos de todas las facetas en una query.
+
+    ``base_queryset`` ya debe tener aplicada la visibilidad, la búsqueda y
+    los filtros geográficos; aquí se aplica ``PropertyFilterSet`` sin el
+    filtro propio de cada faceta.
+    """
+    definitions = facet_definitions(params.get('operation'))
+    parts = []
+    for name, (value, label, own_params) in definitions.items():
+        queryset = PropertyFilterSet(
+            _without(params, own_params), queryset=base_queryset,
+        ).qs.order_by()
+        parts.append(
+            queryset.values(
+                facet=Value(name, output_field=CharField()), value=value, label=label,
+            ).annotate(count=Count('id')).values_list('facet', 'value', 'label', 'count')
+        )
+    rows = parts[0].union(*parts[1:], all=True)
+
+    facets = {name: [] for name in [*definitions, 'price']}
+    for facet, value, label, count in rows:
+        if value is None:
+            continue
+        if facet in INTEGER_FACETS:
+            value = int(value)
+        entry = {'value': value, 'count': count}
+        if label:
+            entry['label'] = label
+        facets[facet].append(entry)
+    for name, entries in facets.items():
+        entries.sort(key=lambda entry: (-entry['count'], entry['value']))
+        del entries[MAX_VALUES:]
+    return facets
@@ -0,0 +1,146 @@
+"""Factories (factory-boy + faker) para tests y catálogos sintéticos.
+
+Con ``build``/``build_batch`` generan instancias sin guardar para cargarlas
+con ``bulk_create`` (ver ``apps.properties.benchmark``). La aleatoriedad sale
+de ``factory.random``: ``factory.random.reseed_random(seed)`` hace que un
+catálogo sea reproducible.
+"""
+import datetime
+
+import factory
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from factory import fuzzy
+from factory.random import randgen
+
+from apps.categories.models import Category, Tag
+from apps.inquiries.models import Inquiry
+from apps.users.models import User
+
+from .models import Property
+
+LOCALE = 'es_MX'
+# Ciudad -> (estado, latitud, longitud) del centro
+CITIES = {
+    'Puebla': ('Puebla', 19.0414, -98.2063),
+    'Toluca': ('Estado de México', 19.2826, -99.6557),
+    'Querétaro': ('Querétaro', 20.5888, -100.3899),
+    'Monterrey': ('Nuevo León', 25.6866, -100.3161),
+    'Guadalajara': ('Jalisco', 20.6597, -103.3496),
+    'Mérida': ('Yucatán', 20.9674, -89.5926),
+    'León': ('Guanajuato', 21.1250, -101.6860),
+    'Cancún': ('Quintana Roo', 21.1619, -86.8515),
+    'Oaxaca': ('Oaxaca', 17.0732, -96.7266),
+    'Morelia': ('Michoacán', 19.7060, -101.1950),
+    'Tijuana': ('Baja California', 32.5149, -117.0382),
+    'Saltillo': ('Coahuila', 25.4232, -100.9963),
+}
+TYPE_LABELS = dict(Property.PROPERTY_TYPE_CHOICES)
+
+
+def weighted(choices):
+    """Elige una clave de ``{valor: peso}`` con ``factory.random``."""
+    values = list(choices)
+    return lambda *args: randgen.choices(values, weights=list(choices.values()))[0]
+
+
+def _price(prop):
+    if prop.operation == 'rent':
+        return randgen.randint(3_000, 60_000)
+    return randgen.randrange(200_000, 12_000_000, 1_000)
+
+
+def _gps(prop):
+    _, lat, lng = CITIES[prop.city]
+    return f'{lat + randgen.uniform(-0.15, 0.15):.6f}, {lng + randgen.uniform(-0.15, 0.15):.6f}'
+
+
+def _published_at(prop):
+    if prop.status == 'draft':
+        return None
+    return timezone.now() - datetime.timedelta(seconds=randgen.uniform(0, 2 * 365 * 86400))
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'usuario{n}')
+    first_name = factory.Faker('first_name', locale=LOCALE)
+    last_name = factory.Faker('last_name', locale=LOCALE)
+    email = factory.LazyAttribute(lambda user: f'{user.username}@example.com')
+    # Sin hashear: las factories no sirven para login
+    password = factory.LazyFunction(lambda: make_password(None))
+    role = 'client'
+
+
+class AgentFactory(UserFactory):
+    username = factory.Sequence(lambda n: f'agente{n}')
+    role = 'agent'
+    company = factory.Faker('company', locale=LOCALE)
+    phone = factory.Faker('numerify', text='55########')
+
+
+class CategoryFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Category
+
+    name = factory.Sequence(lambda n: f'Categoría {n}')
+    description = factory.Faker('sentence', locale=LOCALE)
+
+
+class TagFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Tag
+
+    name = factory.Sequence(lambda n: f'Etiqueta {n}')
+
+
+class PropertyFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Property
+
+    property_type = fuzzy.FuzzyChoice(TYPE_LABELS)
+    city = fuzzy.FuzzyChoice(CITIES)
+    title = factory.LazyAttribute(
+        lambda prop: f'{TYPE_LABELS[prop.property_type]} en {prop.street}, {prop.city}'
+    )
+    description = factory.Faker('paragraph', nb_sentences=6, locale=LOCALE)
+    operation = factory.LazyFunction(weighted({'sale': 7, 'rent': 3}))
+    price = factory.LazyAttribute(_price)
+    address = factory.LazyAttribute(
+        lambda prop: f'{prop.street} {randgen.randint(1, 999)}, Col. {prop.neighborhood}'
+    )
+    state = factory.LazyAttribute(lambda prop: CITIES[prop.city][0])
+    gps_location = factory.LazyAttribute(_gps)
+    area = fuzzy.FuzzyInteger(40, 600)
+    rooms = fuzzy.FuzzyInteger(0, 6)
+    bathrooms = fuzzy.FuzzyInteger(1, 4)
+    parking_spaces = fuzzy.FuzzyInteger(0, 3)
+    year_built = fuzzy.FuzzyInteger(1960, 2025)
+    agent = factory.SubFactory(AgentFactory)
+    status = factory.LazyFunction(weighted({'published': 85, 'draft': 10, 'sold': 3, 'rented': 2}))
+    is_featured = factory.LazyFunction(lambda: randgen.random() < 0.03)
+    views_count = factory.LazyFunction(lambda: int(randgen.paretovariate(1.2) * 20))
+    published_at = factory.LazyAttribute(_published_at)
+
+    class Params:
+        street = factory.Faker('street_name', locale=LOCALE)
+        neighborhood = factory.Faker('city', locale=LOCALE)
+
+
+class InquiryFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Inquiry
+
+    property = factory.SubFactory(PropertyFactory)
+    client = factory.SubFactory(UserFactory)
+    client_name = factory.Faker('name', locale=LOCALE)
+    client_email = factory.Faker('email', locale=LOCALE)
+    client_phone = factory.Faker('numerify', text='55########')
+    message = factory.Faker('paragraph', nb_sentences=3, locale=LOCALE)
+    status = factory.LazyFunction(weighted({'new': 50, 'contacted': 25, 'qualified': 15, 'closed': 10}))
+    is_contacted = factory.LazyAttribute(lambda inquiry: inquiry.status != 'new')
+    contacted_at = factory.LazyAttribute(
+        lambda inquiry: timezone.now() if inquiry.is_contacted else None
+    )
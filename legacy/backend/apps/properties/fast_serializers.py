@@ -0,0 +1,139 @@
+"""Serialización compilada para listados de propiedades.
+
+``PropertyListSerializer`` anida agente, categoría (con ``children``
+recursivo, una query por fila) y tags, y DRF resuelve cada campo con
+``get_attribute`` + ``to_representation`` por instancia. Aquí el serializer
+se "compila" una vez por respuesta en una lista de pasos ``(nombre,
+lector, conversor)``:
+
+* campos simples (texto, enteros, floats, booleanos, choices) se convierten
+  en línea, sin pasar por el campo DRF;
+* decimales, fechas e imágenes reutilizan el ``to_representation`` del campo
+  (formato, zona horaria y URL absoluta idénticos);
+* ``children`` de las categorías sale del árbol en memoria
+  (``apps.categories.tree``), sin queries por fila.
+
+La salida es idéntica a la del serializer DRF (ver ``test_fast_serializers``).
+Cualquier campo que no se reconozca cae al camino genérico de DRF.
+"""
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from apps.categories.serializers import CategorySerializer
+from apps.categories.tree import get_tree
+
+_MISSING = object()
+
+# Conversión en línea para campos cuyo to_representation es trivial
+_INLINE = {
+    serializers.CharField: str,
+    serializers.SlugField: str,
+    serializers.EmailField: str,
+    serializers.URLField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+}
+
+
+class CompiledSerializer:
+    """Versión precompilada de un ``Serializer`` ya ligado (con contexto)."""
+
+    def __init__(self, serializer, lookups):
+        self.lookups = lookups
+        self.steps = [self._compile(field) for field in serializer._readable_fields]
+
+    def __call__(self, instance):
+        ret = {}
+        for name, read, convert in self.steps:
+            value = read(instance)
+            if value is _MISSING:
+                continue
+            ret[name] = None if value is None else convert(value)
+        return ret
+
+    def _compile(self, field):
+        special = self.lookups.method_fields.get((type(field.parent), field.field_name))
+        if special is not None:
+            return field.field_name, special, _identity
+        if isinstance(field, serializers.ListSerializer):
+            child = self.lookups.compile(field.child)
+            return (field.field_name, _reader(field),
+                    lambda items: [child(item) for item in items.all()])
+        if isinstance(field, serializers.BaseSerializer):
+            return field.field_name, _reader(field), self.lookups.compile(field)
+        if type(field) is PrimaryKeyRelatedField and field.pk_field is None and not field.source_attrs[1:]:
+            attname = f'{field.source_attrs[0]}_id'
+            return field.field_name, _reader(field, attname), _identity
+        if type(field) is serializers.ChoiceField:
+            choices = field.choice_strings_to_values
+            return field.field_name, _reader(field), lambda value: choices.get(str(value), value)
+        if type(field) in _INLINE:
+            return field.field_name, _reader(field), _INLINE[type(field)]
+        if isinstance(field, serializers.SerializerMethodField):
+            return field.field_name, _generic_reader(field), field.to_representation
+        return field.field_name, _reader(field), field.to_representation
+
+
+def _identity(value):
+    return value
+
+
+def _generic_reader(field):
+    def read(instance):
+        try:
+            return field.get_attribute(instance)
+        except SkipField:
+            return _MISSING
+    return read
+
+
+def _reader(field, attname=None):
+    """Lee el atributo; si falta, aplica las reglas de DRF (default/null/skip)."""
+    if attname is None:
+        if field.source == '*' or len(field.source_attrs) != 1:
+            return _generic_reader(field)
+        attname = field.source_attrs[0]
+    fallback = _generic_reader(field)
+
+    def read(instance):
+        value = getattr(instance, attname, _MISSING)
+        if value is _MISSING:
+            return fallback(instance)
+        return value
+    return read
+
+
+class Lookups:
+    """Datos precargados para una respuesta y caché de serializers compilados."""
+
+    def __init__(self):
+        self._compiled = {}
+        self.method_fields = {
+            (CategorySerializer, 'children'): self._category_children,
+        }
+
+    def compile(self, serializer):
+        key = (type(serializer), id(serializer.context.get('request')))
+        if key not in self._compiled:
+            self._compiled[key] = CompiledSerializer(serializer, self)
+        return self._compiled[key]
+
+    def _category_children(self, category):
+        # Igual que get_children: hijas del árbol cacheado, serializer sin contexto
+        children = get_tree().children(category.pk)
+        if not children:
+            return None
+        compiled = self.compile(CategorySerializer())
+        return [compiled(child) for child in children]
+
+
+class FastPropertyListSerializer(serializers.ListSerializer):
+    """``many=True`` de ``PropertyListSerializer`` por el camino compilado."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        lookups = Lookups()
+        compiled = lookups.compile(self.child)
+        return [compiled(item) for item in items]
@@ -0,0 +1,31 @@
+import django_filters
+
+from apps.categories.tree import get_tree
+from .models import Property
+
+
+class PropertyFilterSet(django_filters.FilterSet):
+    """``filterset_fields`` históricos + rangos y tag."""
+    price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    area_min = django_filters.NumberFilter(field_name='area', lookup_expr='gte')
+    area_max = django_filters.NumberFilter(field_name='area', lookup_expr='lte')
+    rooms_min = django_filters.NumberFilter(field_name='rooms', lookup_expr='gte')
+    bathrooms_min = django_filters.NumberFilter(field_name='bathrooms', lookup_expr='gte')
+    tag = django_filters.CharFilter(field_name='tags__slug')
+    category_tree = django_filters.CharFilter(method='filter_category_tree',
+                                              label='Categoría (slug o id) y sus descendientes')
+
+    class Meta:
+        model = Property
+        fields = [
+            'operation', 'property_type', 'category', 'rooms',
+            'bathrooms', 'is_featured', 'city', 'state',
+        ]
+
+    def filter_category_tree(self, queryset, name, value):
+        category = get_tree().get(value)
+        if category is None:
+            return queryset.none()
+        # Prefijo del path materializado: un JOIN, sin recorrer el árbol
+        return queryset.filter(category__path__startswith=category.path)
@@ -0,0 +1,209 @@
+"""Búsqueda geográfica sin PostGIS.
+
+``Property.gps_location`` ("lat, lng") se parsea en ``latitude``/``longitude``
+y un geohash (``geo_cell``) indexado con B-tree. Las consultas primero
+acotan por prefijos de geohash (solo las celdas que tocan la zona) y luego
+filtran/ordenan por la distancia haversine exacta.
+
+* ``?within=min_lat,min_lng,max_lat,max_lng`` — viewport del mapa.
+* ``?near=lat,lng&radius=km`` — radio, ordenado por distancia.
+* ``nearest(queryset, lat, lng, limit)`` — los N más cercanos.
+"""
+import math
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError as APIValidationError
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_PRECISION = 9  # ~4.8m x 4.8m
+MAX_COVER_CELLS = 24
+# Celdas de ~1.2km x 0.6km como primer vecindario de nearest()
+NEAREST_START_PRECISION = 6
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 200
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def parse_point(value):
+    """"lat, lng" -> (lat, lng). ValidationError si no es un punto válido."""
+    try:
+        lat, lng = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValidationError('Formato esperado: "latitud, longitud"')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValidationError('Coordenadas fuera de rango')
+    return lat, lng
+
+
+def _bits(precision):
+    """Bits de (latitud, longitud) de un geohash de ``precision`` caracteres."""
+    total = 5 * precision
+    return total // 2, total - total // 2
+
+
+def cell_size(precision):
+    """Alto y ancho en grados de una celda."""
+    lat_bits, lng_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _encode_indexes(lat_index, lng_index, precision):
+    lat_bits, lng_bits = _bits(precision)
+    chars = []
+    value = bit_count = 0
+    lat_pos, lng_pos = lat_bits, lng_bits
+    for i in range(5 * precision):
+        # Geohash intercala bits empezando por la longitud
+        if i % 2 == 0:
+            lng_pos -= 1
+            bit = (lng_index >> lng_pos) & 1
+        else:
+            lat_pos -= 1
+            bit = (lat_index >> lat_pos) & 1
+        value = (value << 1) | bit
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[value])
+            value = bit_count = 0
+    return ''.join(chars)
+
+
+def _indexes(lat, lng, precision):
+    lat_bits, lng_bits = _bits(precision)
+    lat_index = min(int((lat + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    lng_index = min(int((lng + 180.0) / 360.0 * (1 << lng_bits)), (1 << lng_bits) - 1)
+    return lat_index, lng_index
+
+
+def encode(lat, lng, precision=CELL_PRECISION):
+    return _encode_indexes(*_indexes(lat, lng, precision), precision)
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """Prefijos de geohash que cubren el rectángulo (a lo sumo ``max_cells``).
+
+    Usa la mayor precisión con la que alcanzan ``max_cells`` celdas, así un
+    viewport chico toca pocas celdas chicas. Lista vacía = sin restricción.
+    """
+    for precision in range(CELL_PRECISION, 0, -1):
+        south, west = _indexes(min_lat, min_lng, precision)
+        north, east = _indexes(max_lat, max_lng, precision)
+        if (north - south + 1) * (east - west + 1) <= max_cells:
+            return [
+                _encode_indexes(lat_index, lng_index, precision)
+                for lat_index in range(south, north + 1)
+                for lng_index in range(west, east + 1)
+            ]
+    return []
+
+
+def radius_bbox(lat, lng, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    coslat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(math.degrees(radius_km / (EARTH_RADIUS_KM * coslat)), 180.0)
+    return (max(lat - dlat, -90.0), max(lng - dlng, -180.0),
+            min(lat + dlat, 90.0), min(lng + dlng, 180.0))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+         * math.sin(dlng / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def distance_expression(lat, lng):
+    """Distancia haversine en km desde (lat, lng) como expresión SQL."""
+    lat_rad = Radians(F('latitude'))
+    half_dlat = (lat_rad - Value(math.radians(lat))) / 2
+    half_dlng = (Radians(F('longitude')) - Value(math.radians(lng))) / 2
+    a = (Power(Sin(half_dlat), 2)
+         + Value(math.cos(math.radians(lat))) * Cos(lat_rad) * Power(Sin(half_dlng), 2))
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a))
+
+
+def cells_filter(prefixes):
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(geo_cell__startswith=prefix)
+    return condition
+
+
+def within(queryset, min_lat, min_lng, max_lat, max_lng):
+    return queryset.filter(
+        cells_filter(cover(min_lat, min_lng, max_lat, max_lng)),
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+def near(queryset, lat, lng, radius_km):
+    """Propiedades a ``radius_km`` o menos, anotadas con ``distance`` (km)."""
+    return within(queryset, *radius_bbox(lat, lng, radius_km)).annotate(
+        distance=distance_expression(lat, lng),
+    ).filter(distance__lte=radius_km).order_by('distance', 'id')
+
+
+def nearest(queryset, lat, lng, limit=10):
+    """Los ``limit`` más cercanos, ampliando el vecindario de celdas.
+
+    El bloque de 3x3 celdas alrededor del punto garantiza cubrir al menos una
+    celda de distancia; si el N-ésimo resultado queda más lejos se repite con
+    celdas más grandes.
+    """
+    located = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+    for precision in range(NEAREST_START_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        lat_bits, lng_bits = _bits(precision)
+        lat_index, lng_index = _indexes(lat, lng, precision)
+        prefixes = {
+            _encode_indexes(lat_index + dlat, (lng_index + dlng) % (1 << lng_bits), precision)
+            for dlat in (-1, 0, 1) for dlng in (-1, 0, 1)
+            if 0 <= lat_index + dlat < (1 << lat_bits)
+        }
+        candidates = located.filter(cells_filter(prefixes)).annotate(
+            distance=distance_expression(lat, lng),
+        ).order_by('distance', 'id')
+        results = list(candidates[:limit])
+        safe_km = min(height * 111.0, width * 111.0 * math.cos(math.radians(lat)))
+        if len(results) == limit and results[-1].distance <= safe_km:
+            return results
+    return list(located.annotate(
+        distance=distance_expression(lat, lng),
+    ).order_by('distance', 'id')[:limit])
+
+
+def _floats(raw, count, param):
+    try:
+        values = [float(part) for part in raw.split(',')]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise APIValidationError({param: f'Se esperaban {count} números separados por coma'})
+    return values
+
+
+class PropertyGeoFilter(filters.BaseFilterBackend):
+    """``?within=`` (bbox) y ``?near=lat,lng&radius=km``."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        if params.get('within'):
+            min_lat, min_lng, max_lat, max_lng = _floats(params['within'], 4, 'within')
+            if min_lat > max_lat or min_lng > max_lng:
+                raise APIValidationError({'within': 'Esperado min_lat,min_lng,max_lat,max_lng'})
+            queryset = within(queryset, min_lat, min_lng, max_lat, max_lng)
+        if params.get('near'):
+            lat, lng = _floats(params['near'], 2, 'near')
+            try:
+                radius = float(params.get('radius', DEFAULT_RADIUS_KM))
+            except ValueError:
+                raise APIValidationError({'radius': 'Debe ser un número'})
+            queryset = near(queryset, lat, lng, min(max(radius, 0), MAX_RADIUS_KM))
+        return queryset
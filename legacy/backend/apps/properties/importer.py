@@ -0,0 +1,449 @@
+"""Importación masiva de propiedades desde feeds CSV/JSONL.
+
+El archivo se lee como stream y se procesa en lotes de ``chunk_size`` filas:
+
+* cada fila se valida con ``PropertyImportSerializer`` (sin queries);
+* agentes, categorías y tags se resuelven con mapas en memoria (los tags
+  que no existen se crean en bloque);
+* una query trae las propiedades existentes del lote por ``external_ref``;
+* se escribe con ``bulk_create``/``bulk_update`` y los tags con inserts
+  directos en la tabla intermedia.
+
+Las escrituras masivas no emiten signals, así que al final de cada lote se
+hace a mano lo que harían: índice de búsqueda, rollups de stats,
+invalidación de la caché de feeds e índices en memoria de similares y
+sugerencias (si ya están armados en este proceso). La memoria usada depende del tamaño del
+lote, no del archivo; los errores por fila se informan sin abortar el lote.
+Si la escritura de un lote falla en la base (p. ej. otra importación dio de
+alta la misma referencia) se reintenta fila por fila y las que vuelven a
+fallar quedan en el reporte.
+"""
+import csv
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from apps.categories import tree as category_tree
+from apps.categories.models import Category, Tag
+from apps.common import images, slugs
+from apps.inquiries import stats as inquiry_stats
+from apps.inquiries.models import Inquiry, InquiryStatsRollup
+from apps.users.models import User
+from . import cache, geo, search, similar, stats, suggest
+from .models import Property
+from .signals import STATE_FIELDS, category_tree_changed
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ('csv', 'jsonl')
+
+
+class ListOrSeparatedField(serializers.ListField):
+    """Lista en JSONL o texto separado por ``|`` en CSV."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [part.strip() for part in data.split('|') if part.strip()]
+        return super().to_internal_value(data)
+
+
+class PropertyImportSerializer(serializers.Serializer):
+    """Una fila del feed. Las relaciones llegan como texto y se resuelven aparte."""
+    external_ref = serializers.CharField(max_length=100)
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    operation = serializers.ChoiceField(choices=Property.OPERATION_CHOICES)
+    property_type = serializers.ChoiceField(choices=Property.PROPERTY_TYPE_CHOICES,
+                                            required=False)
+    category = serializers.CharField(required=False, allow_blank=True,
+                                     help_text='Slug o nombre')
+    agent = serializers.CharField(required=False, allow_blank=True,
+                                  help_text='Usuario o email (solo admin)')
+    address = serializers.CharField(max_length=300)
+    city = serializers.CharField(max_length=100)
+    state = serializers.CharField(max_length=100)
+    country = serializers.CharField(max_length=100, required=False)
+    gps_location = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    area = serializers.IntegerField()
+    land_area = serializers.IntegerField(required=False, allow_null=True)
+    rooms = serializers.IntegerField(required=False)
+    bathrooms = serializers.IntegerField(required=False)
+    parking_spaces = serializers.IntegerField(required=False)
+    floors = serializers.IntegerField(required=False)
+    year_built = serializers.IntegerField(required=False, allow_null=True)
+    gallery = ListOrSeparatedField(child=serializers.CharField(), required=False)
+    tags = ListOrSeparatedField(child=serializers.CharField(max_length=50), required=False)
+    status = serializers.ChoiceField(choices=Property.STATUS_CHOICES, required=False)
+    is_featured = serializers.BooleanField(required=False)
+    meta_description = serializers.CharField(max_length=160, required=False, allow_blank=True)
+    published_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # En CSV las columnas vacías de campos opcionales significan "sin dato"
+        # (``None`` si la fila trae menos columnas que el encabezado)
+        data = {
+            key: value for key, value in data.items()
+            if key is not None and not (value in ('', None) and key in self.fields
+                                        and not self.fields[key].required)
+        }
+        return super().to_internal_value(data)
+
+    def validate_gps_location(self, value):
+        if value:
+            try:
+                geo.parse_point(value)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.messages)
+        return value
+
+
+def detect_format(filename, default='csv'):
+    for fmt in FORMATS:
+        if filename and filename.lower().endswith(f'.{fmt}'):
+            return fmt
+    if filename and filename.lower().endswith(('.json', '.ndjson')):
+        return 'jsonl'
+    return default
+
+
+def read_rows(stream, fmt):
+    """Genera ``(número de fila, dict | error)`` leyendo ``stream`` de a una línea.
+
+    Si el archivo deja de poder leerse (no es UTF-8, CSV malformado) se
+    informa como error de la fila siguiente y se corta ahí: lo leído antes
+    se importa igual.
+    """
+    number = 0
+    try:
+        for number, row in _parse_rows(stream, fmt):
+            yield number, row
+    except UnicodeDecodeError:
+        yield number + 1, 'El archivo no está en UTF-8; se detuvo la lectura'
+    except csv.Error as exc:
+        yield number + 1, f'CSV inválido: {exc}; se detuvo la lectura'
+
+
+def _parse_rows(stream, fmt):
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, f'JSON inválido: {exc}'
+            continue
+        yield number, row if isinstance(row, dict) else 'Se esperaba un objeto JSON'
+
+
+def _state(prop):
+    return {field: getattr(prop, field) for field in STATE_FIELDS}
+
+
+class PropertyImporter:
+    """Importa filas en lotes.
+
+    Con ``agent`` todas las filas quedan a nombre de ese agente y no puede
+    tocar referencias de otros; sin él (admin/comando) la columna ``agent``
+    es obligatoria para las altas.
+    """
+
+    def __init__(self, agent=None, chunk_size=CHUNK_SIZE):
+        self.agent = agent
+        self.chunk_size = chunk_size
+        self.report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        self._agents = {}
+        self._categories = None
+        self._tags = None
+
+    # --- Mapas de lookup ---
+
+    def _load_categories(self):
+        self._categories = {}
+        for category in Category.objects.only('id', 'name', 'slug'):
+            self._categories[category.slug] = category
+            self._categories[category.name.lower()] = category
+
+    def _load_tags(self):
+        self._tags = {}
+        for tag in Tag.objects.only('id', 'name', 'slug'):
+            self._tags[tag.name.lower()] = tag
+            self._tags[tag.slug] = tag
+
+    def _resolve_agents(self, rows):
+        missing = {
+            row['agent'] for _, row in rows
+            if row.get('agent') and row['agent'] not in self._agents
+        }
+        if not missing:
+            return
+        for user in User.objects.filter(
+            Q(username__in=missing) | Q(email__in=missing), role='agent',
+        ).only('id', 'username', 'email'):
+            self._agents[user.username] = user.pk
+            self._agents[user.email] = user.pk
+        # Recordar también los que no existen para no volver a buscarlos
+        for key in missing:
+            self._agents.setdefault(key, None)
+
+    def _resolve_tags(self, rows):
+        new_names = {}
+        for row in rows:
+            for name in row.get('tags', []):
+                if name.lower() not in self._tags and slugs.base_slug(Tag, name) not in self._tags:
+                    new_names.setdefault(name.lower(), name)
+        if not new_names:
+            return
+        new_tags = slugs.assign_slugs([Tag(name=name) for name in new_names.values()], 'name')
+        Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+        for tag in Tag.objects.filter(name__in=new_names.values()).only('id', 'name', 'slug'):
+            self._tags[tag.name.lower()] = tag
+            self._tags[tag.slug] = tag
+
+    def _tag_ids(self, names):
+        ids = []
+        for name in names:
+            tag = self._tags.get(name.lower()) or self._tags.get(slugs.base_slug(Tag, name))
+            if tag and tag.pk not in ids:
+                ids.append(tag.pk)
+        return ids
+
+    # --- Proceso ---
+
+    def _fail(self, number, ref, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': number, 'external_ref': ref, 'errors': errors})
+
+    def run(self, rows):
+        """Procesa un iterable de ``read_rows`` y devuelve el reporte."""
+        self._load_categories()
+        self._load_tags()
+        chunk = []
+        for number, data in rows:
+            if isinstance(data, str):
+                self._fail(number, None, {'non_field_errors': [data]})
+                continue
+            serializer = PropertyImportSerializer(data=data)
+            if not serializer.is_valid():
+                self._fail(number, data.get('external_ref'), serializer.errors)
+                continue
+            chunk.append((number, serializer.validated_data))
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        return self.report
+
+    def _process(self, chunk):
+        self._resolve_agents(chunk)
+        rows, existing = self._prepare(chunk)
+        if not rows:
+            return
+        try:
+            self._save(rows, existing)
+        except DatabaseError:
+            # Otra importación dio de alta alguna referencia del lote después
+            # de leer ``existing`` (u otra fila rompe una restricción): se
+            # reintenta fila por fila con los datos al día. Los tags creados
+            # en el lote se revirtieron, así que el mapa se vuelve a cargar
+            self._load_tags()
+            for number, row, _ in rows.values():
+                self._process_row(number, row)
+
+    def _process_row(self, number, row):
+        rows, existing = self._prepare([(number, row)])
+        if not rows:
+            return
+        try:
+            self._save(rows, existing)
+        except DatabaseError as exc:
+            self._load_tags()
+            self._fail(number, row['external_ref'], {
+                'non_field_errors': [f'No se pudo guardar la fila: {exc}'],
+            })
+
+    def _prepare(self, chunk):
+        """Filas a escribir por ``external_ref`` y las propiedades que ya existen."""
+        existing = Property.objects.in_bulk(
+            [row['external_ref'] for _, row in chunk], field_name='external_ref',
+        )
+        # Fila repetida dentro del lote: gana la última
+        rows = {}
+        for number, row in chunk:
+            fields = self._fields(number, row, existing.get(row['external_ref']))
+            if fields is not None:
+                rows[row['external_ref']] = (number, row, fields)
+        return rows, existing
+
+    def _save(self, rows, existing):
+        with transaction.atomic():
+            self._resolve_tags(row for _, row, _ in rows.values())
+            self._write(rows, existing)
+
+    def _fields(self, number, row, current):
+        """Valores de modelo de la fila, o ``None`` si tiene errores de relación."""
+        errors = {}
+        fields = {
+            key: value for key, value in row.items()
+            if key not in ('external_ref', 'category', 'agent', 'tags')
+        }
+        if row.get('category'):
+            category = (self._categories.get(row['category'])
+                        or self._categories.get(row['category'].lower()))
+            if category is None:
+                errors['category'] = [f'No existe la categoría "{row["category"]}"']
+            else:
+                fields['category'] = category
+        elif 'category' in row:
+            fields['category'] = None
+
+        if self.agent is not None:
+            if current is not None and current.agent_id != self.agent.pk:
+                errors['external_ref'] = ['La referencia pertenece a otro agente']
+            fields['agent_id'] = self.agent.pk
+        elif row.get('agent'):
+            agent_id = self._agents.get(row['agent'])
+            if agent_id is None:
+                errors['agent'] = [f'No existe el agente "{row["agent"]}"']
+            else:
+                fields['agent_id'] = agent_id
+        elif current is None:
+            errors['agent'] = ['Requerido para propiedades nuevas']
+
+        if errors:
+            self._fail(number, row['external_ref'], errors)
+            return None
+        return fields
+
+    def _write(self, rows, existing):
+        to_create, to_update, changes = [], [], []
+        props, update_fields, moved = {}, set(), {}
+        now = timezone.now()  # bulk_update no aplica auto_now
+        for ref, (_, _, fields) in rows.items():
+            prop = props[ref] = existing.get(ref)
+            previous = None
+            if prop is None:
+                prop = props[ref] = Property(external_ref=ref)
+                to_create.append(prop)
+            else:
+                previous = _state(prop)
+                prop.updated_at = now
+                to_update.append(prop)
+                update_fields.update(fields)
+            for key, value in fields.items():
+                setattr(prop, key, value)
+            prop.sync_coordinates()
+            if previous and previous['agent_id'] != prop.agent_id:
+                moved[prop.pk] = (previous['agent_id'], prop.agent_id)
+            changes.append((previous, prop))
+
+        if to_update:
+            update_fields = {'agent' if f == 'agent_id' else f for f in update_fields}
+            update_fields |= {'latitude', 'longitude', 'geo_cell', 'updated_at'}
+            Property.objects.bulk_update(to_update, sorted(update_fields))
+        if to_create:
+            self._create(to_create)
+
+        self._link_tags(rows, props)
+        property_ids = [prop.pk for _, prop in changes]
+        search.reindex(Property.objects.filter(pk__in=property_ids))
+        stats.apply_changes([(previous, _state(prop)) for previous, prop in changes])
+        self._move_inquiry_stats(moved)
+        self._invalidate_feeds(changes)
+        self._update_indexes([prop for _, prop in changes])
+        if any(category_tree_changed(previous, _state(prop)) for previous, prop in changes):
+            category_tree.invalidate()
+        for _, prop in changes:
+            images.schedule(prop)  # gallery nueva o cambiada
+        self.report['created'] += len(to_create)
+        self.report['updated'] += len(to_update)
+
+    def _create(self, properties):
+        for attempt in range(slugs.MAX_ATTEMPTS):
+            slugs.assign_slugs(properties, 'title')
+            try:
+                with transaction.atomic():
+                    Property.objects.bulk_create(properties)
+                return
+            except IntegrityError:
+                # Si otra alta ganó alguno de los slugs se recalculan todos;
+                # cualquier otro conflicto (p. ej. ``external_ref`` duplicado)
+                # sube a ``_process``
+                taken = Property.objects.filter(slug__in=[prop.slug for prop in properties])
+                if attempt == slugs.MAX_ATTEMPTS - 1 or not taken.exists():
+                    raise
+                for prop in properties:
+                    prop.slug = ''
+
+    def _link_tags(self, rows, props):
+        """Reemplaza los tags de las filas que traen la columna ``tags``."""
+        Through = Property.tags.through
+        links = {
+            props[ref].pk: self._tag_ids(row['tags'])
+            for ref, (_, row, _) in rows.items() if 'tags' in row
+        }
+        if not links:
+            return
+        Through.objects.filter(property_id__in=links).delete()
+        Through.objects.bulk_create([
+            Through(property_id=property_id, tag_id=tag_id)
+            for property_id, tag_ids in links.items() for tag_id in tag_ids
+        ])
+
+    @staticmethod
+    def _move_inquiry_stats(moved):
+        """Igual que ``move_stats_on_agent_change`` pero para todo el lote."""
+        if not moved:
+            return
+        deltas = {}
+        by_status = (Inquiry.objects.filter(property_id__in=moved)
+                     .values('property_id', 'status').annotate(count=Count('id')).order_by())
+        for row in by_status:
+            old_agent, new_agent = moved[row['property_id']]
+            for agent_id, sign in ((old_agent, -1), (new_agent, 1)):
+                key = (InquiryStatsRollup.AGENT, agent_id, row['status'])
+                deltas[key] = deltas.get(key, 0) + sign * row['count']
+        inquiry_stats.apply_deltas(deltas)
+
+    @staticmethod
+    def _update_indexes(properties):
+        """Como ``update_similar_index``/``update_suggestion_index``, con 2 queries por lote."""
+        similar_index, suggest_index = similar.loaded_index(), suggest.loaded_index()
+        if similar_index is None and suggest_index is None:
+            return
+        tags = defaultdict(list)
+        for property_id, tag_id, name in Property.tags.through.objects.filter(
+                property_id__in=[prop.pk for prop in properties],
+        ).values_list('property_id', 'tag_id', 'tag__name'):
+            tags[property_id].append((tag_id, name))
+        categories = dict(Category.objects.filter(
+            pk__in={prop.category_id for prop in properties if prop.category_id},
+        ).values_list('pk', 'name'))
+        for prop in properties:
+            if similar_index is not None:
+                similar_index.update(prop, [tag_id for tag_id, _ in tags[prop.pk]])
+            if suggest_index is not None:
+                suggest_index.update(prop, suggest.property_entries(
+                    prop, categories.get(prop.category_id), [name for _, name in tags[prop.pk]]))
+
+    @staticmethod
+    def _invalidate_feeds(changes):
+        tags = {cache.SEARCH_TAG}
+        for previous, prop in changes:
+            tags.add(f'property:{prop.pk}')
+            tags.update(cache.property_scope_tags(_state(prop)))
+            if previous:
+                tags.update(cache.property_scope_tags(previous))
+        # Los tags se escriben directo en la tabla intermedia: property:<pk> los cubre
+        cache.invalidate(tags)
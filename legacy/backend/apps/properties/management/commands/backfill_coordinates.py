@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from apps.properties import cache
+from apps.properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Parsea gps_location en latitude/longitude/geo_cell para el catálogo existente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true',
+                            help='Recalcular también las que ya tienen coordenadas.')
+
+    def handle(self, *args, **options):
+        queryset = Property.objects.exclude(gps_location='').only(
+            'id', 'gps_location', 'latitude', 'longitude', 'geo_cell',
+        )
+        if not options['all']:
+            queryset = queryset.filter(latitude__isnull=True)
+
+        batch, updated, invalid = [], 0, 0
+        for prop in queryset.iterator(chunk_size=options['batch_size']):
+            prop.sync_coordinates()
+            if prop.latitude is None:
+                invalid += 1
+                self.stderr.write(f'{prop.pk}: gps_location inválido {prop.gps_location!r}')
+            batch.append(prop)
+            if len(batch) >= options['batch_size']:
+                updated += self._flush(batch)
+                batch = []
+        updated += self._flush(batch)
+        # bulk_update no emite signals: las coordenadas salen en los feeds
+        cache.get_cache().clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} propiedades actualizadas ({invalid} con coordenadas inválidas)'
+        ))
+
+    @staticmethod
+    def _flush(batch):
+        Property.objects.bulk_update(batch, ['latitude', 'longitude', 'geo_cell'])
+        return len(batch)
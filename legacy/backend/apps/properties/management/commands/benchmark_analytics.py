@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.properties import analytics, benchmark
+from apps.properties.models import Property
+
+
+class Command(BaseCommand):
+    help = ('Compara la analítica de precios (snapshot NumPy, en frío, incremental y '
+            'al día) contra una query por grupo, sobre un catálogo sintético que se '
+            'revierte al terminar. Falla si los resultados no coinciden.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='10k',
+                            help='Propiedades: 1k, 10k, 100k o un número.')
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--changes', type=int, default=20,
+                            help='Propiedades editadas antes de cada corrida incremental.')
+
+    def handle(self, *args, **options):
+        try:
+            size = benchmark.parse_size(options['size'])
+        except ValueError:
+            raise CommandError(f'Tamaño inválido: {options["size"]}')
+
+        with transaction.atomic():
+            self.stdout.write(f'Sembrando {size} propiedades...')
+            benchmark.seed(size, seed=options['seed'])
+            mismatches = self.run(options['repeat'], options['changes'])
+            transaction.set_rollback(True)
+        if mismatches:
+            raise CommandError(f'Resultados distintos en {len(mismatches)} grupos: '
+                               f'{mismatches[:5]}')
+
+    def run(self, repeat, changes):
+        runs = {
+            'naive': lambda: [benchmark.naive_price_stats(level)
+                              for level in analytics.LEVELS],
+            'cold': lambda: analytics.PriceAnalytics().refresh(),
+        }
+        for name, function in runs.items():
+            self.report(name, [self.timed(function) for _ in range(repeat)])
+
+        current = analytics.PriceAnalytics()
+        current.refresh()
+        ids = list(analytics.published().order_by('?').values_list('pk', flat=True)[:changes])
+        timings = []
+        for i in range(repeat):
+            # Cambios de precio con updated_at nuevo, como los de un save()
+            Property.objects.filter(pk__in=ids).update(
+                price=1000 + i, updated_at=timezone.now())
+            timings.append(self.timed(current.refresh))
+        self.report('incremental', timings)
+        self.report('warm', [self.timed(current.refresh) for _ in range(repeat)])
+
+        mismatches = []
+        for level in analytics.LEVELS:
+            mismatches += benchmark.price_stats_mismatches(
+                benchmark.naive_price_stats(level), current.results[level].values())
+        self.stdout.write(f'Grupos: {sum(map(len, current.results.values()))}, '
+                          f'distintos: {len(mismatches)}')
+        return mismatches
+
+    def timed(self, function):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            function()
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, len(queries)
+
+    def report(self, name, timings):
+        elapsed = [ms for ms, _ in timings]
+        self.stdout.write(
+            f'{name:12} p50={benchmark.percentile(elapsed, 0.5):9.1f}ms '
+            f'p95={benchmark.percentile(elapsed, 0.95):9.1f}ms '
+            f'queries={max(queries for _, queries in timings):5}'
+        )
@@ -0,0 +1,88 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.properties import benchmark, cache
+
+
+class Command(BaseCommand):
+    help = ('Mide la API REST (latencia, queries, memoria) sobre un catálogo '
+            'sintético que se revierte al terminar. Guarda los resultados en JSON '
+            'y, con --baseline, falla si hay regresiones.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='10k',
+                            help='Propiedades: 1k, 10k, 100k o un número.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--warm', action='store_true',
+                            help='No vaciar el caché de feeds entre requests.')
+        parser.add_argument('--only', help='Solo escenarios cuyo nombre contenga esto.')
+        parser.add_argument('--output', help='Archivo JSON de resultados.')
+        parser.add_argument('--baseline', help='JSON de una corrida anterior a comparar.')
+        parser.add_argument('--threshold', type=float, default=benchmark.THRESHOLD)
+        parser.add_argument('--concurrency', type=int, default=0,
+                            help='Además compara throughput WSGI/ASGI con N en vuelo '
+                                 '(requiere --commit).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests por escenario y camino con --concurrency.')
+        parser.add_argument('--commit', action='store_true',
+                            help='Confirmar el catálogo en vez de revertirlo '
+                                 '(usar contra una base desechable).')
+
+    def handle(self, *args, **options):
+        try:
+            size = benchmark.parse_size(options['size'])
+        except ValueError:
+            raise CommandError(f'Tamaño inválido: {options["size"]}')
+        if options['concurrency'] and not options['commit']:
+            # Cada worker usa su propia conexión: no vería un catálogo sin confirmar
+            raise CommandError('--concurrency requiere --commit')
+        baseline = self.load(options['baseline']) if options['baseline'] else None
+
+        with transaction.atomic():
+            self.stdout.write(f'Sembrando {size} propiedades...')
+            catalog = benchmark.seed(size, seed=options['seed'])
+            results = benchmark.run(
+                catalog, repeat=options['repeat'], warm=options['warm'],
+                only=options['only'],
+                progress=lambda name, metrics: self.stdout.write(
+                    benchmark.format_result(name, metrics)),
+            )
+            transaction.set_rollback(not options['commit'])
+        if options['concurrency']:
+            results['throughput'] = benchmark.throughput(
+                catalog, concurrency=options['concurrency'], requests=options['requests'],
+                only=options['only'],
+                progress=lambda name, result: self.stdout.write(
+                    benchmark.format_throughput(name, result)),
+            )
+        # Lo cacheado puede apuntar a datos revertidos
+        cache.get_cache().clear()
+
+        output = options['output'] or benchmark.default_output(size)
+        with open(output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        self.stdout.write(f'Resultados en {output}')
+        if baseline is not None:
+            self.check_regressions(baseline, results, options['threshold'])
+
+    def load(self, path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'No se pudo leer {path}: {exc}')
+
+    def check_regressions(self, baseline, current, threshold):
+        mismatched = benchmark.mismatched_meta(baseline, current)
+        if mismatched:
+            self.stdout.write(self.style.WARNING(
+                f'La línea base difiere en: {", ".join(mismatched)}'))
+        regressions = benchmark.compare(baseline, current, threshold)
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(benchmark.format_regression(regression)))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regresiones contra la línea base')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones contra la línea base'))
@@ -0,0 +1,17 @@
+from apps.properties import benchmark
+
+from .benchmark_api import Command as BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = 'Compara dos resultados de benchmark_api y falla si hay regresiones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument('--threshold', type=float, default=benchmark.THRESHOLD)
+
+    def handle(self, *args, **options):
+        baseline = self.load(options['baseline'])
+        current = self.load(options['current'])
+        self.check_regressions(baseline, current, options['threshold'])
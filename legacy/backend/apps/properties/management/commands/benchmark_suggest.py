@@ -0,0 +1,100 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.categories.models import Tag
+from apps.properties import benchmark, search, suggest
+
+# Campo -> tipo de sugerencia, para la búsqueda con LIKE de referencia
+NAIVE_FIELDS = {'city': 'city', 'state': 'state', 'title': 'title',
+                'category__name': 'category', 'tags__name': 'tag'}
+
+
+class Command(BaseCommand):
+    help = ('Mide las sugerencias del buscador (índice en memoria y endpoint) '
+            'contra un LIKE por campo, sobre un catálogo sintético que se revierte '
+            'al terminar. Falla si el p95 del endpoint supera --target.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='10k',
+                            help='Propiedades: 1k, 10k, 100k o un número.')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Prefijos medidos por largo.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--target', type=float, default=10.0,
+                            help='p95 máximo del endpoint, en ms.')
+
+    def handle(self, *args, **options):
+        try:
+            size = benchmark.parse_size(options['size'])
+        except ValueError:
+            raise CommandError(f'Tamaño inválido: {options["size"]}')
+
+        with transaction.atomic():
+            self.stdout.write(f'Sembrando {size} propiedades...')
+            benchmark.seed(size, seed=options['seed'])
+            p95 = self.run(options['repeat'], random.Random(options['seed']))
+            transaction.set_rollback(True)
+        if p95 > options['target']:
+            raise CommandError(f'p95 del endpoint {p95:.1f}ms > {options["target"]}ms')
+
+    def run(self, repeat, rng):
+        index = suggest.SuggestionIndex.from_settings()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            index.rebuild()
+        self.stdout.write(f'rebuild: {(time.perf_counter() - start) * 1000:.1f}ms, '
+                          f'{len(queries)} queries, {len(index)} entradas')
+
+        words = [word for text in suggest.listed().values_list('title', flat=True)[:2000]
+                 for word in search.tokenize(text)]
+        words += [word for name in Tag.objects.values_list('name', flat=True)
+                  for word in search.tokenize(name)]
+        for length in (1, 2, 3, 5):
+            prefixes = [word[:length] for word in rng.choices(words, k=repeat)]
+            self.report(f'índice[{length}]', [
+                self.timed(index.suggest, prefix, suggest.DEFAULTS['LIMIT'])
+                for prefix in prefixes])
+        prefixes = [word[:3] for word in rng.choices(words, k=max(repeat // 10, 1))]
+        self.report('like[3]', [self.timed(self.naive, prefix) for prefix in prefixes])
+
+        suggest.reset()
+        client = APIClient()
+        timings = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client.get('/api/properties/suggest/', {'q': 'a'})  # arma el índice
+            for prefix in (word[:3] for word in rng.choices(words, k=repeat)):
+                timings.append(self.timed(client.get, '/api/properties/suggest/', {'q': prefix}))
+        suggest.reset()
+        return self.report('endpoint[3]', timings)
+
+    def naive(self, prefix, limit=suggest.DEFAULTS['LIMIT']):
+        """Lo que reemplaza el índice: un LIKE con GROUP BY por campo (sin acentos)."""
+        found = []
+        for field, kind in NAIVE_FIELDS.items():
+            rows = (suggest.listed().filter(**{f'{field}__istartswith': prefix})
+                    .values(field).annotate(count=Count('pk', distinct=True))
+                    .order_by('-count')[:limit])
+            found += [(-row['count'], row[field], kind) for row in rows]
+        return sorted(found)[:limit]
+
+    def timed(self, function, *args):
+        start = time.perf_counter()
+        function(*args)
+        return (time.perf_counter() - start) * 1000
+
+    def report(self, name, timings):
+        p95 = benchmark.percentile(timings, 0.95)
+        self.stdout.write(
+            f'{name:14} p50={statistics.median(timings):8.3f}ms p95={p95:8.3f}ms '
+            f'p99={benchmark.percentile(timings, 0.99):8.3f}ms'
+        )
+        return p95
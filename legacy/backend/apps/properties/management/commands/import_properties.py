@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.properties import importer
+
+
+class Command(BaseCommand):
+    help = 'Importa (o actualiza por external_ref) propiedades desde un CSV o JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or importer.detect_format(options['path'])
+        try:
+            stream = open(options['path'], newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(exc)
+        with stream:
+            report = importer.PropertyImporter(chunk_size=options['chunk_size']).run(
+                importer.read_rows(stream, fmt)
+            )
+        for error in report['errors']:
+            self.stderr.write(f'Fila {error["row"]} ({error["external_ref"]}): {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["created"]} creadas, {report["updated"]} actualizadas, '
+            f'{report["failed"]} con errores'
+        ))
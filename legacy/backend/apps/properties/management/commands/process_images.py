@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.common import images
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Genera los derivados de imágenes (featured_image, gallery, avatar) '
+            'del catálogo existente en un pool de procesos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Procesos del pool (0 = en este proceso).')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerar también lo ya procesado (y los errores).')
+        parser.add_argument('--chunksize', type=int, default=20)
+
+    def handle(self, *args, **options):
+        candidates = [
+            (Property, Property.objects.exclude(Q(featured_image='') | Q(featured_image__isnull=True),
+                                                gallery=[])),
+            (User, User.objects.exclude(avatar='').exclude(avatar__isnull=True)),
+        ]
+        jobs = []
+        for model, queryset in candidates:
+            for instance in queryset.only('pk', 'image_variants', *model.image_sources).iterator():
+                if options['force'] or images.needs_processing(instance):
+                    jobs.append((model._meta.label_lower, instance.pk))
+        self.stdout.write(f'{len(jobs)} instancias por procesar')
+        if not jobs:
+            return
+
+        labels, pks = zip(*jobs)
+        forces = [options['force']] * len(jobs)
+        if options['workers'] == 0:
+            results = list(map(images.process, labels, pks, forces))
+        else:
+            with images.make_pool(options['workers']) as pool:
+                results = list(pool.map(images.process_in_worker, labels, pks, forces,
+                                        chunksize=options['chunksize']))
+        # En este proceso: las invalidaciones del pool no saldrían de sus procesos
+        for label, pk, result in zip(labels, pks, results):
+            if result:
+                images.notify(label, pk)
+        processed = sum(bool(result) for result in results)
+        self.stdout.write(self.style.SUCCESS(f'{processed} instancias procesadas'))
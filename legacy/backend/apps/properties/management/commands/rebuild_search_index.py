@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.properties import search
+from apps.properties.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Regenera el índice full-text de todas las propiedades.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        search.install_schema()
+        total = search.reindex(Property.objects.all(),
+                               batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} propiedades indexadas'))
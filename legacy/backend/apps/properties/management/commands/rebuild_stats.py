@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.inquiries import stats as inquiry_stats
+from apps.properties import stats as property_stats
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los rollups de /properties/stats y /inquiries/stats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo compara los rollups con los agregados en vivo.',
+        )
+
+    def handle(self, *args, **options):
+        modules = [('properties', property_stats), ('inquiries', inquiry_stats)]
+        if options['check']:
+            differences = []
+            for name, module in modules:
+                for diff in module.check():
+                    differences.append(diff)
+                    self.stdout.write(f"{name} {diff['group']}: "
+                                      f"rollup={diff['stored']} live={diff['live']}")
+            if differences:
+                raise CommandError(f'{len(differences)} grupos inconsistentes')
+            self.stdout.write(self.style.SUCCESS('Rollups consistentes'))
+            return
+        for name, module in modules:
+            total = module.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'{name}: {total} grupos'))
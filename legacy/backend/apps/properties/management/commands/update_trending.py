@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.properties import trending
+
+
+class Command(BaseCommand):
+    help = ('Suma las visitas por hora nuevas al score de trending y rehace los '
+            'rankings por operación y ciudad (correr por cron cada pocos minutos).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Rehacer los rankings aunque no haya visitas nuevas.')
+
+    def handle(self, *args, **options):
+        buckets, rankings = trending.refresh(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{buckets} buckets procesados, {rankings} rankings'))
@@ -1,9 +1,12 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.text import slugify
+from apps.common.slugs import UniqueSlugMixin
 from apps.users.models import User
 from apps.categories.models import Category, Tag
+from . import geo
 
-class Property(models.Model):
+class Property(UniqueSlugMixin, models.Model):
     OPERATION_CHOICES = [
         ('sale', 'Venta'),
         ('rent', 'Alquiler'),
@@ -24,6 +27,10 @@ class Property(models.Model):
         ('land', 'Terreno'),
     ]
     
+    slug_source = 'title'
+    # Fuentes de derivados (apps.common.images)
+    image_sources = ('featured_image', 'gallery')
+    
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     description = models.TextField()
@@ -39,6 +46,11 @@ class Property(models.Model):
     country = models.CharField(max_length=100, default='México')
     gps_location = models.CharField(max_length=100, blank=True, 
                                     help_text='Latitud, Longitud')
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.CharField(max_length=12, blank=True, db_index=True,
+                                editable=False,
+                                help_text='Geohash de (latitude, longitude)')
     area = models.IntegerField(help_text='Metros cuadrados de construcción')
     land_area = models.IntegerField(null=True, blank=True, 
                                     help_text='Metros cuadrados de terreno')
@@ -50,15 +62,26 @@ class Property(models.Model):
     featured_image = models.ImageField(upload_to='properties/', blank=True, null=True)
     gallery = models.JSONField(default=list, blank=True, 
                                help_text='Lista de URLs de imágenes')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                      help_text='Derivados por fuente (apps.common.images)')
     agent = models.ForeignKey(User, on_delete=models.CASCADE, 
                               related_name='properties',
                               limit_choices_to={'role': 'agent'})
     tags = models.ManyToManyField(Tag, related_name='properties', blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     views_count = models.IntegerField(default=0)
+    # Contadores de consultas mantenidos por apps.inquiries.counters
+    inquiry_count = models.IntegerField(default=0, editable=False)
+    inquiries_new = models.IntegerField(default=0, editable=False)
+    inquiries_contacted = models.IntegerField(default=0, editable=False)
+    inquiries_qualified = models.IntegerField(default=0, editable=False)
+    inquiries_closed = models.IntegerField(default=0, editable=False)
     is_featured = models.BooleanField(default=False)
     is_available = models.BooleanField(default=True)
     meta_description = models.CharField(max_length=160, blank=True)
+    external_ref = models.CharField(max_length=100, unique=True, null=True,
+                                    blank=True, editable=False,
+                                    help_text='Referencia en el feed de la agencia (importación)')
     published_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -68,6 +91,7 @@ class Property(models.Model):
         ordering = ['-published_at', '-created_at']
         indexes = [
             models.Index(fields=['-published_at']),
+            models.Index(fields=['-published_at', '-created_at', '-id']),
             models.Index(fields=['operation']),
             models.Index(fields=['status']),
             models.Index(fields=['slug']),
@@ -76,23 +100,152 @@ class Property(models.Model):
         ]
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            counter = 1
-            while Property.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f'{base_slug}-{counter}'
-                counter += 1
-            self.slug = slug
+        self.sync_coordinates()
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.title
     
+    def sync_coordinates(self):
+        """Deriva latitude/longitude/geo_cell de ``gps_location``."""
+        try:
+            self.latitude, self.longitude = geo.parse_point(self.gps_location)
+        except ValidationError:
+            self.latitude = self.longitude = None
+            self.geo_cell = ''
+        else:
+            self.geo_cell = geo.encode(self.latitude, self.longitude)
+    
     @property
     def price_formatted(self):
         return f"${self.price:,.2f}"
     
     @property
     def operation_label(self):
-        return dict(self.OPERATION_CHOICES).get(self.operation)
\ No newline at end of file
+        return dict(self.OPERATION_CHOICES).get(self.operation)
+
+class PropertySearchDocument(models.Model):
+    """Documento de búsqueda full-text mantenido por propiedad.
+
+    Guarda el texto ya normalizado (minúsculas, sin acentos) agrupado por
+    peso. En PostgreSQL ``vector`` contiene el tsvector con configuración
+    ``spanish``; en SQLite se usa una tabla virtual FTS5 paralela.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE,
+                                    primary_key=True,
+                                    related_name='search_document')
+    title = models.TextField(blank=True)
+    keywords = models.TextField(blank=True,
+                                help_text='Dirección, ciudad, categoría y tags')
+    body = models.TextField(blank=True)
+    vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'properties_search'
+
+    def __str__(self):
+        return f'Search document for {self.property_id}'
+
+
+class PropertyStatsRollup(models.Model):
+    """Agregados de propiedades publicadas mantenidos por signals.
+
+    Una fila por grupo: ``global``, y por ciudad, operación y agente.
+    Se reconstruyen con ``manage.py rebuild_stats``.
+    """
+    GLOBAL = 'global'
+    CITY = 'city'
+    OPERATION = 'operation'
+    AGENT = 'agent'
+    DIMENSION_CHOICES = [
+        (GLOBAL, 'Global'),
+        (CITY, 'Ciudad'),
+        (OPERATION, 'Operación'),
+        (AGENT, 'Agente'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'property_stats_rollups'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'],
+                                    name='unique_property_rollup_group'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', '-count']),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension}:{self.key} ({self.count})'
+
+    @property
+    def avg_price(self):
+        if not self.count:
+            return None
+        return self.price_sum / self.count
+
+
+class PropertyViewBucket(models.Model):
+    """Visitas de una propiedad en una hora (ver ``apps.properties.trending``).
+
+    ``scored_views`` son las ya sumadas al score de trending: el job solo
+    procesa los buckets con ``views > scored_views``.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE,
+                                 related_name='view_buckets')
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+    scored_views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'property_view_buckets'
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'hour'],
+                                    name='unique_property_view_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+    def __str__(self):
+        return f'{self.property_id} @ {self.hour:%Y-%m-%d %H}h: {self.views}'
+
+
+class PropertyTrendingScore(models.Model):
+    """Score de trending con decaimiento, vigente a ``scored_at``."""
+    property = models.OneToOneField(Property, on_delete=models.CASCADE,
+                                    primary_key=True, related_name='trending_score')
+    score = models.FloatField(default=0)
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'property_trending_scores'
+
+    def __str__(self):
+        return f'{self.property_id}: {self.score:.2f}'
+
+
+class TrendingRanking(models.Model):
+    """Top de trending precalculado por operación y ciudad (``''`` = todas)."""
+    operation = models.CharField(max_length=10, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    property_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'property_trending_rankings'
+        constraints = [
+            models.UniqueConstraint(fields=['operation', 'city'],
+                                    name='unique_trending_ranking'),
+        ]
+
+    def __str__(self):
+        return f'{self.operation or "*"}/{self.city or "*"} ({len(self.property_ids)})'
@@ -0,0 +1,232 @@
+"""Paginación keyset (por cursor) para listados grandes.
+
+A diferencia de ``PageNumberPagination`` no hace ``COUNT(*)`` ni ``OFFSET``:
+cada página filtra "después de la última fila vista" sobre el mismo orden
+del queryset (``?ordering=`` o ``Meta.ordering``) más ``id`` como desempate,
+así que el coste no crece con la profundidad y las inserciones concurrentes
+no desplazan filas entre páginas.
+
+``?count=approx`` agrega un total estimado por el planner de PostgreSQL;
+``?count=exact`` hace el ``COUNT`` de siempre.
+"""
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# attname: atributo con el valor de la columna (``property_id`` para ``property``)
+Key = namedtuple('Key', ['name', 'descending', 'nullable', 'attname'])
+Cursor = namedtuple('Cursor', ['ordering', 'values', 'reverse'])
+
+
+def estimate_count(queryset):
+    """Filas estimadas por el planner, sin ejecutar la query.
+
+    Fuera de PostgreSQL (SQLite en tests/dev) devuelve el COUNT exacto.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_keys(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        keys = []
+        for term in ordering:
+            if not isinstance(term, str):
+                raise TypeError('KeysetPagination solo admite ordering por nombre de campo')
+            name = term.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            if any(key.name == name for key in keys):
+                continue
+            keys.append(Key(name, term.startswith('-'), *self._column(queryset, name)))
+        if not any(key.name == 'id' for key in keys):
+            descending = keys[0].descending if keys else False
+            keys.append(Key('id', descending, False, 'id'))
+        return keys
+
+    @staticmethod
+    def _column(queryset, name):
+        """``(nullable, attname)`` del campo ``name``."""
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False, name  # anotación (p. ej. search_rank)
+        return field.null, getattr(field, 'attname', name)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            cursor = Cursor(data['o'], data['v'], bool(data['r']))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor.ordering != self.signature or len(cursor.values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, values, reverse):
+        data = {'o': self.signature, 'v': values, 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_position(self, obj):
+        return [_encode_value(getattr(obj, key.attname)) for key in self.keys]
+
+    def get_order_by(self, reverse):
+        # NULL se ordena como el mayor valor (comportamiento nativo de
+        # PostgreSQL), así los índices B-tree existentes siguen sirviendo.
+        order_by = []
+        for key in self.keys:
+            expression = F(key.name)
+            if key.descending != reverse:
+                expression = expression.desc(nulls_first=key.nullable or None)
+            else:
+                expression = expression.asc(nulls_last=key.nullable or None)
+            order_by.append(expression)
+        return order_by
+
+    def get_seek_condition(self, values, reverse):
+        """Filas estrictamente posteriores a ``values`` en el orden recorrido."""
+        condition = None
+        equal = Q()
+        for key, value in zip(self.keys, values):
+            descending = key.descending != reverse
+            if value is None:
+                beyond = Q(**{f'{key.name}__isnull': False}) if descending else None
+                same = Q(**{f'{key.name}__isnull': True})
+            else:
+                lookup = 'lt' if descending else 'gt'
+                beyond = Q(**{f'{key.name}__{lookup}': value})
+                if key.nullable and not descending:
+                    beyond |= Q(**{f'{key.name}__isnull': True})
+                same = Q(**{key.name: value})
+            if beyond is not None:
+                condition = equal & beyond if condition is None else condition | (equal & beyond)
+            equal &= same
+        return condition if condition is not None else Q(pk__in=[])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_qs = self.prepare(queryset, request)
+        self.count = self.get_count(queryset)
+        return self.set_page(list(page_qs))
+
+    def prepare(self, queryset, request):
+        """Valida el cursor y devuelve la query de la página (sin ejecutarla)."""
+        self.request = request
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.cursor_query_param
+        )
+        self.keys = self.get_keys(queryset)
+        self.signature = ','.join(
+            ('-' if key.descending else '') + key.name for key in self.keys
+        )
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor.reverse if self.cursor else False
+
+        page_qs = queryset.order_by(*self.get_order_by(self.reverse))
+        if self.cursor:
+            page_qs = page_qs.filter(self.get_seek_condition(self.cursor.values, self.reverse))
+        return page_qs[:self.page_size + 1]
+
+    def get_count(self, queryset):
+        """Total según ``?count=`` (``None`` si no se pidió)."""
+        count_mode = self.request.query_params.get(self.count_query_param)
+        if count_mode == 'approx':
+            return estimate_count(queryset)
+        if count_mode == 'exact':
+            return queryset.count()
+        return None
+
+    def set_page(self, rows):
+        """Recorta las filas leídas de ``prepare`` y fija los enlaces."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Página vacía retrocediendo: seguir desde el mismo cursor
+            return self.encode_cursor(self.cursor.values, reverse=False)
+        return self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.encode_cursor(self.cursor.values, reverse=True)
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,260 @@
+"""Búsqueda full-text de propiedades.
+
+Cada propiedad tiene un ``PropertySearchDocument`` con el texto normalizado
+(minúsculas y sin acentos) de título, descripción, dirección, ciudad, tags y
+categoría. El backend se elige según el motor de la base de datos:
+
+* PostgreSQL: ``tsvector`` con configuración ``spanish`` + índice GIN.
+* SQLite: tabla virtual FTS5 con un stemmer español ligero (tests/dev).
+* Otros: ``LIKE`` sobre el documento normalizado, sin ranking.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+SEARCH_CONFIG = 'spanish'
+FTS_TABLE = 'properties_search_fts'
+# Campos que, si cambian, obligan a regenerar el documento
+INDEXED_FIELDS = {'title', 'description', 'address', 'city', 'category'}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_DERIVATIONAL_SUFFIXES = (
+    'amiento', 'imiento', 'aciones', 'uciones', 'mente', 'acion', 'ucion',
+    'adora', 'ador', 'ancia', 'idad', 'ismo', 'ista', 'able', 'ible',
+)
+
+
+def normalize(text):
+    """Minúsculas y sin acentos/diacríticos ("Jardín" -> "jardin")."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def stem(word):
+    """Stemmer español ligero: plural, sufijos derivativos y vocal final."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith('es') and len(word) > 4 and word[-3] not in 'aeiou':
+        word = word[:-2]
+    elif word.endswith('s'):
+        word = word[:-1]
+    for suffix in _DERIVATIONAL_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    if word[-1] in 'aoe' and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def build_document(prop):
+    """Texto normalizado por peso: título (A), keywords (B), cuerpo (C)."""
+    category = prop.category.name if prop.category_id else ''
+    tags = ' '.join(tag.name for tag in prop.tags.all())
+    keywords = ' '.join(filter(None, [prop.address, prop.city, category, tags]))
+    return {
+        'title': normalize(prop.title),
+        'keywords': normalize(keywords),
+        'body': normalize(prop.description),
+    }
+
+
+class BaseSearchBackend:
+    vendor = None
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def install(self):
+        """Crea las estructuras específicas del motor (idempotente)."""
+
+    def index(self, documents):
+        """Sincroniza los documentos ya guardados en ``properties_search``."""
+
+    def remove(self, property_ids):
+        """Elimina propiedades del índice."""
+
+    def search(self, queryset, term):
+        tokens = tokenize(term)
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(search_document__title__contains=token)
+                | Q(search_document__keywords__contains=token)
+                | Q(search_document__body__contains=token)
+            )
+        return queryset.filter(condition)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    vendor = 'postgresql'
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS properties_search_vector_gin '
+                'ON properties_search USING gin (vector)'
+            )
+
+    def index(self, documents):
+        from .models import PropertySearchDocument
+
+        vector = (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('keywords', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('body', weight='C', config=SEARCH_CONFIG)
+        )
+        PropertySearchDocument.objects.using(self.connection.alias).filter(
+            pk__in=[doc.pk for doc in documents]
+        ).update(vector=vector)
+
+    def search(self, queryset, term):
+        query = SearchQuery(normalize(term), config=SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_document__vector=query).annotate(
+            search_rank=SearchRank(F('search_document__vector'), query),
+        ).order_by('-search_rank', '-published_at', 'id')
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    vendor = 'sqlite'
+    # Pesos bm25 por columna: title, keywords, body
+    weights = (10.0, 4.0, 1.0)
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+                "title, keywords, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    @staticmethod
+    def _stemmed(text):
+        return ' '.join(stem(token) for token in tokenize(text))
+
+    def index(self, documents):
+        self.install()
+        rows = [
+            (doc.pk, self._stemmed(doc.title), self._stemmed(doc.keywords),
+             self._stemmed(doc.body))
+            for doc in documents
+        ]
+        self.remove([row[0] for row in rows])
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, keywords, body) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, property_ids):
+        if not property_ids:
+            return
+        self.install()
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in property_ids],
+            )
+
+    def search(self, queryset, term):
+        tokens = [stem(token) for token in tokenize(term)]
+        if not tokens:
+            return queryset.none()
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in self.weights)
+        self.install()
+        # Todo en la misma query (sin traer ids a Python ni tope de resultados)
+        meta = queryset.model._meta
+        column = f'"{meta.db_table}"."{meta.pk.column}"'
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25 devuelve valores negativos: más bajo = más relevante
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {column}',
+            [match], output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=rank,
+        ).order_by('-search_rank', '-published_at', 'id')
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (PostgresSearchBackend, SQLiteSearchBackend)
+}
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    return BACKENDS.get(connection.vendor, BaseSearchBackend)(connection)
+
+
+def install_schema(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Receptor de ``post_migrate``."""
+    get_backend(using).install()
+
+
+def index_properties(properties, using=DEFAULT_DB_ALIAS):
+    """Regenera los documentos de búsqueda de un iterable de propiedades.
+
+    Las propiedades deberían venir con ``select_related('category')`` y
+    ``prefetch_related('tags')`` para no disparar queries por fila.
+    """
+    from .models import PropertySearchDocument
+
+    documents = [
+        PropertySearchDocument(property_id=prop.pk, **build_document(prop))
+        for prop in properties
+    ]
+    if not documents:
+        return 0
+    PropertySearchDocument.objects.using(using).bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['property'],
+        update_fields=['title', 'keywords', 'body', 'updated_at'],
+    )
+    get_backend(using).index(documents)
+    return len(documents)
+
+
+def reindex(queryset, batch_size=500):
+    """Reindexa un queryset de propiedades en lotes."""
+    using = queryset.db
+    queryset = queryset.select_related('category').prefetch_related('tags')
+    total = 0
+    batch = []
+    for prop in queryset.iterator(chunk_size=batch_size):
+        batch.append(prop)
+        if len(batch) >= batch_size:
+            total += index_properties(batch, using=using)
+            batch = []
+    return total + index_properties(batch, using=using)
+
+
+def search_properties(queryset, term):
+    """Filtra ``queryset`` por ``term`` ordenando por relevancia."""
+    return get_backend(queryset.db).search(queryset, term)
+
+
+class PropertySearchFilter(filters.SearchFilter):
+    """``?search=`` sobre el índice full-text en vez de ``icontains``.
+
+    Sin ``?ordering=`` explícito los resultados salen por relevancia.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+        return search_properties(queryset, term)
@@ -1,4 +1,7 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from . import geo
+from .fast_serializers import FastPropertyListSerializer
 from .models import Property
 from apps.users.serializers import AgentSerializer
 from apps.categories.serializers import CategorySerializer, TagSerializer
@@ -9,15 +12,25 @@ class PropertyListSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     operation_label = serializers.CharField(read_only=True)
     price_formatted = serializers.CharField(read_only=True)
+    # Solo presente en búsquedas por cercanía (?near=, /nearest/)
+    distance = serializers.FloatField(read_only=True)
+    # Derivados de featured_image (apps.common.images); None hasta procesarse
+    featured_image_variants = serializers.JSONField(
+        source='image_variants.featured_image', read_only=True, default=None,
+    )
     
     class Meta:
         model = Property
         fields = ['id', 'title', 'slug', 'price', 'price_formatted',
                   'operation', 'operation_label', 'property_type',
-                  'address', 'city', 'state', 'area', 'rooms', 
-                  'bathrooms', 'parking_spaces', 'featured_image',
+                  'address', 'city', 'state', 'latitude', 'longitude',
+                  'distance', 'area', 'rooms', 
+                  'bathrooms', 'parking_spaces', 'featured_image', 'featured_image_variants',
                   'agent', 'category', 'tags', 'status', 'views_count',
-                  'is_featured', 'is_available', 'published_at', 'created_at']
+                  'inquiry_count', 'is_featured', 'is_available',
+                  'published_at', 'created_at']
+        # many=True (listado y feeds) usa la serialización compilada
+        list_serializer_class = FastPropertyListSerializer
 
 class PropertyDetailSerializer(serializers.ModelSerializer):
     agent = AgentSerializer(read_only=True)
@@ -25,14 +38,10 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     operation_label = serializers.CharField(read_only=True)
     price_formatted = serializers.CharField(read_only=True)
-    inquiry_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
         fields = '__all__'
-    
-    def get_inquiry_count(self, obj):
-        return obj.inquiries.count()
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,6 +53,14 @@ class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
                   'floors', 'year_built', 'featured_image', 'gallery',
                   'tags', 'status', 'is_featured', 'meta_description']
     
+    def validate_gps_location(self, value):
+        if value:
+            try:
+                geo.parse_point(value)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.messages)
+        return value
+    
     def create(self, validated_data):
         tags_data = validated_data.pop('tags', [])
         property = Property.objects.create(**validated_data)
@@ -0,0 +1,284 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.categories import tree as category_tree
+from apps.categories.models import Category, Tag
+from apps.common import images
+from apps.users.models import User
+from . import cache, search, similar, stats, suggest
+from .counters import view_counts_flushed
+from .trending import trending_refreshed
+from .models import Property
+
+# Estado previo que necesitan la caché de feeds, los rollups de stats y
+# los conteos del árbol de categorías
+STATE_FIELDS = tuple(sorted(
+    {'status', 'is_available', 'is_featured', 'operation', 'agent_id', 'category_id'}
+    | set(stats.STATE_FIELDS)
+))
+TREE_FIELDS = ('status', 'category_id')
+
+
+def _current_state(instance):
+    return {field: getattr(instance, field) for field in STATE_FIELDS}
+
+
+@receiver(pre_save, sender=Property)
+def remember_previous_state(sender, instance, raw=False, using=None, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_state = None
+        return
+    instance._previous_state = sender.objects.using(using).filter(
+        pk=instance.pk
+    ).values(*STATE_FIELDS).first()
+
+
+@receiver(pre_save, sender=Property)
+def dedupe_featured_image(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.dedupe_upload(instance.featured_image, 'properties')
+
+
+@receiver(post_save, sender=Property)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.schedule(instance)
+
+
+@receiver(images.variants_ready, sender=Property)
+def invalidate_feeds_on_variants(sender, pk, **kwargs):
+    # update() en el worker: ni signals de Property ni cambio de scope
+    cache.invalidate([f'property:{pk}'])
+
+
+@receiver(images.variants_ready, sender=User)
+def invalidate_agent_on_variants(sender, pk, **kwargs):
+    cache.invalidate([f'user:{pk}'])
+
+
+@receiver(post_save, sender=Property)
+def index_property_on_save(sender, instance, using, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # save(update_fields=[...]) que no toca texto no necesita reindexar
+    if update_fields is not None and not search.INDEXED_FIELDS & set(update_fields):
+        return
+    search.index_properties([instance], using=using)
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_from_index(sender, instance, using, **kwargs):
+    search.get_backend(using).remove([instance.pk])
+
+
+@receiver(m2m_changed, sender=Property.tags.through)
+def index_property_on_tags_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.properties.clear(): en post_clear pk_set no viene informado
+        instance._search_property_ids = list(
+            instance.properties.using(using).values_list('pk', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.index_properties([instance], using=using)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_search_property_ids', [])
+    if pk_set:
+        search.reindex(Property.objects.using(using).filter(pk__in=pk_set))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def remember_indexed_properties(sender, instance, using, **kwargs):
+    instance._search_property_ids = list(
+        instance.properties.using(using).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def reindex_after_related_delete(sender, instance, using, **kwargs):
+    property_ids = getattr(instance, '_search_property_ids', [])
+    if property_ids:
+        search.reindex(Property.objects.using(using).filter(pk__in=property_ids))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+def reindex_on_related_rename(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    search.reindex(instance.properties.using(using).all())
+
+
+# --- Índice de similares (solo si ya está armado en este proceso) ---
+
+@receiver(post_save, sender=Property)
+def update_similar_index(sender, instance, raw=False, **kwargs):
+    index = similar.loaded_index()
+    if index is None or raw:
+        return
+    tag_ids = list(instance.tags.values_list('pk', flat=True)) if similar.is_indexed(instance) else []
+    index.update(instance, tag_ids)
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_similar_index(sender, instance, **kwargs):
+    index = similar.loaded_index()
+    if index is not None:
+        index.remove(instance.pk)
+
+
+@receiver(m2m_changed, sender=Property.tags.through)
+def update_similar_index_on_tags_change(sender, instance, action, reverse, **kwargs):
+    index = similar.loaded_index()
+    if index is None or reverse or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    update_similar_index(Property, instance)
+
+
+# --- Índice de sugerencias (solo si ya está armado en este proceso) ---
+
+@receiver(post_save, sender=Property)
+def update_suggestion_index(sender, instance, raw=False, **kwargs):
+    index = suggest.loaded_index()
+    if index is None or raw:
+        return
+    index.update(instance, suggest.property_entries(instance))
+
+
+@receiver(post_delete, sender=Property)
+def remove_from_suggestion_index(sender, instance, **kwargs):
+    index = suggest.loaded_index()
+    if index is not None:
+        index.remove(instance.pk)
+
+
+@receiver(m2m_changed, sender=Property.tags.through)
+def update_suggestion_index_on_tags_change(sender, instance, action, reverse, **kwargs):
+    index = suggest.loaded_index()
+    if index is None or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        index.invalidate()  # tag.properties.add(...): se rehace en el próximo uso
+    else:
+        update_suggestion_index(Property, instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def invalidate_suggestion_index(sender, instance, created=False, raw=False, **kwargs):
+    index = suggest.loaded_index()
+    # Un tag o categoría nuevos todavía no tienen propiedades
+    if index is not None and not created and not raw:
+        index.invalidate()
+
+
+# --- Invalidación de la caché de feeds ---
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_feeds(sender, instance, **kwargs):
+    tags = [f'property:{instance.pk}'] + cache.property_scope_tags(_current_state(instance))
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        tags += cache.property_scope_tags(previous)
+    cache.invalidate(tags)
+
+
+@receiver(m2m_changed, sender=Property.tags.through)
+def invalidate_feeds_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # tag.properties.add(...): cambian los tags de esas propiedades
+        if action == 'post_clear':
+            pk_set = getattr(instance, '_search_property_ids', [])
+        cache.invalidate([f'tag:{instance.pk}', cache.SEARCH_TAG,
+                          *(f'property:{pk}' for pk in pk_set or ())])
+    else:
+        cache.invalidate([f'property:{instance.pk}', cache.SEARCH_TAG])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_feeds(sender, instance, **kwargs):
+    tags = [f'category:{instance.pk}', cache.SEARCH_TAG]
+    if instance.parent_id:
+        # El padre serializa a sus hijas en ``children``
+        tags.append(f'category:{instance.parent_id}')
+    cache.invalidate(tags)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_feeds(sender, instance, created=False, raw=False, **kwargs):
+    tags = [f'tag:{instance.pk}', cache.SEARCH_TAG]
+    if not created and not raw:
+        # El detalle depende de property:<pk>, no de cada tag
+        property_ids = getattr(instance, '_search_property_ids', None)
+        if property_ids is None:
+            property_ids = instance.properties.values_list('pk', flat=True)
+        tags += [f'property:{pk}' for pk in property_ids]
+    cache.invalidate(tags)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_agent_feeds(sender, instance, update_fields=None, **kwargs):
+    # El login solo actualiza last_login, que no se serializa
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        cache.invalidate([f'user:{instance.pk}'])
+
+
+@receiver(view_counts_flushed)
+@receiver(trending_refreshed)
+def invalidate_trending_feeds(sender, property_ids=(), **kwargs):
+    # Las páginas que muestran views_count de las volcadas también
+    cache.invalidate([cache.VIEWS_TAG, *(f'views:{pk}' for pk in property_ids)])
+
+
+# --- Conteos del árbol de categorías ---
+
+def category_tree_changed(previous, current):
+    """¿Cambian los conteos por categoría entre dos estados (``None`` = no existe)?"""
+    def counted(state):
+        return state and state['status'] == 'published' and state['category_id']
+
+    if not counted(previous) and not counted(current):
+        return False
+    return (previous is None or current is None
+            or any(previous[field] != current[field] for field in TREE_FIELDS))
+
+
+@receiver(post_save, sender=Property)
+def invalidate_category_tree_on_save(sender, instance, raw=False, **kwargs):
+    if category_tree_changed(getattr(instance, '_previous_state', None),
+                             _current_state(instance)):
+        category_tree.invalidate()
+
+
+@receiver(post_delete, sender=Property)
+def invalidate_category_tree_on_delete(sender, instance, **kwargs):
+    if category_tree_changed(_current_state(instance), None):
+        category_tree.invalidate()
+
+
+# --- Rollups de estadísticas ---
+
+@receiver(post_save, sender=Property)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    stats.apply_change(getattr(instance, '_previous_state', None),
+                       _current_state(instance))
+
+
+@receiver(post_delete, sender=Property)
+def update_stats_on_delete(sender, instance, **kwargs):
+    stats.apply_change(_current_state(instance), None)
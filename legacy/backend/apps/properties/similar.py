@@ -0,0 +1,258 @@
+"""Propiedades similares con un índice en memoria (NumPy).
+
+Cada propiedad publicada es una fila de una matriz de features:
+
+* precio, superficie y terreno (log), ambientes, baños, cocheras y
+  latitud/longitud, estandarizados con la media y el desvío del catálogo
+  (un faltante queda en la media);
+* one-hot de ``property_type``, ``operation`` y tags.
+
+Cada grupo se multiplica por su peso (``SIMILAR_PROPERTIES['WEIGHTS']``) y
+``similar`` devuelve las ``k`` filas a menor distancia euclídea, calculada
+por bloques de ``BATCH_SIZE`` filas como ``|a|² - 2·a·b + |b|²`` (un
+producto matriz-vector por bloque).
+
+El índice vive en cada proceso. Se arma con dos queries (``rebuild``, al
+arrancar el worker con ``WARM_ON_STARTUP`` o en el primer uso) y se
+rehace cada ``MAX_AGE`` segundos; entre medio ``signals`` lo actualiza fila
+por fila con los cambios de este proceso. Tags nuevos entran recién en el
+próximo ``rebuild``, lo mismo que las medias y desvíos.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WARM_ON_STARTUP': False,
+    'MAX_AGE': 10 * 60,  # segundos
+    'BATCH_SIZE': 4096,  # filas por bloque de distancias
+    'WEIGHTS': {
+        'numeric': 1.0,
+        'location': 1.0,
+        'property_type': 1.5,
+        'operation': 3.0,
+        'tags': 0.5,
+    },
+}
+NUMERIC = ('price', 'area', 'land_area', 'rooms', 'bathrooms', 'parking_spaces')
+LOG_SCALED = ('price', 'area', 'land_area')
+LOCATION = ('latitude', 'longitude')
+FIELDS = ('pk', *NUMERIC, *LOCATION, 'property_type', 'operation')
+PROPERTY_TYPES = [value for value, _ in Property.PROPERTY_TYPE_CHOICES]
+OPERATIONS = [value for value, _ in Property.OPERATION_CHOICES]
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, 'SIMILAR_PROPERTIES', {})}
+    config['WEIGHTS'] = {**DEFAULTS['WEIGHTS'], **config['WEIGHTS']}
+    return config
+
+
+def is_indexed(instance):
+    return instance.status == 'published' and instance.is_available
+
+
+def _raw(records):
+    """Columnas continuas (``NUMERIC`` + ``LOCATION``); ``nan`` si falta."""
+    columns = (*NUMERIC, *LOCATION)
+    raw = np.array(
+        [[np.nan if record[field] is None else float(record[field]) for field in columns]
+         for record in records],
+        dtype=np.float64,
+    ).reshape(len(records), len(columns))
+    logged = [columns.index(field) for field in LOG_SCALED]
+    raw[:, logged] = np.log1p(np.maximum(raw[:, logged], 0))
+    return raw
+
+
+def _one_hot(values, vocabulary):
+    positions = {value: i for i, value in enumerate(vocabulary)}
+    matrix = np.zeros((len(values), len(vocabulary)), dtype=np.float64)
+    for row, value in enumerate(values):
+        if value in positions:
+            matrix[row, positions[value]] = 1
+    return matrix
+
+
+class SimilarityIndex:
+
+    def __init__(self, weights, batch_size):
+        self.weights = weights
+        self.batch_size = batch_size
+        self.built_at = None
+        self._lock = threading.RLock()
+        self._mean = self._std = None
+        self._tags = {}  # tag_id -> columna en el bloque de tags
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._active = np.zeros(0, dtype=bool)
+        self._rows = {}  # pk -> fila
+
+    @classmethod
+    def from_settings(cls):
+        config = get_config()
+        return cls(config['WEIGHTS'], config['BATCH_SIZE'])
+
+    def __len__(self):
+        return int(self._active.sum())
+
+    def encode(self, records, tag_lists):
+        """Matriz de features (float32) de ``records`` (dicts con ``FIELDS``)."""
+        raw = _raw(records)
+        standardized = np.nan_to_num((raw - self._mean) / self._std)
+        split = len(NUMERIC)
+        tags = np.zeros((len(records), len(self._tags)), dtype=np.float64)
+        for row, tag_ids in enumerate(tag_lists):
+            columns = [self._tags[tag_id] for tag_id in tag_ids if tag_id in self._tags]
+            tags[row, columns] = 1
+        blocks = [
+            standardized[:, :split] * self.weights['numeric'],
+            standardized[:, split:] * self.weights['location'],
+            _one_hot([r['property_type'] for r in records], PROPERTY_TYPES)
+            * self.weights['property_type'],
+            _one_hot([r['operation'] for r in records], OPERATIONS) * self.weights['operation'],
+            tags * self.weights['tags'],
+        ]
+        return np.hstack(blocks).astype(np.float32)
+
+    def rebuild(self):
+        """Rearma el índice con las publicadas (2 queries)."""
+        records = list(Property.objects.filter(status='published', is_available=True)
+                       .order_by('pk').values(*FIELDS))
+        tag_lists = defaultdict(list)
+        for property_id, tag_id in Property.tags.through.objects.filter(
+                property__status='published', property__is_available=True,
+        ).values_list('property_id', 'tag_id'):
+            tag_lists[property_id].append(tag_id)
+
+        raw = _raw(records)
+        with self._lock:
+            # Media y desvío de los valores presentes; una columna sin
+            # ninguno (p. ej. land_area) queda en 0 / 1
+            present = ~np.isnan(raw)
+            counts = present.sum(axis=0)
+            self._mean = np.divide(np.where(present, raw, 0).sum(axis=0), counts,
+                                   out=np.zeros(raw.shape[1]), where=counts > 0)
+            squares = (np.where(present, raw - self._mean, 0) ** 2).sum(axis=0)
+            variance = np.divide(squares, counts, out=np.zeros(raw.shape[1]), where=counts > 0)
+            std = np.sqrt(variance)
+            self._std = np.where(std > 0, std, 1)
+            vocabulary = sorted({tag_id for tags in tag_lists.values() for tag_id in tags})
+            self._tags = {tag_id: i for i, tag_id in enumerate(vocabulary)}
+            self._matrix = self.encode(records, [tag_lists[r['pk']] for r in records])
+            self._norms = np.einsum('ij,ij->i', self._matrix, self._matrix)
+            self._ids = np.array([r['pk'] for r in records], dtype=np.int64)
+            self._active = np.ones(len(records), dtype=bool)
+            self._rows = {pk: row for row, pk in enumerate(self._ids.tolist())}
+            self.built_at = time.monotonic()
+        return len(records)
+
+    def update(self, instance, tag_ids):
+        """Alta/actualización de una propiedad (o baja si ya no está publicada)."""
+        if not is_indexed(instance):
+            self.remove(instance.pk)
+            return
+        record = {field: getattr(instance, field) for field in FIELDS}
+        with self._lock:
+            if self.built_at is None:
+                return
+            vector = self.encode([record], [tag_ids])[0]
+            row = self._rows.get(instance.pk)
+            if row is None:
+                row = len(self._ids)
+                self._matrix = np.vstack([self._matrix, vector])
+                self._norms = np.append(self._norms, 0).astype(np.float32)
+                self._ids = np.append(self._ids, instance.pk)
+                self._active = np.append(self._active, True)
+                self._rows[instance.pk] = row
+            self._matrix[row] = vector
+            self._norms[row] = vector @ vector
+            self._active[row] = True
+
+    def remove(self, pk):
+        with self._lock:
+            row = self._rows.get(pk)
+            if row is not None:
+                self._active[row] = False
+
+    def similar(self, instance, tag_ids, k):
+        """Ids de las ``k`` publicadas más parecidas a ``instance`` (sin ella)."""
+        with self._lock:
+            row = self._rows.get(instance.pk)
+            if row is not None and self._active[row]:
+                vector = self._matrix[row]
+            else:
+                record = {field: getattr(instance, field) for field in FIELDS}
+                vector = self.encode([record], [tag_ids])[0]
+            matrix, norms, ids, active = self._matrix, self._norms, self._ids, self._active
+            # Copia: update() puede cambiar la máscara mientras se calcula
+            excluded = ~active
+            if row is not None:
+                excluded[row] = True
+
+        candidates, distances = [], []
+        for start in range(0, len(ids), self.batch_size):
+            stop = start + self.batch_size
+            block = norms[start:stop] - 2 * (matrix[start:stop] @ vector) + vector @ vector
+            block[excluded[start:stop]] = np.inf
+            take = min(k, len(block))
+            best = np.argpartition(block, take - 1)[:take]
+            candidates.append(best + start)
+            distances.append(block[best])
+        if not candidates:
+            return []
+        candidates = np.concatenate(candidates)
+        distances = np.concatenate(distances)
+        order = np.lexsort((candidates, distances))[:k]
+        return [int(ids[row]) for row, distance in zip(candidates[order], distances[order])
+                if np.isfinite(distance)]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """El índice del proceso; se arma (o se rehace pasado ``MAX_AGE``) al pedirlo."""
+    global _index
+    max_age = get_config()['MAX_AGE']
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex.from_settings()
+        if _index.built_at is None or time.monotonic() - _index.built_at > max_age:
+            _index.rebuild()
+    return _index
+
+
+def loaded_index():
+    """El índice si ya se armó en este proceso (si no, no hay nada que actualizar)."""
+    if _index is not None and _index.built_at is not None:
+        return _index
+    return None
+
+
+def warm():
+    """Arma el índice al arrancar el worker (``WARM_ON_STARTUP``)."""
+    if not get_config()['WARM_ON_STARTUP']:
+        return
+    try:
+        count = len(get_index())
+    except Exception:
+        logger.exception('No se pudo armar el índice de similares')
+    else:
+        logger.info('Índice de similares: %s propiedades', count)
+
+
+def reset():
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,209 @@
+"""Rollups incrementales para ``/properties/stats/``.
+
+Cada cambio de una propiedad publicada (alta, baja, cambio de precio,
+ciudad, operación, agente o estado) ajusta solo los grupos afectados de
+``PropertyStatsRollup``. Min/max se recalculan contra la tabla únicamente
+cuando sale del grupo el valor que era el extremo.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+
+from .models import Property, PropertyStatsRollup
+
+TOP_CITIES = 5
+# (dimensión, campo de Property que da la clave del grupo)
+DIMENSIONS = [
+    (PropertyStatsRollup.CITY, 'city'),
+    (PropertyStatsRollup.OPERATION, 'operation'),
+    (PropertyStatsRollup.AGENT, 'agent_id'),
+]
+STATE_FIELDS = ('status', 'price', 'city', 'operation', 'agent_id')
+
+
+def _groups(state):
+    """Grupos a los que aporta una propiedad en ``state`` (o ninguno)."""
+    if not state or state['status'] != 'published':
+        return {}
+    price = Decimal(str(state['price']))
+    groups = {(PropertyStatsRollup.GLOBAL, ''): price}
+    for dimension, field in DIMENSIONS:
+        groups[(dimension, str(state[field]))] = price
+    return groups
+
+
+def _group_filter(dimension, key):
+    if dimension == PropertyStatsRollup.GLOBAL:
+        return Q()
+    field = dict(DIMENSIONS)[dimension]
+    return Q(**{field: key})
+
+
+def _update_group(dimension, key, removed, added):
+    """Aplica a un grupo los precios que salen (``removed``) y entran (``added``)."""
+    rollup, _ = PropertyStatsRollup.objects.select_for_update().get_or_create(
+        dimension=dimension, key=key,
+    )
+    rollup.count += len(added) - len(removed)
+    rollup.price_sum += sum(added, Decimal(0)) - sum(removed, Decimal(0))
+    if rollup.count <= 0:
+        rollup.count, rollup.price_sum = 0, 0
+        rollup.min_price = rollup.max_price = None
+    elif rollup.min_price in removed or rollup.max_price in removed:
+        extremes = Property.objects.filter(
+            _group_filter(dimension, key), status='published',
+        ).aggregate(min_price=Min('price'), max_price=Max('price'))
+        rollup.min_price = extremes['min_price']
+        rollup.max_price = extremes['max_price']
+    elif added:
+        low, high = min(added), max(added)
+        if rollup.min_price is None or low < rollup.min_price:
+            rollup.min_price = low
+        if rollup.max_price is None or high > rollup.max_price:
+            rollup.max_price = high
+    rollup.save()
+
+
+def apply_changes(changes):
+    """Ajusta los rollups para muchos pares (anterior, actual) de una vez.
+
+    Cada grupo afectado se actualiza una sola vez; lo usan las escrituras
+    masivas que no pasan por signals (importación).
+    """
+    removed, added = defaultdict(list), defaultdict(list)
+    for previous, current in changes:
+        before, after = _groups(previous), _groups(current)
+        for group in before.keys() | after.keys():
+            if before.get(group) != after.get(group):
+                if group in before:
+                    removed[group].append(before[group])
+                if group in after:
+                    added[group].append(after[group])
+    changed = removed.keys() | added.keys()
+    if not changed:
+        return
+    with transaction.atomic():
+        for dimension, key in sorted(changed):
+            _update_group(dimension, key, removed.get((dimension, key), []),
+                          added.get((dimension, key), []))
+
+
+def apply_change(previous, current):
+    """Ajusta los rollups entre dos estados (``None`` = no existe)."""
+    apply_changes([(previous, current)])
+
+
+def compute_rollups():
+    """Rollups calculados desde cero: {(dimension, key): (count, sum, min, max)}."""
+    published = Property.objects.filter(status='published').order_by()
+    metrics = {
+        'count': Count('id'),
+        'price_sum': Sum('price'),
+        'min_price': Min('price'),
+        'max_price': Max('price'),
+    }
+
+    def as_tuple(row):
+        return (row['count'], row['price_sum'] or Decimal(0),
+                row['min_price'], row['max_price'])
+
+    rollups = {}
+    total = published.aggregate(**metrics)
+    if total['count']:
+        rollups[(PropertyStatsRollup.GLOBAL, '')] = as_tuple(total)
+    for dimension, field in DIMENSIONS:
+        for row in published.values(field).annotate(**metrics):
+            rollups[(dimension, str(row[field]))] = as_tuple(row)
+    return rollups
+
+
+def rebuild():
+    rollups = compute_rollups()
+    with transaction.atomic():
+        PropertyStatsRollup.objects.all().delete()
+        PropertyStatsRollup.objects.bulk_create([
+            PropertyStatsRollup(dimension=dimension, key=key, count=count,
+                                price_sum=price_sum, min_price=min_price,
+                                max_price=max_price)
+            for (dimension, key), (count, price_sum, min_price, max_price)
+            in rollups.items()
+        ])
+    return len(rollups)
+
+
+def check():
+    """Diferencias entre los rollups guardados y los agregados en vivo."""
+    expected = compute_rollups()
+    stored = {
+        (r.dimension, r.key): (r.count, r.price_sum, r.min_price, r.max_price)
+        for r in PropertyStatsRollup.objects.filter(count__gt=0)
+    }
+    return [
+        {'group': f'{dimension}:{key}',
+         'stored': stored.get((dimension, key)),
+         'live': expected.get((dimension, key))}
+        for dimension, key in sorted(expected.keys() | stored.keys())
+        if stored.get((dimension, key)) != expected.get((dimension, key))
+    ]
+
+
+def read_stats():
+    """Respuesta de ``/properties/stats/`` en dos queries fijas."""
+    return build_stats(read_totals(), read_top_cities())
+
+
+def read_totals():
+    """Rollups global y por operación: ``{(dimension, key): rollup}``."""
+    return {
+        (r.dimension, r.key): r
+        for r in PropertyStatsRollup.objects.filter(
+            Q(dimension=PropertyStatsRollup.GLOBAL)
+            | Q(dimension=PropertyStatsRollup.OPERATION)
+        )
+    }
+
+
+def read_top_cities():
+    return list(PropertyStatsRollup.objects.filter(
+        dimension=PropertyStatsRollup.CITY, count__gt=0,
+    ).order_by('-count', 'key')[:TOP_CITIES])
+
+
+def build_stats(rows, cities):
+    """Respuesta a partir de ``read_totals`` y ``read_top_cities`` (independientes)."""
+    total = rows.get((PropertyStatsRollup.GLOBAL, ''), PropertyStatsRollup())
+
+    def operation_count(operation):
+        row = rows.get((PropertyStatsRollup.OPERATION, operation))
+        return row.count if row else 0
+
+    return {
+        'total': total.count,
+        'for_sale': operation_count('sale'),
+        'for_rent': operation_count('rent'),
+        'avg_price': total.avg_price,
+        'min_price': total.min_price,
+        'max_price': total.max_price,
+        'cities': [{'city': row.key, 'count': row.count} for row in cities],
+    }
+
+
+def live_stats():
+    """Cálculo original contra la tabla (modo de verificación)."""
+    published = Property.objects.filter(status='published')
+    aggregates = published.aggregate(
+        total=Count('id'),
+        for_sale=Count('id', filter=Q(operation='sale')),
+        for_rent=Count('id', filter=Q(operation='rent')),
+        avg_price=Avg('price'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    )
+    cities = list(
+        published.values('city')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'city')[:TOP_CITIES]
+    )
+    return {**aggregates, 'cities': cities}
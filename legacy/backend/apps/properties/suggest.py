@@ -0,0 +1,238 @@
+"""Sugerencias para el buscador (type-ahead) con un índice en memoria.
+
+Entradas: ciudades, estados, tags, categorías y títulos de las publicadas,
+cada una con la cantidad de publicadas que la usan (``count``). Cada entrada
+se indexa por cada palabra de su texto normalizado (``search.normalize``:
+sin acentos ni mayúsculas), así "jar" encuentra "Casa con jardín":
+
+    "casa con jardin" -> "casa con jardin", "con jardin", "jardin"
+
+Las claves viven en una lista ordenada; ``suggest`` busca con ``bisect`` el
+tramo que empieza con el prefijo y se queda con las ``limit`` entradas de
+más peso (``argpartition`` sobre el tramo), sin tocar la base.
+
+El índice vive en cada proceso, como el de similares: se arma con dos
+queries (al arrancar con ``WARM_ON_STARTUP`` o en el primer uso), se rehace
+cada ``MAX_AGE`` segundos y entre medio ``signals`` le aplica los cambios de
+propiedades de este proceso. Renombrar o borrar un tag o una categoría (y
+``tag.properties.add()``) lo marca para rehacerse en el próximo uso.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .models import Property
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WARM_ON_STARTUP': False,
+    'MAX_AGE': 10 * 60,  # segundos
+    'LIMIT': 8,
+    'MAX_LIMIT': 20,
+    'MAX_WORDS': 6,  # palabras de un texto que se indexan como inicio de clave
+}
+# Orden entre tipos a igual peso: lugares antes que títulos
+KINDS = ('city', 'state', 'category', 'tag', 'title')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'SUGGESTIONS', {})}
+
+
+def is_listed(instance):
+    return instance.status == 'published' and instance.is_available
+
+
+def listed():
+    return Property.objects.filter(status='published', is_available=True)
+
+
+def normalize_query(text):
+    return ' '.join(tokenize(text))
+
+
+def keys(text, max_words):
+    """Claves de ``text``: el texto normalizado desde cada una de sus primeras palabras."""
+    words = tokenize(text)
+    return [' '.join(words[i:]) for i in range(min(len(words), max_words))]
+
+
+def property_entries(instance, category_name=None, tag_names=None):
+    """``[(kind, texto)]`` a los que aporta ``instance`` (1 query por los tags si no vienen)."""
+    if not is_listed(instance):
+        return []
+    entries = [('city', instance.city), ('state', instance.state), ('title', instance.title)]
+    if instance.category_id:
+        entries.append(('category', category_name or instance.category.name))
+    if tag_names is None:
+        tag_names = instance.tags.values_list('name', flat=True)
+    entries += [('tag', name) for name in tag_names]
+    return entries
+
+
+class SuggestionIndex:
+
+    def __init__(self, max_words):
+        self.max_words = max_words
+        self.built_at = None
+        self._lock = threading.RLock()
+        self._entries = {}  # (kind, texto) -> id de entrada
+        self._kinds, self._texts = [], []
+        self._weights = np.zeros(0, dtype=np.int64)
+        self._keys = []  # claves ordenadas
+        self._key_entries = np.zeros(0, dtype=np.int64)  # entrada de cada clave
+        self._properties = {}  # pk -> entradas a las que aporta
+
+    @classmethod
+    def from_settings(cls):
+        return cls(get_config()['MAX_WORDS'])
+
+    def __len__(self):
+        return int((self._weights > 0).sum())
+
+    def rebuild(self):
+        """Rearma el índice con las publicadas (2 queries)."""
+        contributions = defaultdict(list)
+        for pk, title, city, state, category in listed().values_list(
+                'pk', 'title', 'city', 'state', 'category__name'):
+            contributions[pk] += [('city', city), ('state', state), ('title', title)]
+            if category:
+                contributions[pk].append(('category', category))
+        for pk, name in Property.tags.through.objects.filter(
+                property__status='published', property__is_available=True,
+        ).values_list('property_id', 'tag__name'):
+            contributions[pk].append(('tag', name))
+
+        with self._lock:
+            self._entries, self._kinds, self._texts = {}, [], []
+            self._weights = np.zeros(0, dtype=np.int64)
+            self._keys, self._key_entries = [], np.zeros(0, dtype=np.int64)
+            self._properties = {}
+            for pk, entries in contributions.items():
+                self._add(pk, entries, index_keys=False)
+            pairs = sorted((key, entry) for entry, text in enumerate(self._texts)
+                           for key in keys(text, self.max_words))
+            self._keys = [key for key, _ in pairs]
+            self._key_entries = np.array([entry for _, entry in pairs], dtype=np.int64)
+            self.built_at = time.monotonic()
+        return len(contributions)
+
+    def _add(self, pk, entries, index_keys=True):
+        ids, new = [], []
+        for kind, text in entries:
+            if not text:
+                continue
+            entry = self._entries.get((kind, text))
+            if entry is None:
+                entry = self._entries[kind, text] = len(self._texts)
+                self._kinds.append(kind)
+                self._texts.append(text)
+                new.append(entry)
+            ids.append(entry)
+        if new:
+            self._weights = np.concatenate([self._weights, np.zeros(len(new), dtype=np.int64)])
+            if index_keys:
+                self._insert_keys(new)
+        np.add.at(self._weights, ids, 1)
+        if ids:
+            self._properties[pk] = ids
+
+    def _insert_keys(self, entries):
+        pairs = sorted((key, entry) for entry in entries
+                       for key in keys(self._texts[entry], self.max_words))
+        positions = [bisect.bisect_left(self._keys, key) for key, _ in pairs]
+        # De atrás para adelante: las posiciones anteriores siguen valiendo
+        for position, (key, _) in reversed(list(zip(positions, pairs))):
+            self._keys.insert(position, key)
+        self._key_entries = np.insert(self._key_entries, positions,
+                                      [entry for _, entry in pairs])
+
+    def update(self, instance, entries):
+        """Reemplaza lo que aporta ``instance`` por ``entries`` (``property_entries``)."""
+        with self._lock:
+            if self.built_at is None:
+                return
+            self._remove(instance.pk)
+            self._add(instance.pk, entries)
+
+    def remove(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        # Las entradas en 0 quedan en el índice pero no se sugieren
+        np.subtract.at(self._weights, self._properties.pop(pk, []), 1)
+
+    def invalidate(self):
+        with self._lock:
+            self.built_at = None
+
+    def suggest(self, query, limit):
+        """``[{'text', 'kind', 'count'}]``: las ``limit`` entradas de más peso con el prefijo."""
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            stop = bisect.bisect_left(self._keys, prefix + '\uffff', lo=start)
+            entries = self._key_entries[start:stop]
+            weights = self._weights[entries]
+            # Una entrada aparece a lo sumo max_words veces en el tramo: entre
+            # las limit * max_words claves de más peso están sus limit mejores
+            take = limit * self.max_words
+            if len(entries) > take:
+                best = np.argpartition(-weights, take - 1)[:take]
+                entries, weights = entries[best], weights[best]
+            entries = np.unique(entries[weights > 0])
+            found = [(-int(self._weights[entry]), KINDS.index(self._kinds[entry]),
+                      self._texts[entry], self._kinds[entry]) for entry in entries.tolist()]
+        return [{'text': text, 'kind': kind, 'count': -weight}
+                for weight, _, text, kind in sorted(found)[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """El índice del proceso; se arma (o se rehace pasado ``MAX_AGE``) al pedirlo."""
+    global _index
+    max_age = get_config()['MAX_AGE']
+    with _index_lock:
+        if _index is None:
+            _index = SuggestionIndex.from_settings()
+        if _index.built_at is None or time.monotonic() - _index.built_at > max_age:
+            _index.rebuild()
+    return _index
+
+
+def loaded_index():
+    """El índice si ya se armó en este proceso (si no, no hay nada que actualizar)."""
+    if _index is not None and _index.built_at is not None:
+        return _index
+    return None
+
+
+def warm():
+    """Arma el índice al arrancar el worker (``WARM_ON_STARTUP``)."""
+    if not get_config()['WARM_ON_STARTUP']:
+        return
+    try:
+        count = len(get_index())
+    except Exception:
+        logger.exception('No se pudo armar el índice de sugerencias')
+    else:
+        logger.info('Índice de sugerencias: %s entradas', count)
+
+
+def reset():
+    global _index
+    with _index_lock:
+        _index = None
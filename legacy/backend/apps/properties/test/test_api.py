@@ -58,11 +58,105 @@ class TestPropertyAPI:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) >= 1
     
-    def test_views_count_increment(self, api_client, property_instance):
+    def test_views_count_increment(self, api_client, property_instance, view_counter):
         initial_views = property_instance.views_count
         
         response = api_client.get(f'/api/properties/{property_instance.slug}/')
         
         assert response.status_code == status.HTTP_200_OK
+        assert response.data['views_count'] == initial_views + 1
+        view_counter.flush()
         property_instance.refresh_from_db()
-        assert property_instance.views_count == initial_views + 1
\ No newline at end of file
+        assert property_instance.views_count == initial_views + 1
+    
+    def test_views_count_dedupes_same_client(self, api_client, property_instance, view_counter):
+        for _ in range(3):
+            response = api_client.get(f'/api/properties/{property_instance.slug}/')
+        
+        assert response.data['views_count'] == 1
+        assert view_counter.pending(property_instance.id) == 1
+    
+    def test_views_count_flushes_on_threshold(self, api_client, property_instance,
+                                              view_counter, monkeypatch):
+        monkeypatch.setattr(view_counter, 'flush_threshold', 2)
+        
+        api_client.get(f'/api/properties/{property_instance.slug}/', REMOTE_ADDR='10.0.0.1')
+        property_instance.refresh_from_db()
+        assert property_instance.views_count == 0
+        
+        response = api_client.get(f'/api/properties/{property_instance.slug}/', REMOTE_ADDR='10.0.0.2')
+        assert response.data['views_count'] == 2
+        property_instance.refresh_from_db()
+        assert property_instance.views_count == 2
+        assert view_counter.pending(property_instance.id) == 0
+
+
+def test_memory_view_store_evicts_expired_and_oldest(monkeypatch):
+    from apps.properties import counters
+
+    now = [0.0]
+    monkeypatch.setattr(counters.time, 'monotonic', lambda: now[0])
+    store = counters.MemoryViewStore()
+    store.max_seen = 3
+
+    assert store.first_view(1, 'a', 10) and store.first_view(1, 'b', 10)
+    assert not store.first_view(1, 'a', 10)
+    now[0] = 5.0
+    assert store.first_view(2, 'a', 10) and store.first_view(3, 'a', 10)
+    assert list(store._seen) == [(1, 'b'), (2, 'a'), (3, 'a')]  # (1, 'a'): la más vieja
+    now[0] = 12.0
+    assert store.first_view(1, 'a', 10)
+    assert list(store._seen) == [(2, 'a'), (3, 'a'), (1, 'a')]
+
+
+@pytest.mark.django_db
+def test_failed_flush_keeps_views_pending(view_counter, monkeypatch):
+    from django.db import DatabaseError
+    from django.db.models import QuerySet
+
+    def fail(*args, **kwargs):
+        raise DatabaseError('sin conexión')
+
+    view_counter.record(1, 'a')
+    monkeypatch.setattr(QuerySet, 'update', fail)
+
+    assert view_counter.flush() == 0
+    assert view_counter.pending(1) == 1
+
+
+def test_cache_view_store_counts_pending_views():
+    from django.core.cache import cache
+    from apps.properties import counters
+
+    store = counters.CacheViewStore()
+    cache.delete_many([store._key(1), store._key(2)])
+
+    assert [store.incr(1), store.incr(1), store.incr(2, 3)] == [1, 2, 5]
+    assert store.drain() == {1: 2, 2: 3}
+    assert store.incr(1) == 1
+    store.drain()
+
+
+def test_cache_view_stores_drain_shared_keys_once(monkeypatch):
+    from django.core.cache import cache
+    from apps.properties import counters
+
+    first, second = counters.CacheViewStore(), counters.CacheViewStore()
+    cache.delete_many([first._key(1), first._key(2)])
+    first.incr(1, 2)
+    second.incr(1, 3)
+    second.incr(2)
+    # Los dos leen el mismo total de la propiedad 1 antes de descontar
+    stale = {first._key(1): 5}
+    get_many = cache.get_many
+    monkeypatch.setattr(cache, 'get_many', lambda keys: {
+        **get_many(keys), **{key: value for key, value in stale.items() if key in keys}})
+
+    assert [first.drain(), second.drain()] == [{1: 5}, {2: 1}]
+    assert cache.get(first._key(1)) == 0
+
+    # Expulsada entre la lectura y el decr: nada que llevarse
+    second.incr(2)
+    stale[first._key(2)] = 1
+    cache.delete(first._key(2))
+    assert second.drain() == {}
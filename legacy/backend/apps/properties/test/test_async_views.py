@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.common import asyncdb
+from apps.categories.models import Tag
+from apps.properties import stats as property_stats
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+def bearer(user):
+    return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+
+@pytest.mark.django_db
+class TestAsyncPropertyViews:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def properties(self, agent_user):
+        tag = Tag.objects.create(name='Alberca')
+        created = []
+        for i, (operation, city) in enumerate([('sale', 'Mérida'), ('rent', 'Puebla'),
+                                              ('sale', 'Mérida')]):
+            prop = Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000 * (i + 1),
+                operation=operation, address='Test', city=city, area=100,
+                agent=agent_user, status='published', is_featured=i == 0,
+            )
+            prop.tags.add(tag)
+            created.append(prop)
+        created.append(Property.objects.create(
+            title='Borrador', description='Test', price=1, operation='sale',
+            address='Test', city='Test', area=10, agent=agent_user,
+        ))
+        return created
+
+    def get(self, path, params=None, **extra):
+        return async_to_sync(AsyncClient().get)(path, params or {}, **extra)
+
+    @pytest.mark.parametrize('path, params', [
+        ('', {}),
+        ('', {'operation': 'sale', 'ordering': '-price', 'count': 'exact'}),
+        ('', {'search': 'Casa', 'page_size': 1}),
+        ('featured/', {}),
+        ('for_sale/', {}),
+        ('trending/', {}),
+        ('stats/', {}),
+    ])
+    def test_same_payload_and_validators_as_sync(self, api_client, properties, path, params):
+        sync = api_client.get(f'/api/properties/{path}', params)
+        response = self.get(f'/api/async/properties/{path}', params)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == sync.json()
+        assert response.get('ETag') == sync.get('ETag')
+
+    def test_role_visibility_and_errors(self, properties, agent_user):
+        draft = properties[-1]
+        anonymous = self.get('/api/async/properties/').json()['results']
+        own = self.get('/api/async/properties/', headers=bearer(agent_user)).json()['results']
+
+        assert draft.pk not in {item['id'] for item in anonymous}
+        assert draft.pk in {item['id'] for item in own}
+        assert self.get(f'/api/async/properties/{draft.slug}/').status_code == 404
+        assert self.get(f'/api/async/properties/{draft.slug}/',
+                        headers=bearer(agent_user)).status_code == 200
+        assert self.get('/api/async/properties/', {'cursor': 'x'}).status_code == 404
+        assert self.get('/api/async/properties/',
+                        headers={'Authorization': 'Bearer x'}).status_code == 401
+
+    def test_detail_counts_views_and_revalidates(self, api_client, properties):
+        url = f'/properties/{properties[0].slug}/'
+        response = self.get(f'/api/async{url}')
+        assert response.json()['views_count'] == 1
+        assert response.json() == api_client.get(f'/api{url}').json()
+
+        again = self.get(f'/api/async{url}', headers={'If-None-Match': response['ETag']})
+        assert again.status_code == status.HTTP_304_NOT_MODIFIED
+        stale = self.get(f'/api/async{url}', headers={'If-None-Match': '"viejo"'})
+        assert stale.json()['views_count'] == 1
+
+        listing = self.get('/api/async/properties/')
+        assert self.get('/api/async/properties/',
+                        headers={'If-None-Match': listing['ETag']}).status_code == 304
+
+    def test_requests_are_tagged_and_budgeted(self, properties, query_budget):
+        self.get('/api/async/properties/')
+        self.get('/api/async/properties/stats/')
+
+        assert [profile.tag for profile in query_budget] == [
+            'property-async.list', 'property-async.stats',
+        ]
+        assert query_budget[1].queries == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gather_runs_queries_in_parallel_outside_transactions():
+    # Solo pasa si las dos corren a la vez
+    barrier = threading.Barrier(2, timeout=5)
+
+    def call(value):
+        def run():
+            barrier.wait()
+            return value, Property.objects.count()
+        return run
+
+    assert async_to_sync(asyncdb.gather)(call(1), call(2)) == [(1, 0), (2, 0)]
+    totals, cities = async_to_sync(asyncdb.gather)(
+        property_stats.read_totals, property_stats.read_top_cities)
+    assert property_stats.build_stats(totals, cities)['total'] == 0
@@ -0,0 +1,78 @@
+import copy
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from apps.inquiries import counters
+from apps.inquiries import stats as inquiry_stats
+from apps.properties import benchmark
+from apps.properties import stats as property_stats
+from apps.properties.models import Property
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    def test_seeded_catalog_is_consistent(self):
+        catalog = benchmark.seed(40, seed=7)
+
+        assert Property.objects.count() == 40
+        assert catalog.property.status == 'published'
+        assert catalog.category.path.startswith(f'{catalog.root_category.pk}/')
+        assert property_stats.check() == []
+        assert inquiry_stats.check() == []
+        assert counters.check() == []
+
+    def test_run_reports_metrics_per_scenario(self):
+        catalog = benchmark.seed(40, seed=7)
+
+        results = benchmark.run(catalog, repeat=2, only='inbox')
+
+        assert set(results['scenarios']) == {'inbox', 'inbox.filtered', 'inbox.stats', 'inbox.client'}
+        inbox = results['scenarios']['inbox']
+        assert inbox['status'] == 200
+        assert 0 < inbox['queries'] <= 4
+        assert inbox['p50_ms'] <= inbox['p95_ms'] and inbox['peak_kb'] > 0
+        assert results['meta']['size'] == 40
+        json.dumps(results)
+
+    def test_compare_flags_regressions(self):
+        metrics = {'status': 200, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0,
+                   'queries': 3, 'db_ms': 1.0, 'peak_kb': 500.0}
+        baseline = {'meta': {'size': 1000}, 'scenarios': {'list': metrics}}
+        current = copy.deepcopy(baseline)
+        current['scenarios']['list'].update(p50_ms=11.0, p95_ms=30.0, queries=4)
+
+        regressions = benchmark.compare(baseline, current)
+
+        assert {(r['metric'], r['baseline'], r['current']) for r in regressions} == {
+            ('p95_ms', 20.0, 30.0), ('queries', 3, 4),
+        }
+        assert benchmark.compare(baseline, baseline) == []
+
+    def test_compare_command_fails_on_regression(self, tmp_path):
+        metrics = {'status': 200, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0,
+                   'queries': 3, 'db_ms': 1.0, 'peak_kb': 500.0}
+        baseline = tmp_path / 'baseline.json'
+        current = tmp_path / 'current.json'
+        baseline.write_text(json.dumps({'meta': {}, 'scenarios': {'list': metrics}}))
+        current.write_text(json.dumps({'meta': {}, 'scenarios': {'list': {**metrics, 'queries': 9}}}))
+
+        call_command('benchmark_compare', str(baseline), str(baseline))
+        with pytest.raises(CommandError):
+            call_command('benchmark_compare', str(baseline), str(current))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_throughput_compares_wsgi_and_asgi():
+    catalog = benchmark.seed(20, seed=7)
+
+    results = benchmark.throughput(catalog, concurrency=2, requests=4, only='stats')
+
+    stats = results['scenarios']['stats']
+    assert set(results['scenarios']) == {'stats'}
+    for path in ('wsgi', 'asgi'):
+        assert stats[path]['errors'] == 0 and stats[path]['rps'] > 0
+    assert stats['speedup'] > 0
+    with pytest.raises(CommandError):
+        call_command('benchmark_api', concurrency=2)
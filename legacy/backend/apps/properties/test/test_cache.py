@@ -0,0 +1,106 @@
+import pytest
+from django.core.cache import caches
+from rest_framework import status
+from apps.categories.models import Tag
+from apps.properties.checks import check_shared_feeds_cache
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestFeedCache:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def property_instance(self, agent_user):
+        return Property.objects.create(
+            title='Casa de Prueba',
+            description='Test',
+            price=250000,
+            operation='sale',
+            address='Test 123',
+            city='Test',
+            area=150,
+            agent=agent_user,
+            status='published',
+            is_featured=True,
+        )
+
+    def get(self, client, url):
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return response
+
+    def test_second_request_is_served_from_cache(self, api_client, property_instance):
+        assert self.get(api_client, '/api/properties/featured/')['X-Cache'] == 'MISS'
+        assert self.get(api_client, '/api/properties/featured/')['X-Cache'] == 'HIT'
+
+    def test_property_edit_invalidates_feed(self, api_client, property_instance):
+        self.get(api_client, '/api/properties/for_sale/')
+        property_instance.title = 'Casa Renovada'
+        property_instance.save()
+
+        response = self.get(api_client, '/api/properties/for_sale/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.data[0]['title'] == 'Casa Renovada'
+
+    def test_newly_published_property_enters_feed(self, api_client, property_instance, agent_user):
+        self.get(api_client, '/api/properties/recent/')
+        draft = Property.objects.create(
+            title='Borrador', description='Test', price=1, operation='rent',
+            address='Test', city='Test', area=10, agent=agent_user,
+        )
+        assert self.get(api_client, '/api/properties/recent/')['X-Cache'] == 'HIT'
+
+        draft.status = 'published'
+        draft.save()
+        response = self.get(api_client, '/api/properties/recent/')
+        assert {item['slug'] for item in response.data} == {'casa-de-prueba', 'borrador'}
+
+    def test_tag_rename_invalidates_feed(self, api_client, property_instance):
+        tag = Tag.objects.create(name='Alberca')
+        property_instance.tags.add(tag)
+        self.get(api_client, '/api/properties/featured/')
+
+        tag.name = 'Piscina'
+        tag.save()
+        response = self.get(api_client, '/api/properties/featured/')
+        assert response.data[0]['tags'][0]['name'] == 'Piscina'
+
+    def test_agent_drafts_are_not_shared_with_anonymous(self, api_client, property_instance, agent_user):
+        property_instance.status = 'draft'
+        property_instance.save()
+        api_client.force_authenticate(user=agent_user)
+        assert len(self.get(api_client, '/api/properties/for_sale/').data) == 1
+
+        api_client.force_authenticate(user=None)
+        assert self.get(api_client, '/api/properties/for_sale/').data == []
+
+    def test_view_flush_invalidates_pages_with_views(self, api_client, property_instance,
+                                                      view_counter):
+        for url in ('/api/properties/trending/', '/api/properties/featured/'):
+            self.get(api_client, url)
+        self.get(api_client, f'/api/properties/{property_instance.slug}/')
+        view_counter.flush()
+
+        for url in ('/api/properties/trending/', '/api/properties/featured/'):
+            response = self.get(api_client, url)
+            assert response['X-Cache'] == 'MISS'
+            assert response.data[0]['views_count'] == 1
+
+    def test_entries_expire_and_local_cache_is_flagged(self, settings):
+        assert caches['feeds'].default_timeout == settings.CACHES['feeds']['TIMEOUT'] > 0
+
+        settings.INQUIRY_QUEUE = {**settings.INQUIRY_QUEUE, 'ASYNC': True}
+        assert [error.id for error in check_shared_feeds_cache(None)] == ['properties.W001']
+        settings.CACHES = {**settings.CACHES, 'feeds': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        assert check_shared_feeds_cache(None) == []
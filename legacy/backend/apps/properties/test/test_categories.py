@@ -0,0 +1,96 @@
+import pytest
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from apps.categories.models import Category
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestCategoryTree:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def categories(self):
+        casas = Category.objects.create(name='Casas')
+        lujo = Category.objects.create(name='Lujo', parent=casas)
+        penthouse = Category.objects.create(name='Penthouse', parent=lujo)
+        terrenos = Category.objects.create(name='Terrenos')
+        return casas, lujo, penthouse, terrenos
+
+    def make_property(self, agent, category, status='published', **kwargs):
+        return Property.objects.create(
+            title='Propiedad', description='Test', price=1000, operation='sale',
+            address='Test', city='Test', area=100, agent=agent,
+            category=category, status=status, **kwargs,
+        )
+
+    def test_paths_follow_parent_changes(self, categories):
+        casas, lujo, penthouse, terrenos = categories
+        assert penthouse.path == f'{casas.pk}/{lujo.pk}/{penthouse.pk}/'
+
+        lujo.parent = terrenos
+        lujo.save()
+
+        penthouse.refresh_from_db()
+        assert penthouse.path == f'{terrenos.pk}/{lujo.pk}/{penthouse.pk}/'
+        lujo.parent = penthouse
+        with pytest.raises(ValidationError):
+            lujo.save()
+
+    def test_tree_loads_in_one_query_with_subtree_counts(
+        self, api_client, agent_user, categories, django_assert_num_queries,
+    ):
+        casas, lujo, penthouse, terrenos = categories
+        self.make_property(agent_user, casas)
+        self.make_property(agent_user, penthouse)
+        self.make_property(agent_user, penthouse)
+        self.make_property(agent_user, lujo, status='draft')
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/api/categories/all/')
+        with django_assert_num_queries(0):
+            api_client.get('/api/categories/')
+
+        by_name = {item['name']: item for item in response.data}
+        assert by_name['Casas']['property_count'] == 3
+        assert by_name['Lujo']['property_count'] == 2
+        assert by_name['Terrenos']['property_count'] == 0
+        assert by_name['Casas']['children'][0]['children'][0]['property_count'] == 2
+
+    def test_counts_are_invalidated_by_property_changes(self, api_client, agent_user, categories):
+        casas, lujo, _, _ = categories
+        prop = self.make_property(agent_user, lujo, status='draft')
+        assert api_client.get(f'/api/categories/{casas.slug}/').data['property_count'] == 0
+
+        prop.status = 'published'
+        prop.save()
+        assert api_client.get(f'/api/categories/{casas.slug}/').data['property_count'] == 1
+
+        prop.delete()
+        response = api_client.get('/api/categories/')
+        assert response.data['results'][0]['property_count'] == 0
+
+    def test_filter_by_category_subtree(self, api_client, agent_user, categories):
+        casas, lujo, penthouse, terrenos = categories
+        self.make_property(agent_user, casas)
+        self.make_property(agent_user, penthouse)
+        self.make_property(agent_user, terrenos)
+
+        response = api_client.get('/api/properties/', {'category_tree': lujo.slug})
+        assert [item['category']['id'] for item in response.data['results']] == [penthouse.pk]
+
+        response = api_client.get('/api/properties/', {'category_tree': casas.pk})
+        assert len(response.data['results']) == 2
+
+        response = api_client.get('/api/properties/', {'category_tree': 'no-existe'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == []
@@ -0,0 +1,174 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.categories.models import Tag
+from apps.properties import cache
+from apps.properties.models import Property
+from apps.properties.views import PropertyViewSet
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def property_instance(self, agent_user):
+        prop = Property.objects.create(
+            title='Casa de Prueba', description='Test', price=250000, operation='sale',
+            address='Test 123', city='Test', area=150, agent=agent_user,
+            status='published', is_featured=True,
+        )
+        prop.tags.add(Tag.objects.create(name='Alberca'))
+        return prop
+
+    def revalidate(self, client, url, response, **params):
+        return client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_list_revalidates_without_queries(
+        self, api_client, property_instance, django_assert_num_queries,
+    ):
+        response = api_client.get('/api/properties/', {'operation': 'sale'})
+        assert response['ETag'].startswith('"') and 'Last-Modified' in response
+        assert 'no-cache' in response['Cache-Control']
+
+        # Hit del caché de feeds: los validadores salen de sus versiones
+        with django_assert_num_queries(0):
+            again = self.revalidate(api_client, '/api/properties/', response, operation='sale')
+
+        assert again.status_code == status.HTTP_304_NOT_MODIFIED
+        assert again['ETag'] == response['ETag']
+        other = self.revalidate(api_client, '/api/properties/', response, operation='rent')
+        assert other.status_code == status.HTTP_200_OK
+
+    def test_authenticated_list_revalidates_before_the_view(
+        self, property_instance, agent_user, django_assert_num_queries,
+    ):
+        client = APIClient()
+        client.force_authenticate(user=agent_user)
+        response = client.get('/api/properties/')
+        assert 'X-Cache' not in response  # el listado solo se cachea anónimo
+
+        with django_assert_num_queries(0):
+            again = self.revalidate(client, '/api/properties/', response)
+
+        assert again.status_code == status.HTTP_304_NOT_MODIFIED
+        assert again['ETag'] == response['ETag']
+
+    def test_changes_produce_new_validators(self, api_client, property_instance):
+        for change in (
+            lambda: property_instance.save(),
+            lambda: property_instance.tags.get().save(),
+            lambda: property_instance.tags.clear(),
+            lambda: property_instance.agent.save(),
+        ):
+            response = api_client.get('/api/properties/featured/')
+            change()
+            again = self.revalidate(api_client, '/api/properties/featured/', response)
+            assert again.status_code == status.HTTP_200_OK
+            assert again['ETag'] != response['ETag']
+
+    def test_validators_follow_role_visibility(self, api_client, property_instance, agent_user):
+        response = api_client.get('/api/properties/')
+        agent_client = APIClient()
+        agent_client.force_authenticate(user=agent_user)
+        agent_response = agent_client.get('/api/properties/')
+        assert agent_response['ETag'] != response['ETag']
+        assert 'private' in agent_response['Cache-Control']
+
+        Property.objects.create(
+            title='Borrador', description='Test', price=1, operation='rent',
+            address='Test', city='Test', area=10, agent=agent_user,
+        )
+
+        assert self.revalidate(api_client, '/api/properties/', response).status_code == 304
+        again = self.revalidate(agent_client, '/api/properties/', agent_response)
+        assert again.status_code == status.HTTP_200_OK
+
+    def test_detail_accounts_for_views(self, api_client, property_instance):
+        url = f'/api/properties/{property_instance.slug}/'
+        response = api_client.get(url)
+        assert response.data['views_count'] == 1
+
+        assert self.revalidate(api_client, url, response).status_code == 304
+
+        APIClient(REMOTE_ADDR='10.0.0.2').get(url)
+        again = self.revalidate(api_client, url, response)
+        assert again.status_code == status.HTTP_200_OK
+        assert again.data['views_count'] == 2
+        assert api_client.get('/api/properties/no-existe/').status_code == 404
+
+    def test_detail_validators_ignore_unrelated_changes(
+        self, api_client, property_instance, view_counter,
+    ):
+        url = f'/api/properties/{property_instance.slug}/'
+        response = api_client.get(url)
+
+        User.objects.create_user(username='otro', email='otro@test.com', password='pass123')
+        view_counter.flush()  # las visitas pasan de pendientes a persistidas
+        assert self.revalidate(api_client, url, response).status_code == 304
+
+        property_instance.agent.save()
+        again = self.revalidate(api_client, url, response)
+        assert again.status_code == status.HTTP_200_OK
+        assert again['ETag'] != response['ETag']
+
+    def test_detail_records_view_once(self, api_client, property_instance, monkeypatch):
+        calls = []
+        record_view = PropertyViewSet.record_view
+        monkeypatch.setattr(PropertyViewSet, 'record_view', staticmethod(
+            lambda *args: calls.append(args) or record_view(*args)))
+        url = f'/api/properties/{property_instance.slug}/'
+
+        api_client.get(url)
+        stale = api_client.get(url, HTTP_IF_NONE_MATCH='"viejo"')
+
+        assert stale.status_code == status.HTTP_200_OK
+        assert stale.data['views_count'] == 1
+        assert len(calls) == 2
+
+    def later(self, monkeypatch):
+        """Los cambios que siguen ocurren un rato después (Last-Modified va en segundos)."""
+        later = time.time() + 10
+        monkeypatch.setattr(cache, 'time', SimpleNamespace(time_ns=lambda: int(later * 1e9)))
+        return later
+
+    @pytest.mark.parametrize('change', ['delete', 'unpublish'])
+    def test_if_modified_since_sees_removals(
+        self, api_client, property_instance, agent_user, monkeypatch, change,
+    ):
+        other = Property.objects.create(
+            title='Otra', description='Test', price=1, operation='sale',
+            address='Test', city='Test', area=10, agent=agent_user, status='published',
+        )
+        urls = ('/api/properties/', '/api/properties/for_sale/')
+        since = {}
+        for url in urls:
+            since[url] = api_client.get(url)['Last-Modified']
+            assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=since[url]).status_code == 304
+
+        later = self.later(monkeypatch)
+        if change == 'delete':
+            other.delete()
+        else:
+            other.status = 'draft'
+            other.save()
+
+        for url in urls:
+            again = api_client.get(url, HTTP_IF_MODIFIED_SINCE=since[url])
+            assert again.status_code == status.HTTP_200_OK
+            assert again['Last-Modified'] == http_date(later)
+            items = again.data['results'] if url == urls[0] else again.data
+            assert other.slug not in [item['slug'] for item in items]
@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import OperationalError, connections, transaction
+from django.http import HttpResponse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.common import dbrouter
+from apps.inquiries import queue
+from apps.properties.models import Property
+
+
+@pytest.mark.django_db
+class TestReplicaRouting:
+
+    @pytest.fixture(autouse=True)
+    def replica(self, settings):
+        # La "réplica" comparte la conexión (y la transacción) del test
+        settings.DATABASE_REPLICAS = {'REPLICAS': ['replica'], 'STICKY_SECONDS': 60}
+        connections['replica'] = connections['default']
+        dbrouter.reset()
+        yield
+        del connections['replica']
+        dbrouter.reset()
+
+    @pytest.fixture
+    def reads(self, monkeypatch):
+        """``[(app_label, alias)]`` de cada lectura ruteada."""
+        calls = []
+        original = dbrouter.PrimaryReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            alias = original(router, model, **hints)
+            calls.append((model._meta.app_label, alias or 'default'))
+            return alias
+        monkeypatch.setattr(dbrouter.PrimaryReplicaRouter, 'db_for_read', spy)
+        return calls
+
+    @pytest.fixture
+    def casa(self, user):
+        return Property.objects.create(
+            title='Casa', description='Test', price=1000, operation='sale',
+            address='Test', city='Test', area=100, agent=user, status='published',
+        )
+
+    def test_safe_requests_read_from_replica(self, api_client, casa, reads):
+        assert api_client.get('/api/properties/').status_code == 200
+
+        assert ('properties', 'replica') in reads
+        assert {alias for _, alias in reads} == {'replica'}
+        # Fuera de un request todo va al primario
+        assert Property.objects.all().db == 'default'
+
+    def test_writers_stick_to_primary(self, authenticated_client, casa, reads):
+        response = authenticated_client.post(f'/api/properties/{casa.slug}/inquire/',
+                                   {'client_email': 'c@test.com', 'message': 'Hola'})
+        assert response.status_code == 202
+        queue.process_pending()
+        reads.clear()
+
+        assert authenticated_client.get(f'/api/properties/{casa.slug}/').data['inquiry_count'] == 1
+        assert reads and {alias for _, alias in reads} == {'default'}
+
+        reads.clear()
+        APIClient(REMOTE_ADDR='10.0.0.2').get(f'/api/properties/{casa.slug}/')
+        assert ('properties', 'replica') in reads
+
+    def test_marks_follow_the_user_across_tokens(self, user, casa, reads):
+        def client():
+            return APIClient(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+                             REMOTE_ADDR='10.0.0.9')
+
+        assert client().post(f'/api/properties/{casa.slug}/inquire/',
+                             {'client_email': 'c@test.com', 'message': 'Hola'}).status_code == 202
+        assert dbrouter.get_cache().get(f'primary:user:{user.pk}') is True
+        reads.clear()
+
+        # Otro token (otro dispositivo) del mismo usuario
+        client().get(f'/api/properties/{casa.slug}/')
+        assert reads and {alias for _, alias in reads} == {'default'}
+
+    def test_async_middleware_routes_and_marks_writers(self, rf, casa, reads):
+        async def view(request):
+            await sync_to_async(lambda: list(Property.objects.all()))()
+            if request.method == 'POST':
+                await sync_to_async(Property.objects.filter(pk=casa.pk).update)(views_count=1)
+            return HttpResponse()
+
+        middleware = async_to_sync(dbrouter.ReplicaRoutingMiddleware(view))
+        middleware(rf.get('/'))
+        assert reads == [('properties', 'replica')]
+
+        middleware(rf.post('/'))
+        reads.clear()
+        middleware(rf.get('/'))  # mismo cliente: se queda en el primario
+        assert reads == [('properties', 'default')]
+
+    def test_transactions_and_unavailable_replicas_use_primary(self):
+        router = dbrouter.PrimaryReplicaRouter()
+        token = dbrouter._use_replicas.set(True)
+        assert router.db_for_read(Property) == 'replica'
+
+        with transaction.atomic():
+            assert router.db_for_read(Property) is None
+
+        def refuse():
+            raise OperationalError('connection refused')
+        connections['replica'] = SimpleNamespace(ensure_connection=refuse)
+        assert router.db_for_read(Property) is None
+        connections['replica'] = connections['default']
+        assert router.db_for_read(Property) is None  # no reintenta hasta RETRY_SECONDS
+
+        assert router.db_for_write(Property) == 'default'
+        assert router.allow_migrate('replica', 'properties') is False
+        dbrouter._use_replicas.reset(token)
@@ -0,0 +1,81 @@
+import pytest
+from django.http import QueryDict
+from rest_framework import status
+from apps.categories.models import Category, Tag
+from apps.properties.facets import facet_counts
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestFacetedSearch:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def catalog(self, agent_user):
+        casas = Category.objects.create(name='Casas')
+        alberca = Tag.objects.create(name='Alberca')
+        rows = [
+            ('sale', 'Puebla', 3, 800_000),
+            ('sale', 'Puebla', 2, 1_500_000),
+            ('sale', 'Toluca', 3, 300_000),
+            ('rent', 'Puebla', 3, 12_000),
+            ('rent', 'Toluca', 1, 8_000),
+        ]
+        for i, (operation, city, rooms, price) in enumerate(rows):
+            prop = Property.objects.create(
+                title=f'Propiedad {i}', description='Test', price=price,
+                operation=operation, address='Test', city=city, area=100,
+                rooms=rooms, agent=agent_user, status='published',
+                category=casas if i % 2 == 0 else None,
+            )
+            if rooms == 3:
+                prop.tags.add(alberca)
+        Property.objects.create(
+            title='Borrador', description='Test', price=1, operation='sale',
+            address='Test', city='Puebla', area=10, agent=agent_user,
+        )
+        return casas
+
+    def counts(self, facet):
+        return {entry['value']: entry['count'] for entry in facet}
+
+    def test_facets_exclude_their_own_filter(self, api_client, catalog):
+        response = api_client.get('/api/properties/search/', {
+            'operation': 'sale', 'city': 'Puebla',
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+
+        facets = response.data['facets']
+        assert self.counts(facets['operation']) == {'sale': 2, 'rent': 1}
+        assert self.counts(facets['city']) == {'Puebla': 2, 'Toluca': 1}
+        assert self.counts(facets['rooms']) == {3: 1, 2: 1}
+        assert self.counts(facets['tag']) == {'alberca': 1}
+        assert facets['tag'][0]['label'] == 'Alberca'
+        assert self.counts(facets['category']) == {catalog.id: 1}
+        assert self.counts(facets['price']) == {'500000-1000000': 1, '1000000-2000000': 1}
+
+    def test_range_filters(self, api_client, catalog):
+        response = api_client.get('/api/properties/search/', {
+            'operation': 'rent', 'rooms_min': 2, 'price_max': 20_000,
+        })
+        assert [item['title'] for item in response.data['results']] == ['Propiedad 3']
+        assert self.counts(response.data['facets']['price']) == {'10000-20000': 1}
+
+    def test_facets_run_in_one_query(self, catalog, django_assert_num_queries):
+        params = QueryDict('city=Puebla&rooms_min=2')
+        base = Property.objects.filter(status='published')
+        with django_assert_num_queries(1):
+            facets = facet_counts(base, params)
+        assert self.counts(facets['city']) == {'Puebla': 3, 'Toluca': 1}
+        # Sin ?operation= no se mezclan rangos de venta y alquiler
+        assert facets['price'] == []
@@ -0,0 +1,87 @@
+import pytest
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from apps.categories.models import Category, Tag
+from apps.properties import geo
+from apps.properties.fast_serializers import FastPropertyListSerializer
+from apps.properties.models import Property
+from apps.properties.serializers import PropertyListSerializer
+from apps.users.models import User
+
+
+def drf_payload(instances, **kwargs):
+    """Salida del camino DRF original (ListSerializer genérico)."""
+    return serializers.ListSerializer(
+        instances, child=PropertyListSerializer(), **kwargs
+    ).data
+
+
+@pytest.mark.django_db
+class TestFastPropertyListSerializer:
+
+    @pytest.fixture
+    def catalog(self):
+        agent = User.objects.create_user(
+            username='agent1', email='agent@test.com', password='pass123',
+            role='agent', avatar='avatars/agent.png', company='Inmobiliaria',
+        )
+        casas = Category.objects.create(name='Casas')
+        lujo = Category.objects.create(name='Lujo', parent=casas)
+        Category.objects.create(name='Penthouse', parent=lujo)
+        Category.objects.create(name='Campestre', parent=casas)
+        alberca = Tag.objects.create(name='Alberca')
+        jardin = Tag.objects.create(name='Jardín')
+        rows = [
+            dict(title='Casa con alberca', price='1250000.5', category=casas,
+                 featured_image='properties/casa.jpg', gps_location='19.43, -99.13',
+                 published_at=timezone.now()),
+            dict(title='Depto de lujo', price=18000, operation='rent', category=lujo),
+            dict(title='Terreno', price=300000, property_type='land'),
+        ]
+        for i, row in enumerate(rows):
+            prop = Property.objects.create(
+                description='Test', operation=row.pop('operation', 'sale'),
+                address=f'Calle {i}', city='CDMX', area=100, agent=agent,
+                status='published', **row,
+            )
+            if i < 2:
+                prop.tags.set([alberca, jardin][:i + 1])
+        return Property.objects.select_related('agent', 'category').prefetch_related('tags')
+
+    def test_is_used_for_many(self):
+        assert isinstance(PropertyListSerializer([], many=True), FastPropertyListSerializer)
+
+    def test_output_is_byte_identical(self, catalog):
+        fast = PropertyListSerializer(catalog, many=True).data
+
+        assert JSONRenderer().render(fast) == JSONRenderer().render(drf_payload(catalog))
+
+    def test_output_with_request_and_distance(self, catalog):
+        request = APIRequestFactory().get('/api/properties/')
+        near = list(geo.near(catalog, 19.43, -99.13, 5))
+        context = {'request': request}
+
+        fast = PropertyListSerializer(near, many=True, context=context).data
+
+        assert fast[0]['featured_image'].startswith('http://testserver/')
+        assert 'distance' in fast[0]
+        assert JSONRenderer().render(fast) == JSONRenderer().render(
+            drf_payload(near, context=context)
+        )
+
+    def test_category_children_do_not_query_per_row(self, catalog, django_assert_num_queries):
+        properties = list(catalog)
+
+        # Solo la carga del árbol de categorías, sin importar cuántas filas haya
+        with django_assert_num_queries(1):
+            PropertyListSerializer(properties, many=True).data
+
+    def test_list_endpoint_matches_drf(self, api_client, catalog):
+        response = api_client.get('/api/properties/')
+
+        ids = [item['id'] for item in response.data['results']]
+        ordered = sorted(catalog, key=lambda prop: ids.index(prop.pk))
+        expected = drf_payload(ordered, context={'request': response.wsgi_request})
+        assert JSONRenderer().render(response.data['results']) == JSONRenderer().render(expected)
@@ -0,0 +1,94 @@
+import pytest
+from rest_framework import status
+from apps.properties import geo
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+def test_geohash_encoding():
+    assert geo.encode(57.64911, 10.40744) == 'u4pruydqq'
+
+
+def test_cover_stays_bounded():
+    cells = geo.cover(20.60, -103.42, 20.72, -103.30)
+    assert 0 < len(cells) <= geo.MAX_COVER_CELLS
+    assert geo.encode(20.67, -103.35).startswith(tuple(cells))
+
+
+@pytest.mark.django_db
+class TestGeoSearch:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def catalog(self, agent_user):
+        points = {
+            'centro': '20.6767, -103.3475',        # Guadalajara centro
+            'chapultepec': '20.6736, -103.3700',   # ~2.4km
+            'zapopan': '20.7214, -103.3915',       # ~6.7km
+            'cdmx': '19.4326, -99.1332',
+        }
+        for title, point in points.items():
+            Property.objects.create(
+                title=title, description='Test', price=100000, operation='sale',
+                address='Test', city='Test', area=100, agent=agent_user,
+                status='published', gps_location=point,
+            )
+        Property.objects.create(
+            title='sin-gps', description='Test', price=1, operation='sale',
+            address='Test', city='Test', area=10, agent=agent_user,
+            status='published',
+        )
+
+    def slugs(self, response):
+        assert response.status_code == status.HTTP_200_OK
+        items = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [item['slug'] for item in items]
+
+    def test_coordinates_are_parsed_on_save(self, catalog):
+        prop = Property.objects.get(slug='cdmx')
+        assert (prop.latitude, prop.longitude) == (19.4326, -99.1332)
+        assert prop.geo_cell == geo.encode(19.4326, -99.1332)
+
+    def test_within_bbox(self, api_client, catalog):
+        response = api_client.get('/api/properties/', {
+            'within': '20.66,-103.38,20.69,-103.34',
+        })
+        assert sorted(self.slugs(response)) == ['centro', 'chapultepec']
+
+    def test_near_radius_is_sorted_by_distance(self, api_client, catalog):
+        response = api_client.get('/api/properties/', {
+            'near': '20.6767,-103.3475', 'radius': 10,
+        })
+        assert self.slugs(response) == ['centro', 'chapultepec', 'zapopan']
+        distances = [item['distance'] for item in response.data['results']]
+        assert distances[0] == pytest.approx(0, abs=0.01)
+        assert distances[1] == pytest.approx(
+            geo.haversine_km(20.6767, -103.3475, 20.6736, -103.3700), rel=1e-6)
+
+    def test_distance_is_omitted_without_geo_query(self, api_client, catalog):
+        response = api_client.get('/api/properties/')
+        assert 'distance' not in response.data['results'][0]
+
+    def test_nearest_expands_until_enough_results(self, api_client, catalog):
+        response = api_client.get('/api/properties/nearest/', {
+            'lat': 20.6767, 'lng': -103.3475, 'limit': 4,
+        })
+        assert self.slugs(response) == ['centro', 'chapultepec', 'zapopan', 'cdmx']
+
+    def test_invalid_gps_location_is_rejected(self, api_client, agent_user):
+        api_client.force_authenticate(user=agent_user)
+        response = api_client.post('/api/properties/', {
+            'title': 'Casa', 'description': 'Test', 'price': 1, 'operation': 'sale',
+            'address': 'Test', 'city': 'Test', 'state': 'Test', 'area': 10,
+            'gps_location': '200, 10',
+        })
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'gps_location' in response.data
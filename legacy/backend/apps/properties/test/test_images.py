@@ -0,0 +1,139 @@
+import io
+from concurrent.futures import Future
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+from apps.common import images
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+def make_image(size=(2000, 1500), color='navy', fmt='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.django_db
+class TestImageDerivatives:
+
+    @pytest.fixture(autouse=True)
+    def media(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        settings.IMAGE_DERIVATIVES = {'ASYNC': False}
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create(username='agent1', role='agent')
+
+    def make_property(self, agent, **kwargs):
+        return Property.objects.create(
+            title='Casa', description='Test', price=1000, operation='sale',
+            address='Test', city='Test', area=100, agent=agent,
+            status='published', **kwargs,
+        )
+
+    def test_upload_generates_variants_after_commit(
+        self, agent_user, django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            prop = self.make_property(
+                agent_user, featured_image=SimpleUploadedFile('foto.png', make_image()),
+            )
+
+        prop.refresh_from_db()
+        entry = prop.image_variants['featured_image']
+        assert prop.featured_image.name == f'properties/{entry["hash"][:2]}/{entry["hash"]}.png'
+        assert set(entry) == {'source', 'hash', 'thumbnail', 'card', 'full'}
+        with default_storage.open(images.variant_name(entry['hash'], 'card', 'webp')) as fh:
+            card = Image.open(fh)
+            assert (card.format, card.size) == ('WEBP', (640, 480))
+        with default_storage.open(images.variant_name(entry['hash'], 'full', 'jpeg')) as fh:
+            assert Image.open(fh).size == (1600, 1200)
+
+    def test_identical_uploads_share_original_and_variants(
+        self, agent_user, django_capture_on_commit_callbacks, monkeypatch,
+    ):
+        data = make_image()
+        with django_capture_on_commit_callbacks(execute=True):
+            first = self.make_property(agent_user, featured_image=SimpleUploadedFile('a.png', data))
+        renders = []
+        monkeypatch.setattr(images, 'render', lambda data: renders.append(data))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            second = self.make_property(agent_user, featured_image=SimpleUploadedFile('b.png', data))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert second.featured_image.name == first.featured_image.name
+        assert second.image_variants['featured_image']['hash'] == first.image_variants['featured_image']['hash']
+        assert renders == []
+
+    def test_gallery_and_serializers(self, api_client, agent_user, django_capture_on_commit_callbacks):
+        stored = default_storage.save('uploads/galeria.png', io.BytesIO(make_image((800, 600), 'red')))
+        with django_capture_on_commit_callbacks(execute=True):
+            prop = self.make_property(agent_user, gallery=[default_storage.url(stored), 'uploads/no-existe.png'])
+
+        response = api_client.get(f'/api/properties/{prop.slug}/')
+        gallery = response.data['image_variants']['gallery']
+        assert gallery[0]['thumbnail']['jpeg'].startswith('/media/derivatives/')
+        assert 'error' in gallery[1]
+
+        listing = api_client.get('/api/properties/').data['results'][0]
+        assert listing['featured_image_variants'] is None
+
+    def test_backfill_command(self, agent_user):
+        prop = self.make_property(agent_user)
+        stored = default_storage.save('avatars/yo.jpg', io.BytesIO(make_image((300, 300), fmt='JPEG')))
+        Property.objects.filter(pk=prop.pk).update(gallery=[stored])
+        User.objects.filter(pk=agent_user.pk).update(avatar=stored)
+
+        call_command('process_images', workers=0)
+
+        prop.refresh_from_db()
+        agent_user.refresh_from_db()
+        assert prop.image_variants['gallery'][0]['hash'] == agent_user.image_variants['avatar']['hash']
+        assert not images.needs_processing(prop)
+
+    def test_variants_ready_is_sent_by_the_parent(self, agent_user, monkeypatch):
+        stored = default_storage.save('uploads/casa.png', io.BytesIO(make_image((400, 300))))
+        prop = self.make_property(agent_user)
+        Property.objects.filter(pk=prop.pk).update(gallery=[stored])
+        sent = []
+        receiver = lambda sender, pk, **kwargs: sent.append((sender, pk))
+        images.variants_ready.connect(receiver)
+        try:
+            # En el pool solo se procesa; la señal sale del callback del padre
+            assert images.process('properties.property', prop.pk)
+            assert sent == []
+            future = Future()
+            future.set_result(True)
+            images._on_done('properties.property', prop.pk, future)
+        finally:
+            images.variants_ready.disconnect(receiver)
+        assert sent == [(Property, prop.pk)]
+
+    @pytest.mark.parametrize('source', [
+        'http://169.254.169.254/latest/meta-data/',
+        'https://imagenes.example.com/casa.jpg',
+        'file:///etc/passwd',
+    ])
+    def test_remote_sources_must_be_allowed_and_public(self, settings, monkeypatch, source):
+        settings.IMAGE_DERIVATIVES = {'ASYNC': False, 'ALLOWED_HOSTS': ['imagenes.example.com']}
+        monkeypatch.setattr(images.socket, 'getaddrinfo',
+                            lambda *args, **kwargs: [(None, None, None, '', ('10.0.0.5', 443))])
+        monkeypatch.setattr(images, '_opener', None)  # nunca se llega a conectar
+
+        with pytest.raises(ValueError):
+            images.read_source(source)
+
+    def test_failed_sources_record_a_generic_error(self, agent_user):
+        prop = self.make_property(agent_user)
+        prop.gallery = ['http://10.0.0.1/admin']
+
+        entry = images.build_variants(prop)['gallery'][0]
+
+        assert entry == {'source': 'http://10.0.0.1/admin', 'error': images.SOURCE_ERROR}
@@ -0,0 +1,214 @@
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from rest_framework import status
+from apps.categories.models import Category, Tag
+from apps.properties import search, similar, stats, suggest
+from apps.properties.importer import PropertyImporter, read_rows
+from apps.properties.models import Property
+from apps.users.models import User
+
+CSV_HEADER = 'external_ref,title,description,price,operation,address,city,state,area,agent,category,tags,status,gps_location\n'
+
+
+def csv_rows(*lines):
+    return read_rows(io.StringIO(CSV_HEADER + ''.join(line + '\n' for line in lines)), 'csv')
+
+
+@pytest.mark.django_db
+class TestPropertyImport:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def other_agent(self):
+        return User.objects.create_user(
+            username='agent2', email='agent2@test.com', password='pass123', role='agent'
+        )
+
+    @pytest.fixture
+    def casas(self):
+        return Category.objects.create(name='Casas')
+
+    @pytest.fixture
+    def indexes(self):
+        similar.reset()
+        suggest.reset()
+        yield similar.get_index(), suggest.get_index()
+        similar.reset()
+        suggest.reset()
+
+    def test_creates_properties_with_tags_and_side_effects(self, agent_user, casas, indexes):
+        Tag.objects.create(name='Alberca')
+        report = PropertyImporter().run(csv_rows(
+            'A-1,Casa en Puebla,Con jardín,800000,sale,Calle 1,Puebla,Puebla,120,agent1,casas,Alberca|Jardín,published,"19.04, -98.2"',
+            'A-2,Casa en Puebla,Céntrica,900000,sale,Calle 2,Puebla,Puebla,90,agent@test.com,Casas,,draft,',
+        ))
+
+        assert report == {'created': 2, 'updated': 0, 'failed': 0, 'errors': []}
+        first, second = Property.objects.order_by('external_ref')
+        assert (first.slug, second.slug) == ('casa-en-puebla', 'casa-en-puebla-1')
+        assert first.category == casas and first.agent == agent_user
+        assert sorted(first.tags.values_list('name', flat=True)) == ['Alberca', 'Jardín']
+        assert first.geo_cell.startswith('9')
+        # Lo que harían los signals: índice, rollups
+        assert list(search.search_properties(Property.objects.all(), 'jardin')) == [first]
+        assert stats.check() == []
+        assert stats.read_stats()['total'] == 1
+        # Índices en memoria ya armados: solo la publicada
+        similar_index, suggest_index = indexes
+        assert len(similar_index) == 1
+        assert suggest_index.suggest('jar', 5) == [{'text': 'Jardín', 'kind': 'tag', 'count': 1}]
+        assert {'text': 'Casas', 'kind': 'category', 'count': 1} in suggest_index.suggest('cas', 5)
+
+    def test_upserts_on_external_ref(self, agent_user, casas):
+        PropertyImporter().run(csv_rows(
+            'A-1,Casa,Test,800000,sale,Calle 1,Puebla,Puebla,120,agent1,,Alberca,published,',
+        ))
+        prop = Property.objects.get()
+        Property.objects.update(updated_at=prop.updated_at - timedelta(days=1))
+        prop.refresh_from_db()
+
+        rows = [(1, {'external_ref': 'A-1', 'title': 'Casa remodelada', 'description': 'Test',
+                     'price': '950000', 'operation': 'sale', 'address': 'Calle 1',
+                     'city': 'Toluca', 'state': 'México', 'area': 120, 'tags': []})]
+        report = PropertyImporter().run(rows)
+
+        assert report['updated'] == 1 and report['created'] == 0
+        prop.refresh_from_db()
+        assert (prop.title, prop.city, prop.slug) == ('Casa remodelada', 'Toluca', 'casa')
+        assert prop.status == 'published'  # columna ausente: se conserva
+        # bulk_update no aplica auto_now: ETag del detalle y analítica lo usan
+        assert prop.updated_at > timezone.now() - timedelta(minutes=1)
+        assert prop.tags.count() == 0
+        assert stats.check() == []
+
+    def test_reports_row_errors_without_aborting(self, agent_user):
+        report = PropertyImporter().run(csv_rows(
+            'A-1,Casa,Test,no-es-precio,sale,Calle,Puebla,Puebla,120,agent1,,,,',
+            'A-2,Casa,Test,100,sale,Calle,Puebla,Puebla,120,nadie,,,,',
+            'A-3,Casa,Test,100,sale,Calle,Puebla,Puebla,120,agent1,Inexistente,,,',
+            'A-4,Casa,Test,100,sale,Calle,Puebla,Puebla,120,agent1,,,,',
+        ))
+
+        assert (report['created'], report['failed']) == (1, 3)
+        assert [(e['row'], list(e['errors'])) for e in report['errors']] == [
+            (1, ['price']), (2, ['agent']), (3, ['category']),
+        ]
+        assert Property.objects.get().external_ref == 'A-4'
+
+    def concurrent_insert(self, monkeypatch, agent):
+        """Otra importación da de alta ``A-1`` justo después de leer ``existing``."""
+        in_bulk = Property.objects.in_bulk
+
+        def racing_in_bulk(*args, **kwargs):
+            existing = in_bulk(*args, **kwargs)
+            if not Property.objects.filter(external_ref='A-1').exists():
+                Property.objects.create(
+                    title='Concurrente', description='Test', price=1, operation='sale',
+                    address='Test', city='Test', state='Test', area=1, agent=agent,
+                    external_ref='A-1',
+                )
+            return existing
+
+        monkeypatch.setattr(Property.objects, 'in_bulk', racing_in_bulk)
+
+    def test_concurrent_insert_of_same_ref_becomes_update(self, monkeypatch, agent_user):
+        self.concurrent_insert(monkeypatch, agent_user)
+
+        report = PropertyImporter().run(csv_rows(
+            'A-1,Casa,Test,100,sale,Calle,Puebla,Puebla,120,agent1,,Alberca,,',
+            'A-2,Casa,Test,100,sale,Calle,Puebla,Puebla,120,agent1,,Alberca,,',
+        ))
+
+        assert report == {'created': 1, 'updated': 1, 'failed': 0, 'errors': []}
+        assert Property.objects.get(external_ref='A-1').title == 'Casa'
+        assert Property.objects.filter(tags__name='Alberca').count() == 2
+
+    def test_concurrent_insert_by_other_agent_is_reported(self, monkeypatch, agent_user, other_agent):
+        self.concurrent_insert(monkeypatch, other_agent)
+
+        report = PropertyImporter(agent=agent_user).run(csv_rows(
+            'A-1,Casa,Test,100,sale,Calle,Puebla,Puebla,120,,,,,',
+            'A-2,Casa,Test,100,sale,Calle,Puebla,Puebla,120,,,,,',
+        ))
+
+        assert (report['created'], report['updated'], report['failed']) == (1, 0, 1)
+        assert [(e['row'], list(e['errors'])) for e in report['errors']] == [(1, ['external_ref'])]
+        assert Property.objects.get(external_ref='A-1').agent == other_agent
+
+    def test_short_csv_rows_leave_optional_columns_empty(self, agent_user):
+        header = 'external_ref,title,description,price,operation,address,city,state,area,rooms,agent\n'
+        rows = read_rows(io.StringIO(header + 'A-1,Casa,Test,100,sale,Calle,Puebla,Puebla,120\n'), 'csv')
+
+        report = PropertyImporter(agent=agent_user).run(rows)
+
+        assert (report['created'], report['errors']) == (1, [])
+
+    def test_queries_do_not_grow_with_rows(self, agent_user, django_assert_max_num_queries):
+        def rows(count):
+            return csv_rows(*[
+                f'R-{i},Casa {i % 3},Test,100,sale,Calle,Puebla,Puebla,50,agent1,,Tag {i % 4},published,'
+                for i in range(count)
+            ])
+
+        PropertyImporter(chunk_size=200).run(rows(20))
+        with django_assert_max_num_queries(40):
+            report = PropertyImporter(chunk_size=200).run(rows(150))
+
+        assert (report['created'], report['updated']) == (130, 20)
+        assert Property.objects.filter(tags__isnull=False).count() == 150
+
+    def test_jsonl_endpoint_scopes_rows_to_agent(self, api_client, agent_user, other_agent):
+        Property.objects.create(
+            title='Ajena', description='Test', price=1, operation='sale', address='Test',
+            city='Test', area=10, agent=other_agent, external_ref='X-1',
+        )
+        lines = [
+            {'external_ref': 'X-1', 'title': 'Robo', 'description': 'Test', 'price': 1,
+             'operation': 'sale', 'address': 'Test', 'city': 'Test', 'state': 'Test', 'area': 10},
+            {'external_ref': 'X-2', 'title': 'Propia', 'description': 'Test', 'price': 1,
+             'operation': 'rent', 'address': 'Test', 'city': 'Test', 'state': 'Test', 'area': 10,
+             'agent': 'agent2'},
+        ]
+        upload = SimpleUploadedFile(
+            'feed.jsonl', '\n'.join(json.dumps(line) for line in lines).encode() + b'\nnot json\n',
+        )
+        api_client.force_authenticate(user=agent_user)
+
+        response = api_client.post('/api/properties/import/', {'file': upload}, format='multipart')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['created'], response.data['failed']) == (1, 2)
+        assert Property.objects.get(external_ref='X-2').agent == agent_user
+        assert Property.objects.get(external_ref='X-1').title == 'Ajena'
+
+    def test_unreadable_upload_is_reported(self, api_client, agent_user):
+        content = CSV_HEADER + 'A-1,Casa,Jardín,100,sale,Calle,Puebla,Puebla,120,,,,,\n'
+        upload = SimpleUploadedFile('feed.csv', content.encode('latin-1'))
+        api_client.force_authenticate(user=agent_user)
+
+        response = api_client.post('/api/properties/import/', {'file': upload}, format='multipart')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['created'], response.data['failed']) == (0, 1)
+        assert 'UTF-8' in response.data['errors'][0]['errors']['non_field_errors'][0]
+
+    def test_endpoint_requires_agent(self, api_client):
+        client = User.objects.create_user(username='c', password='pass123', role='client')
+        api_client.force_authenticate(user=client)
+
+        response = api_client.post('/api/properties/import/', {}, format='multipart')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,101 @@
+import pytest
+from apps.inquiries import counters, queue
+from apps.inquiries.models import Inquiry
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestInquiryCounters:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def properties(self, agent_user):
+        return [
+            Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000, operation='sale',
+                address='Test', city='Test', area=100, agent=agent_user, status='published',
+            )
+            for i in range(2)
+        ]
+
+    def inquire(self, prop, **kwargs):
+        return Inquiry.objects.create(property=prop, client_email='c@test.com',
+                                      message='Hola', **kwargs)
+
+    def test_counters_follow_inquiry_lifecycle(self, properties):
+        casa, otra = properties
+        first = self.inquire(casa)
+        second = self.inquire(casa)
+        self.inquire(otra, status='closed')
+
+        first.mark_as_contacted()
+        second.property = otra
+        second.save()
+        first.delete()
+
+        casa.refresh_from_db()
+        otra.refresh_from_db()
+        assert (casa.inquiry_count, casa.inquiries_new, casa.inquiries_contacted) == (0, 0, 0)
+        assert (otra.inquiry_count, otra.inquiries_new, otra.inquiries_closed) == (2, 1, 1)
+        assert counters.check() == []
+
+    def test_detail_reads_stored_columns(self, authenticated_client, properties):
+        casa = properties[0]
+        api_client = authenticated_client
+        api_client.post(f'/api/properties/{casa.slug}/inquire/',
+                        {'client_email': 'c@test.com', 'message': 'Hola'})
+        queue.process_pending()
+
+        response = api_client.get(f'/api/properties/{casa.slug}/')
+
+        assert response.data['inquiry_count'] == 1
+        assert response.data['inquiries_new'] == 1
+
+    def test_list_sorts_by_counter_and_refreshes_cache(self, api_client, properties):
+        casa, otra = properties
+        self.inquire(casa)
+
+        response = api_client.get('/api/properties/', {'ordering': '-inquiry_count'})
+        assert [item['id'] for item in response.data['results']] == [casa.pk, otra.pk]
+        assert response.data['results'][0]['inquiry_count'] == 1
+
+        self.inquire(otra)
+        self.inquire(otra)
+        response = api_client.get('/api/properties/', {'ordering': '-inquiry_count'})
+        assert response['X-Cache'] == 'MISS'
+        assert [item['id'] for item in response.data['results']] == [otra.pk, casa.pk]
+
+    def test_list_sorts_by_status_counter(self, api_client, properties):
+        casa, otra = properties
+        self.inquire(otra)
+        self.inquire(casa, status='closed')
+
+        response = api_client.get('/api/properties/', {'ordering': '-inquiries_closed'})
+        assert [item['id'] for item in response.data['results']] == [casa.pk, otra.pk]
+
+        self.inquire(otra, status='closed')
+        self.inquire(otra, status='closed')
+        response = api_client.get('/api/properties/', {'ordering': '-inquiries_closed'})
+        assert response['X-Cache'] == 'MISS'
+        assert [item['id'] for item in response.data['results']] == [otra.pk, casa.pk]
+
+    def test_recompute_repairs_counters(self, properties):
+        casa, otra = properties
+        self.inquire(casa, status='qualified')
+        Property.objects.update(inquiry_count=7, inquiries_qualified=0)
+        assert len(counters.check()) == 2
+
+        assert counters.recompute() == 2
+
+        casa.refresh_from_db()
+        assert (casa.inquiry_count, casa.inquiries_qualified) == (1, 1)
+        assert counters.check() == []
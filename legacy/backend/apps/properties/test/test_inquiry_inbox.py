@@ -0,0 +1,119 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from apps.categories.models import Category, Tag
+from apps.inquiries import counters, stats
+from apps.inquiries.models import Inquiry
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestInquiryInbox:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def agent_client(self, api_client, agent_user):
+        api_client.force_authenticate(user=agent_user)
+        return api_client
+
+    def make_inquiries(self, agent, count):
+        casas = Category.objects.create(name=f'Casas {count}')
+        Category.objects.create(name=f'Lujo {count}', parent=casas)
+        tag = Tag.objects.create(name=f'Alberca {count}')
+        inquiries = []
+        for i in range(count):
+            prop = Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000, operation='sale',
+                address='Test', city='Test', area=100, agent=agent,
+                category=casas, status='published',
+            )
+            prop.tags.add(tag)
+            client = User.objects.create(username=f'client{count}-{i}')
+            inquiries.append(Inquiry.objects.create(
+                property=prop, client=client, client_email='c@test.com', message='Hola',
+            ))
+        return inquiries
+
+    def test_inbox_query_count_does_not_grow_with_page(self, agent_client, agent_user):
+        self.make_inquiries(agent_user, 2)
+        agent_client.get('/api/inquiries/')  # árbol de categorías en caché
+        with CaptureQueriesContext(connection) as small:
+            agent_client.get('/api/inquiries/', {'page_size': 50})
+
+        self.make_inquiries(agent_user, 12)
+        agent_client.get('/api/inquiries/')
+        with CaptureQueriesContext(connection) as large:
+            response = agent_client.get('/api/inquiries/', {'page_size': 50})
+
+        assert len(response.data['results']) == 14
+        assert len(large.captured_queries) == len(small.captured_queries) <= 3
+
+    def test_inbox_filters(self, agent_client, agent_user):
+        first, second, third = self.make_inquiries(agent_user, 3)
+        first.mark_as_contacted()
+
+        response = agent_client.get('/api/inquiries/', {'status': ['new', 'closed']})
+        assert {item['id'] for item in response.data['results']} == {second.pk, third.pk}
+
+        response = agent_client.get('/api/inquiries/', {'property': third.property_id})
+        assert [item['id'] for item in response.data['results']] == [third.pk]
+
+        today = first.created_at.date().isoformat()
+        response = agent_client.get('/api/inquiries/', {'created_after': today})
+        assert len(response.data['results']) == 3
+        response = agent_client.get('/api/inquiries/', {'created_before': '2000-01-01'})
+        assert response.data['results'] == []
+
+    def test_inbox_pages_by_foreign_key_ordering(self, agent_client, agent_user):
+        inquiries = self.make_inquiries(agent_user, 5)
+        seen, url, params = [], '/api/inquiries/', {'ordering': 'property', 'page_size': 2}
+        while url:
+            response = agent_client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [item['id'] for item in response.data['results']]
+            url, params = response.data['next'], None
+
+        assert seen == [inquiry.pk for inquiry in inquiries]
+        response = agent_client.get('/api/inquiries/', {'ordering': 'client_email,message'})
+        assert response.status_code == status.HTTP_200_OK  # campos no declarados se ignoran
+
+    def test_bulk_status_updates_in_one_statement(self, agent_client, agent_user):
+        inquiries = self.make_inquiries(agent_user, 3)
+        other_agent = User.objects.create_user(username='agent2', password='x', role='agent')
+        foreign = self.make_inquiries(other_agent, 1)[0]
+        ids = [inquiry.pk for inquiry in inquiries[:2]] + [foreign.pk]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = agent_client.post('/api/inquiries/bulk_status/',
+                                         {'ids': ids, 'status': 'contacted'}, format='json')
+
+        assert response.data['updated'] == 2
+        assert sum(q['sql'].startswith('UPDATE "inquiries"') for q in queries.captured_queries) == 1
+        contacted = Inquiry.objects.get(pk=ids[0])
+        assert contacted.is_contacted and contacted.contacted_at == contacted.updated_at
+        assert Inquiry.objects.get(pk=foreign.pk).status == 'new'
+        assert stats.check() == []
+        assert counters.check() == []
+
+        agent_client.post('/api/inquiries/bulk_status/',
+                          {'ids': ids, 'status': 'closed'}, format='json')
+        assert Inquiry.objects.filter(status='closed').count() == 2
+        assert stats.check() == [] and counters.check() == []
+
+    def test_bulk_status_is_for_agents(self, api_client, user):
+        api_client.force_authenticate(user=user)
+
+        response = api_client.post('/api/inquiries/bulk_status/',
+                                   {'ids': [1], 'status': 'closed'}, format='json')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
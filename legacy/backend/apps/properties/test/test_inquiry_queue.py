@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from apps.inquiries import queue
+from apps.inquiries.models import Inquiry, InquiryNotification, InquirySubmission
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestInquiryQueue:
+
+    @pytest.fixture
+    def agents(self):
+        return [
+            User.objects.create_user(username=f'agent{i}', email=f'agent{i}@test.com',
+                                     password='pass123', role='agent')
+            for i in range(2)
+        ]
+
+    @pytest.fixture
+    def properties(self, agents):
+        return [
+            Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000, operation='sale',
+                address='Test', city='Test', area=100, agent=agents[i // 2],
+                status='published',
+            )
+            for i in range(3)
+        ]
+
+    def inquire(self, client, prop, email='c@test.com', message='Hola'):
+        return client.post(f'/api/properties/{prop.slug}/inquire/',
+                           {'client_email': email, 'message': message})
+
+    def test_endpoint_only_enqueues(self, authenticated_client, properties):
+        response = self.inquire(authenticated_client, properties[0])
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['success'] is True
+        submission = InquirySubmission.objects.get()
+        assert submission.status == InquirySubmission.PENDING
+        assert not Inquiry.objects.exists()
+        assert mail.outbox == []
+
+    def test_duplicates_collapse_within_window(self, authenticated_client, properties):
+        casa, otra = properties[:2]
+        self.inquire(authenticated_client, casa)
+        self.inquire(authenticated_client, casa, email='C@Test.com')
+        self.inquire(authenticated_client, casa, message='¿Acepta crédito?')
+        self.inquire(authenticated_client, otra)
+
+        assert queue.process_pending() == 4
+        inquiry = Inquiry.objects.get(property=casa)
+        assert inquiry.message == 'Hola\n\n¿Acepta crédito?'
+        assert Inquiry.objects.filter(property=otra).count() == 1
+        statuses = list(InquirySubmission.objects.values_list('status', 'inquiry'))
+        assert statuses[:3] == [('processed', inquiry.pk), ('duplicate', inquiry.pk),
+                                ('duplicate', inquiry.pk)]
+        assert InquiryNotification.objects.count() == 2
+        casa.refresh_from_db()
+        assert casa.inquiry_count == 1
+
+        # Fuera de la ventana es una consulta nueva
+        Inquiry.objects.filter(pk=inquiry.pk).update(
+            created_at=timezone.now() - timedelta(hours=1))
+        self.inquire(authenticated_client, casa)
+        queue.process_pending()
+        assert Inquiry.objects.filter(property=casa).count() == 2
+
+    def test_digests_batch_per_agent(self, authenticated_client, properties, agents):
+        for i, prop in enumerate(properties):
+            self.inquire(authenticated_client, prop, email=f'c{i}@test.com')
+        queue.process_pending()
+
+        assert queue.send_digests() == 0  # todavía dentro de DIGEST_INTERVAL
+        later = timezone.now() + timedelta(minutes=10)
+        assert queue.send_digests(now=later) == 2
+
+        by_agent = {message.to[0]: message for message in mail.outbox}
+        assert by_agent['agent0@test.com'].subject == '2 consultas nuevas'
+        assert 'c1@test.com' in by_agent['agent0@test.com'].body
+        assert by_agent['agent1@test.com'].subject == '1 consulta nueva'
+        assert not InquiryNotification.objects.filter(sent_at__isnull=True).exists()
+        assert queue.send_digests(now=later) == 0
+
+    def test_digest_max_sends_early(self, settings, authenticated_client, properties):
+        settings.INQUIRY_QUEUE = {'DIGEST_MAX': 2}
+        self.inquire(authenticated_client, properties[0], email='a@test.com')
+        self.inquire(authenticated_client, properties[2], email='b@test.com')
+        queue.process_pending()
+        assert queue.send_digests() == 0
+
+        self.inquire(authenticated_client, properties[1], email='b@test.com')
+        queue.process_pending()
+        assert queue.send_digests() == 1
+        assert mail.outbox[0].to == ['agent0@test.com']
+
+    def test_inline_mode_and_worker_command(self, settings, authenticated_client, properties,
+                                            query_budget):
+        settings.INQUIRY_QUEUE = {'ASYNC': False, 'DIGEST_INTERVAL': 0}
+        self.inquire(authenticated_client, properties[0])
+        assert Inquiry.objects.count() == 1
+        query_budget.clear()  # el presupuesto de inquire es el del modo encolado
+        assert mail.outbox == []  # el aviso sigue yendo por digest
+
+        settings.INQUIRY_QUEUE = {'DIGEST_INTERVAL': 0}
+        self.inquire(authenticated_client, properties[1], email='otro@test.com')
+        call_command('process_inquiries', '--once')
+
+        assert Inquiry.objects.count() == 2
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].subject == '2 consultas nuevas'
+
+    def test_claimed_digests_are_not_sent_twice(self, settings, authenticated_client, properties):
+        settings.INQUIRY_QUEUE = {'DIGEST_INTERVAL': 0}
+        self.inquire(authenticated_client, properties[0])
+        queue.process_pending()
+        # Otro worker lo tomó y todavía no terminó
+        InquiryNotification.objects.update(claimed_at=timezone.now())
+
+        assert queue.send_digests() == 0
+        later = timezone.now() + timedelta(minutes=11)  # pasado CLAIM_TIMEOUT
+        assert queue.send_digests(now=later) == 1
+        assert InquiryNotification.objects.get().sent_at == later
+
+    def test_failed_digests_stop_at_max_attempts(
+        self, settings, authenticated_client, properties, monkeypatch,
+    ):
+        settings.INQUIRY_QUEUE = {'DIGEST_INTERVAL': 0, 'MAX_ATTEMPTS': 2}
+        self.inquire(authenticated_client, properties[0])
+        queue.process_pending()
+
+        def fail(*args):
+            raise ConnectionError('SMTP caído')
+
+        monkeypatch.setattr(locmem.EmailBackend, 'send_messages', fail)
+        assert queue.send_digests() == 0
+        assert queue.send_digests() == 0
+        notification = InquiryNotification.objects.get()
+        assert (notification.attempts, notification.claimed_at) == (2, None)
+
+        monkeypatch.undo()
+        assert queue.send_digests() == 0
+        assert mail.outbox == []
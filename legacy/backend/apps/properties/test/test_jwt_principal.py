@@ -0,0 +1,171 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.users.authentication import Principal, UserCache, get_user_cache, publish_claims
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestJWTPrincipal:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    def login(self, username='agent1'):
+        response = APIClient().post('/api/auth/login/',
+                                    {'username': username, 'password': 'pass123'})
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    @pytest.fixture
+    def shared_claims_cache(self, settings):
+        settings.JWT_PRINCIPAL = {**settings.JWT_PRINCIPAL, 'CLAIMS_CACHE_SHARED': True}
+
+    def test_requests_authenticate_without_user_query(self, agent_user, shared_claims_cache):
+        client = self.client_for(self.login()['access'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/inquiries/')
+            stats = client.get('/api/inquiries/stats/')
+        assert response.status_code == stats.status_code == status.HTTP_200_OK
+        assert isinstance(response.wsgi_request.user, Principal)
+        assert response.wsgi_request.user.role == 'agent'
+        assert not [q for q in ctx.captured_queries if 'FROM "users"' in q['sql']]
+
+        # El perfil sí necesita el User: una query y después del caché
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get('/api/users/me/').data['username'] == 'agent1'
+            assert client.get('/api/users/me/').data['username'] == 'agent1'
+        assert len([q for q in ctx.captured_queries if 'FROM "users"' in q['sql']]) == 1
+
+    def test_role_and_active_changes_revoke_tokens(self, agent_user):
+        tokens = self.login()
+        client = self.client_for(tokens['access'])
+        assert client.get('/api/inquiries/').status_code == status.HTTP_200_OK
+
+        agent_user.bio = 'Sin cambios de permisos'
+        agent_user.save()
+        assert client.get('/api/inquiries/').status_code == status.HTTP_200_OK
+
+        agent_user.role = 'client'
+        agent_user.save(update_fields=['role'])
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+        refreshed = APIClient().post('/api/auth/refresh/', {'refresh': tokens['refresh']})
+        assert refreshed.status_code == status.HTTP_200_OK
+        response = self.client_for(refreshed.data['access']).get('/api/inquiries/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.wsgi_request.user.role == 'client'
+
+        agent_user.is_active = False
+        agent_user.save()
+        assert self.client_for(refreshed.data['access']).get(
+            '/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+        assert APIClient().post('/api/auth/refresh/', {
+            'refresh': refreshed.data['refresh']}).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_revocation_survives_missing_claims(self, agent_user, shared_claims_cache):
+        client = self.client_for(self.login()['access'])
+        assert client.get('/api/inquiries/').status_code == status.HTTP_200_OK
+
+        # Clave desalojada (o publicada en otro worker): se verifica contra el User
+        agent_user.is_active = False
+        agent_user.save()
+        cache.clear()
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+        agent_user.is_active = True
+        agent_user.save()
+        client = self.client_for(self.login()['access'])
+        agent_user.role = 'client'
+        agent_user.save()
+        cache.clear()
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_does_not_undo_revocation(self, agent_user, shared_claims_cache):
+        tokens = self.login()
+        client = self.client_for(tokens['access'])
+        stale = User.objects.get(pk=agent_user.pk)
+
+        agent_user.role = 'client'
+        agent_user.save()
+        # Otro worker todavía tiene al agente en su UserCache
+        get_user_cache()._entries[agent_user.pk] = (time.monotonic() + 60, stale)
+        refreshed = APIClient().post('/api/auth/refresh/', {'refresh': tokens['refresh']})
+        assert refreshed.status_code == status.HTTP_200_OK
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+        agent_user.is_active = False
+        agent_user.save()
+        get_user_cache()._entries[agent_user.pk] = (time.monotonic() + 60, stale)
+        assert APIClient().post('/api/auth/refresh/', {
+            'refresh': tokens['refresh']}).status_code == status.HTTP_401_UNAUTHORIZED
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_local_claims_cache_is_not_trusted(self, agent_user):
+        client = self.client_for(self.login()['access'])
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get('/api/inquiries/').status_code == status.HTTP_200_OK
+            assert client.get('/api/inquiries/').status_code == status.HTTP_200_OK
+        assert len([q for q in ctx.captured_queries if 'FROM "users"' in q['sql']]) == 1
+
+        # Otro worker con claims viejos en su caché local: manda el User
+        agent_user.role = 'client'
+        agent_user.save()
+        publish_claims(agent_user.pk, {'role': 'agent', 'is_staff': False,
+                                       'is_superuser': False})
+        assert client.get('/api/inquiries/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_rest_auth_views_get_full_user(self, agent_user):
+        client = self.client_for(self.login()['access'])
+        response = client.get('/api/auth/user/')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['username'], response.data['email']) == (
+            'agent1', 'agent@test.com')
+
+        response = client.patch('/api/auth/user/', {'first_name': 'Ana'})
+        assert response.status_code == status.HTTP_200_OK
+        agent_user.refresh_from_db()
+        assert agent_user.first_name == 'Ana'
+
+        response = client.post('/api/auth/password/change/', {
+            'new_password1': 'Otra-clave-123', 'new_password2': 'Otra-clave-123'})
+        assert response.status_code == status.HTTP_200_OK
+        agent_user.refresh_from_db()
+        assert agent_user.check_password('Otra-clave-123')
+
+    def test_user_cache_is_bounded_and_expires(self, agent_user, user, monkeypatch):
+        cache = UserCache(max_size=1, ttl=60)
+        now = [1000.0]
+        monkeypatch.setattr('apps.users.authentication.time.monotonic', lambda: now[0])
+
+        assert cache.get(agent_user.pk).username == 'agent1'
+        assert cache.get(agent_user.pk) is not cache.get(agent_user.pk)  # copias
+        assert list(cache._entries) == [agent_user.pk]
+        cache.get(user.pk)
+        assert list(cache._entries) == [user.pk]
+
+        User.objects.filter(pk=user.pk).update(first_name='Nuevo')
+        assert cache.get(user.pk).first_name == ''
+        now[0] += 61
+        assert cache.get(user.pk).first_name == 'Nuevo'
+
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        cache.invalidate(user.pk)
+        assert cache.get(user.pk) is None
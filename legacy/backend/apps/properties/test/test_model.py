@@ -1,8 +1,11 @@
 import pytest
+from django.db import connection
 from django.utils.text import slugify
 from apps.properties.models import Property
 from apps.users.models import User
 from apps.categories.models import Category
+from apps.common import slugs
+from apps.common.slugs import next_slug
 
 @pytest.mark.django_db
 class TestPropertyModel:
@@ -81,4 +84,49 @@ class TestPropertyModel:
             agent=agent_user
         )
         
-        assert property.operation_label == 'Alquiler'
\ No newline at end of file
+        assert property.operation_label == 'Alquiler'
+    
+    def test_duplicate_titles_get_numbered_slugs(self, agent_user, django_assert_max_num_queries):
+        data = dict(title='Casa en venta', description='Test', price=1,
+                    operation='sale', address='Test', city='Test', area=10,
+                    agent=agent_user)
+        created = [Property.objects.create(**data).slug for _ in range(3)]
+        Property.objects.create(**{**data, 'title': 'Casa en venta bonita'})
+        
+        # Una sola query sin importar cuántos duplicados existan
+        with django_assert_max_num_queries(1):
+            created.append(next_slug(Property, 'Casa en venta'))
+        
+        assert created == ['casa-en-venta', 'casa-en-venta-1', 'casa-en-venta-2', 'casa-en-venta-3']
+    
+    def test_slug_collision_is_retried(self, agent_user, monkeypatch):
+        data = dict(title='Casa', description='Test', price=1, operation='sale',
+                    address='Test', city='Test', area=10, agent=agent_user)
+        Property.objects.create(**data)
+        stale = iter(['casa'])
+        real_next_slug = slugs.next_slug
+        # Simula otro proceso que tomó el slug entre la consulta y el INSERT
+        monkeypatch.setattr(slugs, 'next_slug',
+                            lambda *args: next(stale, None) or real_next_slug(*args))
+        
+        assert Property.objects.create(**data).slug == 'casa-1'
+    
+    def test_assign_slugs_in_bulk(self, agent_user):
+        Category.objects.create(name='Casa')
+        Category.objects.create(name='Casa grande')
+        categories = [Category(name=name) for name in ['Casa!', 'Casa?', 'Casa grande!', 'Lote']]
+        
+        slugs.assign_slugs(categories, 'name')
+        
+        assert [c.slug for c in categories] == ['casa-1', 'casa-2', 'casa-grande-1', 'lote']
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='índices de PostgreSQL')
+@pytest.mark.parametrize('model', [Property, Category])
+def test_slug_prefix_lookup_has_pattern_index(model):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT indexdef FROM pg_indexes WHERE tablename = %s',
+                       [model._meta.db_table])
+        definitions = [row[0] for row in cursor.fetchall()]
+    assert any('varchar_pattern_ops' in d and '(slug ' in d for d in definitions)
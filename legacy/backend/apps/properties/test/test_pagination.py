@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework import status
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def catalog(self, agent_user):
+        now = timezone.now()
+        properties = []
+        for i in range(23):
+            properties.append(Property.objects.create(
+                title=f'Casa {i}',
+                description='Test',
+                price=100000 + (i % 5) * 1000,
+                operation='sale',
+                address='Test 123',
+                city='Test',
+                area=100,
+                agent=agent_user,
+                status='published',
+                # Empates y nulos en published_at a propósito
+                published_at=None if i % 7 == 0 else now - timedelta(days=i // 3),
+            ))
+        return properties
+
+    def walk(self, api_client, params):
+        slugs = []
+        url = '/api/properties/'
+        while url:
+            response = api_client.get(url, params)
+            assert response.status_code == status.HTTP_200_OK
+            slugs += [item['slug'] for item in response.data['results']]
+            url, params = response.data['next'], None
+        return slugs
+
+    def test_pages_follow_default_ordering_without_gaps(self, api_client, catalog):
+        # NULL como mayor valor: los no publicados van primero en orden desc
+        expected = [p.slug for p in sorted(catalog, key=lambda p: (
+            p.published_at is not None,
+            -(p.published_at.timestamp() if p.published_at else 0),
+            -p.created_at.timestamp(),
+            -p.id,
+        ))]
+
+        assert self.walk(api_client, {'page_size': 4}) == expected
+
+    def test_pages_follow_requested_ordering(self, api_client, catalog):
+        expected = list(
+            Property.objects.order_by('price', 'id').values_list('slug', flat=True)
+        )
+
+        assert self.walk(api_client, {'page_size': 5, 'ordering': 'price'}) == expected
+
+    def test_previous_link_returns_the_same_page(self, api_client, catalog):
+        first = api_client.get('/api/properties/', {'page_size': 5}).data
+        second = api_client.get(first['next']).data
+        back = api_client.get(second['previous']).data
+
+        assert first['previous'] is None
+        assert [i['id'] for i in back['results']] == [i['id'] for i in first['results']]
+
+    def test_inserts_do_not_shift_pages(self, api_client, catalog, agent_user):
+        first = api_client.get('/api/properties/', {'page_size': 5}).data
+        Property.objects.create(
+            title='Casa nueva', description='Test', price=1, operation='sale',
+            address='Test', city='Test', area=10, agent=agent_user,
+            status='published', published_at=timezone.now(),
+        )
+        second = api_client.get(first['next']).data
+
+        seen = {i['id'] for i in first['results']}
+        assert not seen & {i['id'] for i in second['results']}
+        assert len(second['results']) == 5
+
+    def test_count_is_opt_in(self, api_client, catalog):
+        response = api_client.get('/api/properties/')
+        assert 'count' not in response.data
+
+        # Estimación del planner en PostgreSQL (sin ANALYZE puede ser cualquiera)
+        response = api_client.get('/api/properties/', {'count': 'approx'})
+        assert isinstance(response.data['count'], int) and response.data['count'] >= 0
+
+        response = api_client.get('/api/properties/', {'count': 'exact'})
+        assert response.data['count'] == 23
+
+    def test_invalid_cursor_is_not_found(self, api_client, catalog):
+        response = api_client.get('/api/properties/', {'cursor': 'basura'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from apps.properties import analytics, benchmark
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestPriceAnalytics:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    def create(self, agent, price, area=100, operation='sale', city='Mérida',
+               property_type='house', status='published'):
+        return Property.objects.create(
+            title='Casa', description='Test', price=price, operation=operation,
+            address='Test', city=city, area=area, property_type=property_type,
+            agent=agent, status=status,
+        )
+
+    @pytest.fixture
+    def catalog(self, agent_user):
+        specs = [
+            (1_000_000, 100, 'sale', 'Mérida', 'house'),
+            (2_000_000, 150, 'sale', 'Mérida', 'house'),
+            (3_500_000, 200, 'sale', 'Mérida', 'apartment'),
+            (8_000_000, 400, 'sale', 'Mérida', 'house'),
+            (1_500_000, 0, 'sale', 'Puebla', 'house'),
+            (2_500_000, 120, 'sale', 'Puebla', 'apartment'),
+            (12_000, 80, 'rent', 'Mérida', 'apartment'),
+            (15_000, 90, 'rent', 'Mérida', 'house'),
+        ]
+        props = [self.create(agent_user, *spec) for spec in specs]
+        self.create(agent_user, 99_000_000, status='draft')
+        Property.objects.filter(pk=self.create(agent_user, 99_000_000).pk).update(
+            is_available=False)
+        return props
+
+    def group(self, groups, **key):
+        return next(group for group in groups
+                    if all(group[dim] == value for dim, value in key.items()))
+
+    def test_matches_numpy_per_group(self, catalog):
+        groups = analytics.get_analytics().query(['city'])
+        assert [(g['operation'], g['city'], g['count']) for g in groups] == [
+            ('sale', 'Mérida', 4), ('rent', 'Mérida', 2), ('sale', 'Puebla', 2)]
+
+        merida = self.group(groups, operation='sale', city='Mérida')
+        prices = np.array([1_000_000, 2_000_000, 3_500_000, 8_000_000])
+        for name, q in analytics.PERCENTILES.items():
+            assert merida['price'][name] == pytest.approx(np.percentile(prices, q))
+        assert merida['price']['mean'] == pytest.approx(prices.mean())
+        assert (merida['price']['min'], merida['price']['max']) == (1_000_000, 8_000_000)
+        assert merida['price_per_m2']['median'] == pytest.approx(np.median(
+            [10_000, 2_000_000 / 150, 17_500, 20_000]))
+        histogram = merida['price']['histogram']
+        counts, edges = np.histogram(prices, bins=analytics.HISTOGRAM_BINS)
+        assert histogram['counts'] == counts.tolist()
+        assert histogram['edges'] == pytest.approx(edges.tolist())
+
+        # Sin superficie no entra al precio por m²
+        puebla = self.group(groups, operation='sale', city='Puebla')
+        assert puebla['price_per_m2']['mean'] == pytest.approx(2_500_000 / 120)
+        assert benchmark.price_stats_mismatches(
+            benchmark.naive_price_stats('city'), groups) == []
+
+    def test_recomputes_only_touched_groups(self, catalog, agent_user, django_assert_num_queries):
+        current = analytics.get_analytics()
+        results = current.refresh()
+        untouched = results['city,property_type']
+        rent = dict(untouched)
+        with django_assert_num_queries(1):
+            current.refresh()
+
+        catalog[0].price = 1_200_000
+        catalog[0].save()
+        self.create(agent_user, 900_000, city='Cancún')
+        with django_assert_num_queries(2):
+            results = current.refresh()
+        by_key = {(g['operation'], g['city'], g['property_type']): g
+                  for g in results['city,property_type'].values()}
+        assert by_key[('sale', 'Cancún', 'house')]['count'] == 1
+        assert by_key[('sale', 'Mérida', 'house')]['price']['min'] == 1_200_000
+        # Los grupos que no se tocaron son los mismos objetos
+        for code, group in rent.items():
+            if group['operation'] == 'rent':
+                assert results['city,property_type'][code] is group
+
+        catalog[-1].status = 'sold'
+        catalog[-1].save()
+        assert current.query(operation='rent')[0]['count'] == 1
+        # No disponible: fuera, como en el listado público
+        catalog[-2].is_available = False
+        catalog[-2].save()
+        assert current.query(operation='rent') == []
+        catalog[-2].is_available = True
+        catalog[-2].save()
+        assert current.query(operation='rent')[0]['count'] == 1
+
+        # Las bajas no aparecen entre las filas cambiadas: snapshot completo
+        catalog[1].delete()
+        snapshot = current.snapshot
+        assert self.group(current.query(['city']), operation='sale', city='Mérida')['count'] == 3
+        assert current.snapshot is not snapshot
+        for level in analytics.LEVELS:
+            assert benchmark.price_stats_mismatches(
+                benchmark.naive_price_stats(level), current.results[level].values()) == []
+
+    def test_endpoint(self, api_client, catalog, query_budget):
+        response = api_client.get('/api/properties/analytics/')
+        assert response.status_code == status.HTTP_200_OK
+        assert [(g['operation'], g['count']) for g in response.data['groups']] == [
+            ('sale', 6), ('rent', 2)]
+        assert response.data['bins'] == analytics.HISTOGRAM_BINS
+
+        response = api_client.get('/api/properties/analytics/',
+                                  {'group_by': 'property_type', 'operation': 'sale'})
+        assert [(g['property_type'], g['count']) for g in response.data['groups']] == [
+            ('house', 4), ('apartment', 2)]
+        response = api_client.get('/api/properties/analytics/', {'city': 'Puebla'})
+        assert [(g['operation'], g['city']) for g in response.data['groups']] == [
+            ('sale', 'Puebla')]
+        response = api_client.get('/api/properties/analytics/', {
+            'group_by': 'city,property_type', 'city': 'Oaxaca'})
+        assert response.data['groups'] == []
+        assert [profile.queries for profile in query_budget] == [2, 1, 1, 1]
+
+        assert api_client.get('/api/properties/analytics/',
+                              {'group_by': 'agent'}).status_code == 400
+
+    def test_benchmark_command(self, capsys):
+        call_command('benchmark_analytics', size='30', repeat=2, changes=3)
+        out = capsys.readouterr().out
+        for name in ('naive', 'cold', 'incremental', 'warm'):
+            assert name in out
+        assert 'distintos: 0' in out
+        assert not Property.objects.exists()
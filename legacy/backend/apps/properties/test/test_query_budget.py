@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from apps.common import querybudget
+from apps.properties.models import Property
+from apps.properties.views import PropertyViewSet
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    @pytest.fixture
+    def properties(self, user):
+        return [
+            Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000, operation='sale',
+                address='Test', city='Test', area=100, agent=user, status='published',
+            )
+            for i in range(3)
+        ]
+
+    def test_requests_are_tagged_by_action(self, api_client, properties, query_budget):
+        api_client.get('/api/properties/')
+        api_client.get(f'/api/properties/{properties[0].slug}/')
+        api_client.get('/api/categories/all/')
+
+        assert [profile.tag for profile in query_budget] == [
+            'property.list', 'property.retrieve', 'category.all',
+        ]
+        listing = query_budget[0].as_dict()
+        assert listing['status'] == 200
+        assert listing['queries'] == query_budget[0].queries > 0
+        assert listing['repeated'] == 0
+        assert listing['db_ms'] >= 0 and listing['non_db_ms'] >= 0
+
+    def test_exceeding_budget_is_reported(self, api_client, properties, query_budget,
+                                          monkeypatch, caplog):
+        monkeypatch.setattr(PropertyViewSet, 'query_budget', {'list': {'queries': 1}})
+
+        with caplog.at_level(logging.WARNING, logger='apps.querybudget'):
+            api_client.get('/api/properties/')
+
+        profile = query_budget[-1]
+        assert profile.violations() == {'queries': (profile.queries, 1)}
+        assert 'property.list' in caplog.text
+        query_budget.clear()  # el exceso es intencional: que el fixture no falle
+
+    def test_async_middleware_measures_request(self, rf, properties, query_budget):
+        async def view(request):
+            await sync_to_async(lambda: list(Property.objects.all()))()
+            return HttpResponse()
+
+        middleware = querybudget.QueryBudgetMiddleware(view)
+        assert iscoroutinefunction(middleware)
+        response = async_to_sync(middleware)(rf.get('/api/async/properties/'))
+
+        assert response.status_code == 200
+        assert [profile.queries for profile in query_budget] == [1]
+
+    def test_repeated_statements_count_against_budget(self):
+        profile = querybudget.RequestProfile('/api/test/', keep_sql=True)
+        profile.budget = {'queries': 10, 'repeated': 0}
+        execute = lambda sql, params, many, context: None
+        for _ in range(3):
+            profile(execute, 'SELECT 1 WHERE id = %s', [1], False, {})
+
+        assert profile.repeated == 2
+        assert profile.violations() == {'repeated': (2, 0)}
+        assert profile.repeated_statements() == {'SELECT 1 WHERE id = %s': 3}
+
+    def test_sampled_requests_are_logged(self, api_client, settings, caplog):
+        settings.QUERY_BUDGET = {'SAMPLE_RATE': 1.0}
+
+        with caplog.at_level(logging.INFO, logger='apps.querybudget'):
+            api_client.get('/api/categories/')
+
+        assert 'tag=category.list' in caplog.text
@@ -0,0 +1,84 @@
+import pytest
+from rest_framework import status
+from apps.categories.models import Category, Tag
+from apps.properties.models import Property
+from apps.properties.search import normalize, stem
+from apps.users.models import User
+
+
+def test_normalize_folds_accents():
+    assert normalize('Jardín Ñuñoa ÁTICO') == 'jardin nunoa atico'
+
+
+def test_stem_matches_singular_and_plural():
+    assert stem('casa') == stem('casas')
+    assert stem('jardin') == stem('jardines')
+    assert stem('departamento') == stem('departamentos')
+
+
+@pytest.mark.django_db
+class TestPropertySearch:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    def make_property(self, agent, **kwargs):
+        data = dict(
+            description='Test',
+            price=100000,
+            operation='sale',
+            address='Test 123',
+            city='Guadalajara',
+            area=100,
+            agent=agent,
+            status='published',
+        )
+        data.update(kwargs)
+        return Property.objects.create(**data)
+
+    def search(self, api_client, term):
+        response = api_client.get('/api/properties/', {'search': term})
+        assert response.status_code == status.HTTP_200_OK
+        return [item['slug'] for item in response.data['results']]
+
+    def test_search_is_accent_insensitive_and_stemmed(self, api_client, agent_user):
+        self.make_property(agent_user, title='Casa con jardín')
+        self.make_property(agent_user, title='Oficina céntrica')
+
+        assert self.search(api_client, 'jardines') == ['casa-con-jardin']
+        assert self.search(api_client, 'CENTRICA') == ['oficina-centrica']
+
+    def test_title_matches_rank_above_description(self, api_client, agent_user):
+        self.make_property(agent_user, title='Departamento amplio',
+                           description='Cerca de la alberca')
+        self.make_property(agent_user, title='Casa con alberca')
+
+        assert self.search(api_client, 'alberca') == [
+            'casa-con-alberca', 'departamento-amplio',
+        ]
+
+    def test_index_follows_tags_and_category(self, api_client, agent_user):
+        prop = self.make_property(agent_user, title='Casa familiar')
+        assert self.search(api_client, 'piscina') == []
+
+        prop.tags.add(Tag.objects.create(name='Piscina'))
+        assert self.search(api_client, 'piscina') == ['casa-familiar']
+
+        category = Category.objects.create(name='Residencial')
+        prop.category = category
+        prop.save()
+        category.name = 'Campestre'
+        category.save()
+        assert self.search(api_client, 'campestre') == ['casa-familiar']
+        assert self.search(api_client, 'residencial') == []
+
+    def test_drafts_are_not_searchable_anonymously(self, api_client, agent_user):
+        self.make_property(agent_user, title='Casa borrador', status='draft')
+
+        assert self.search(api_client, 'borrador') == []
@@ -0,0 +1,111 @@
+import warnings
+
+import pytest
+from rest_framework import status
+from apps.categories.models import Tag
+from apps.properties import similar
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestSimilarProperties:
+
+    @pytest.fixture(autouse=True)
+    def index(self):
+        similar.reset()
+        yield
+        similar.reset()
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def alberca(self):
+        return Tag.objects.create(name='Alberca')
+
+    def create(self, agent, title, price, area, rooms, operation='sale',
+               gps_location='21.0, -89.6', tags=(), **extra):
+        prop = Property.objects.create(
+            title=title, description='Test', price=price, operation=operation,
+            address='Test', city='Mérida', area=area, rooms=rooms, agent=agent,
+            status='published', gps_location=gps_location, **extra,
+        )
+        prop.tags.set(tags)
+        return prop
+
+    @pytest.fixture
+    def catalog(self, agent_user, alberca):
+        return {
+            'casa': self.create(agent_user, 'Casa', 2_000_000, 150, 3, tags=[alberca]),
+            'gemela': self.create(agent_user, 'Gemela', 2_100_000, 155, 3, tags=[alberca]),
+            'sin_alberca': self.create(agent_user, 'Sin alberca', 2_000_000, 150, 3),
+            'mansion': self.create(agent_user, 'Mansión', 20_000_000, 900, 8),
+            'renta': self.create(agent_user, 'Renta', 2_000_000, 150, 3, operation='rent',
+                                 tags=[alberca]),
+            'lejos': self.create(agent_user, 'Lejos', 2_000_000, 150, 3,
+                                 gps_location='32.5, -117.0', tags=[alberca]),
+            'borrador': self.create(agent_user, 'Borrador', 2_000_000, 150, 3,
+                                    tags=[alberca], is_available=False),
+        }
+
+    def ids(self, response):
+        assert response.status_code == status.HTTP_200_OK
+        return [item['id'] for item in response.data]
+
+    def test_ranks_by_feature_distance(self, api_client, catalog):
+        response = api_client.get(f"/api/properties/{catalog['casa'].slug}/similar/")
+
+        ranked = self.ids(response)
+        assert ranked[:2] == [catalog['gemela'].pk, catalog['sin_alberca'].pk]
+        assert ranked.index(catalog['mansion'].pk) > ranked.index(catalog['lejos'].pk)
+        assert catalog['casa'].pk not in ranked
+        assert catalog['borrador'].pk not in ranked
+        assert len(self.ids(api_client.get(
+            f"/api/properties/{catalog['casa'].slug}/similar/", {'limit': 2}))) == 2
+
+    def test_batches_match_single_block(self, catalog):
+        index = similar.get_index()
+        expected = index.similar(catalog['casa'], [], 4)
+        index.batch_size = 2
+        assert index.similar(catalog['casa'], [], 4) == expected
+
+    def test_empty_columns_do_not_warn(self, catalog):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')  # land_area no tiene ningún valor
+            index = similar.get_index()
+        assert len(index.similar(catalog['casa'], [], 3)) == 3
+
+    def test_index_follows_property_changes(self, api_client, catalog, agent_user, alberca):
+        url = f"/api/properties/{catalog['casa'].slug}/similar/"
+        self.ids(api_client.get(url))  # arma el índice
+        index = similar.get_index()
+        built_at = index.built_at
+
+        twin = self.create(agent_user, 'Otra gemela', 2_000_000, 150, 3, tags=[alberca])
+        assert self.ids(api_client.get(url))[0] == twin.pk
+
+        twin.status = 'sold'
+        twin.save()
+        catalog['gemela'].delete()
+        catalog['sin_alberca'].tags.add(alberca)
+        assert self.ids(api_client.get(url))[0] == catalog['sin_alberca'].pk
+        assert index.built_at == built_at  # sin rebuild
+        assert len(index) == 5
+
+    def test_unpublished_source_and_queries(self, api_client, catalog, agent_user, query_budget):
+        api_client.force_authenticate(user=agent_user)
+        response = api_client.get(f"/api/properties/{catalog['borrador'].slug}/similar/")
+        assert self.ids(response)[0] in {catalog['casa'].pk, catalog['gemela'].pk}
+        self.ids(api_client.get(f"/api/properties/{catalog['casa'].slug}/similar/"))
+
+        assert [profile.queries for profile in query_budget] == [6, 4]
+        api_client.force_authenticate(user=None)
+        assert api_client.get(
+            f"/api/properties/{catalog['borrador'].slug}/similar/").status_code == 404
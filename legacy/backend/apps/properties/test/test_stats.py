@@ -0,0 +1,102 @@
+import pytest
+from rest_framework import status
+from apps.inquiries.models import Inquiry
+from apps.properties import stats
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestStatsRollups:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    def make_property(self, agent, **kwargs):
+        data = dict(
+            title='Casa',
+            description='Test',
+            price=100000,
+            operation='sale',
+            address='Test 123',
+            city='Monterrey',
+            area=100,
+            agent=agent,
+            status='published',
+        )
+        data.update(kwargs)
+        return Property.objects.create(**data)
+
+    def test_rollups_follow_create_update_delete(self, agent_user):
+        cheap = self.make_property(agent_user, price=100000)
+        self.make_property(agent_user, price=300000, city='Puebla', operation='rent')
+        expensive = self.make_property(agent_user, price=500000)
+        self.make_property(agent_user, price=900000, status='draft')
+
+        expensive.price = 200000
+        expensive.save()
+        cheap.delete()
+
+        data = stats.read_stats()
+        assert data['total'] == 2
+        assert data['for_sale'] == 1
+        assert data['for_rent'] == 1
+        assert data['min_price'] == 200000
+        assert data['max_price'] == 300000
+        assert data['avg_price'] == 250000
+        assert stats.check() == []
+
+    def test_unpublishing_leaves_groups(self, agent_user):
+        prop = self.make_property(agent_user, city='Puebla')
+        prop.status = 'sold'
+        prop.save()
+
+        assert stats.read_stats()['cities'] == []
+        assert stats.check() == []
+
+    def test_rebuild_matches_live_aggregates(self, agent_user):
+        for i in range(6):
+            self.make_property(agent_user, price=100000 * (i + 1), city=f'Ciudad {i % 3}')
+        Property.objects.update(price=1)  # sin signals: los rollups quedan viejos
+        assert stats.check() != []
+
+        stats.rebuild()
+        assert stats.check() == []
+        assert stats.read_stats()['max_price'] == 1
+
+    def test_stats_endpoint_uses_constant_queries(self, api_client, agent_user,
+                                                  django_assert_num_queries):
+        for i in range(10):
+            self.make_property(agent_user, city=f'Ciudad {i}')
+
+        with django_assert_num_queries(2):
+            response = api_client.get('/api/properties/stats/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total'] == 10
+        assert len(response.data['cities']) == 5
+
+    def test_inquiry_stats_follow_status_changes(self, api_client, agent_user):
+        prop = self.make_property(agent_user)
+        inquiries = [
+            Inquiry.objects.create(property=prop, client_email=f'c{i}@test.com',
+                                   message='Hola')
+            for i in range(3)
+        ]
+        inquiries[0].mark_as_contacted()
+        inquiries[1].delete()
+
+        api_client.force_authenticate(user=agent_user)
+        response = api_client.get('/api/inquiries/stats/')
+        assert response.data['total'] == 2
+        assert response.data['new'] == 1
+        assert response.data['contacted'] == 1
+        assert response.data['by_status'] == [
+            {'status': 'new', 'count': 1},
+            {'status': 'contacted', 'count': 1},
+        ]
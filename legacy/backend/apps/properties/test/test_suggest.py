@@ -0,0 +1,104 @@
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from apps.categories.models import Category, Tag
+from apps.properties import suggest
+from apps.properties.models import Property
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestSuggestions:
+
+    @pytest.fixture(autouse=True)
+    def index(self):
+        suggest.reset()
+        yield
+        suggest.reset()
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    def create(self, agent, title, city='Mérida', state='Yucatán', tags=(), **extra):
+        extra.setdefault('status', 'published')
+        prop = Property.objects.create(
+            title=title, description='Test', price=1_000_000, operation='sale',
+            address='Test', city=city, state=state, area=100, agent=agent, **extra,
+        )
+        prop.tags.set(tags)
+        return prop
+
+    @pytest.fixture
+    def catalog(self, agent_user):
+        jardin = Tag.objects.create(name='Jardín')
+        residencial = Category.objects.create(name='Residencial')
+        return [
+            self.create(agent_user, 'Casa con jardín', tags=[jardin], category=residencial),
+            self.create(agent_user, 'Departamento céntrico'),
+            self.create(agent_user, 'Casa en Metepec', city='Metepec', state='Estado de México'),
+            self.create(agent_user, 'Mansión en Mérida', status='draft'),
+        ]
+
+    def suggestions(self, api_client, q, **params):
+        response = api_client.get('/api/properties/suggest/', {'q': q, **params})
+        assert response.status_code == status.HTTP_200_OK
+        return [(item['kind'], item['text'], item['count']) for item in response.data]
+
+    def test_prefix_accent_insensitive_by_weight(self, api_client, catalog):
+        assert self.suggestions(api_client, 'me') == [
+            ('city', 'Mérida', 2), ('city', 'Metepec', 1), ('state', 'Estado de México', 1),
+            ('title', 'Casa en Metepec', 1)]
+        # Cualquier palabra del texto, sin acentos ni mayúsculas
+        assert self.suggestions(api_client, 'JARD') == [
+            ('tag', 'Jardín', 1), ('title', 'Casa con jardín', 1)]
+        assert self.suggestions(api_client, 'estado de') == [
+            ('state', 'Estado de México', 1)]
+        assert self.suggestions(api_client, 'resi') == [('category', 'Residencial', 1)]
+        assert self.suggestions(api_client, 'mansion') == []
+        assert self.suggestions(api_client, '  ') == []
+        assert len(self.suggestions(api_client, 'c', limit=2)) == 2
+        assert api_client.get('/api/properties/suggest/',
+                              {'q': 'c', 'limit': 'x'}).status_code == 400
+
+    def test_index_follows_changes(self, api_client, catalog, agent_user):
+        self.suggestions(api_client, 'me')  # arma el índice
+        index = suggest.get_index()
+        built_at = index.built_at
+
+        catalog[3].status = 'published'
+        catalog[3].save()
+        catalog[1].city = 'Progreso'
+        catalog[1].save()
+        catalog[2].delete()
+        catalog[0].tags.clear()
+        self.create(agent_user, 'Terreno en Mérida', tags=[Tag.objects.create(name='Mar')])
+        assert self.suggestions(api_client, 'me') == [
+            ('city', 'Mérida', 3), ('title', 'Mansión en Mérida', 1),
+            ('title', 'Terreno en Mérida', 1)]
+        assert self.suggestions(api_client, 'prog') == [('city', 'Progreso', 1)]
+        assert self.suggestions(api_client, 'jardin') == [('title', 'Casa con jardín', 1)]
+        assert self.suggestions(api_client, 'mar') == [('tag', 'Mar', 1)]
+        assert index.built_at == built_at  # sin rebuild
+
+        Tag.objects.filter(name='Mar').update(name='Playa')
+        Tag.objects.get(name='Playa').save()
+        assert index.built_at is None
+        assert self.suggestions(api_client, 'pla') == [('tag', 'Playa', 1)]
+
+    def test_queries(self, api_client, catalog, query_budget):
+        self.suggestions(api_client, 'me')
+        self.suggestions(api_client, 'ca')
+        assert [profile.queries for profile in query_budget] == [2, 0]
+
+    def test_benchmark_command(self, capsys):
+        call_command('benchmark_suggest', size='30', repeat=5, target=1000)
+        out = capsys.readouterr().out
+        for name in ('rebuild', 'índice[1]', 'like[3]', 'endpoint[3]'):
+            assert name in out
+        assert not Property.objects.exists()
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from apps.properties import trending
+from apps.properties.models import (
+    Property, PropertyTrendingScore, PropertyViewBucket, TrendingRanking,
+)
+from apps.users.models import User
+
+
+@pytest.mark.django_db
+class TestTrending:
+
+    @pytest.fixture
+    def agent_user(self):
+        return User.objects.create_user(
+            username='agent1',
+            email='agent@test.com',
+            password='pass123',
+            role='agent'
+        )
+
+    @pytest.fixture
+    def properties(self, agent_user):
+        specs = [('sale', 'Mérida', 1000), ('sale', 'Puebla', 50), ('rent', 'Mérida', 0)]
+        return [
+            Property.objects.create(
+                title=f'Casa {i}', description='Test', price=1000, operation=operation,
+                address='Test', city=city, area=100, agent=agent_user, status='published',
+                views_count=views_count,
+            )
+            for i, (operation, city, views_count) in enumerate(specs)
+        ]
+
+    @pytest.fixture
+    def now(self):
+        return timezone.now().replace(minute=30, second=0, microsecond=0)
+
+    def test_flushes_accumulate_in_hourly_buckets(self, api_client, properties, view_counter, now):
+        api_client.get(f'/api/properties/{properties[0].slug}/', REMOTE_ADDR='10.0.0.1')
+        api_client.get(f'/api/properties/{properties[0].slug}/', REMOTE_ADDR='10.0.0.2')
+        view_counter.flush()
+        api_client.get(f'/api/properties/{properties[0].slug}/', REMOTE_ADDR='10.0.0.3')
+        view_counter.flush()
+
+        bucket = PropertyViewBucket.objects.get()
+        assert bucket.views == 3
+        assert bucket.hour == trending.bucket_hour(bucket.hour)
+
+        trending.record_views({properties[0].pk: 2}, now=now + timedelta(hours=1))
+        assert PropertyViewBucket.objects.filter(property=properties[0]).count() == 2
+
+    def test_recent_views_outrank_old_ones(self, properties, now):
+        old, recent, rent = properties
+        trending.record_views({old.pk: 40}, now=now - timedelta(days=3))
+        trending.record_views({recent.pk: 10, rent.pk: 1}, now=now)
+
+        assert trending.refresh(now=now) == (3, 8)
+        assert trending.ranking() == [recent.pk, old.pk, rent.pk]
+        assert trending.ranking('sale', '') == [recent.pk, old.pk]
+        assert trending.ranking('', 'Mérida') == [old.pk, rent.pk]
+        assert trending.ranking('rent', 'Mérida') == [rent.pk]
+        # 40 visitas hace 3 días y media hora (el bucket es de la hora en punto): ~5
+        score = PropertyTrendingScore.objects.get(property=old).score
+        assert score == pytest.approx(40 * 0.5 ** ((72 + 0.5) / 24))
+
+    def test_only_changed_buckets_are_processed(self, properties, now):
+        casa, otra, _ = properties
+        trending.record_views({casa.pk: 4}, now=now)
+        trending.refresh(now=now)
+        assert trending.refresh(now=now) == (0, 0)
+
+        # Un día después: el score guardado decae y se suma lo nuevo
+        later = now + timedelta(days=1)
+        trending.record_views({casa.pk: 1, otra.pk: 1}, now=later)
+        assert trending.refresh(now=later)[0] == 2
+        score = PropertyTrendingScore.objects.get(property=casa)
+        assert score.score == pytest.approx(4 * 0.5 ** ((24 + 0.5) / 24) + 0.5 ** (0.5 / 24))
+        assert score.scored_at == later
+
+        # Fuera de la retención se borran los buckets (ya sumados) y los scores mínimos
+        much_later = later + timedelta(days=30)
+        assert trending.refresh(now=much_later, force=True) == (0, 0)
+        assert not PropertyViewBucket.objects.exists()
+        assert not PropertyTrendingScore.objects.exists()
+
+    def test_endpoint_reads_ranking(self, api_client, properties, now):
+        old, recent, rent = properties
+        # Sin ranking: orden por views_count
+        assert [p['id'] for p in api_client.get('/api/properties/trending/').data] == [
+            old.pk, recent.pk, rent.pk]
+
+        trending.record_views({recent.pk: 10, rent.pk: 2}, now=now)
+        call_command('update_trending')
+        response = api_client.get('/api/properties/trending/')
+        assert response['X-Cache'] == 'MISS'
+        assert [p['id'] for p in response.data] == [recent.pk, rent.pk]
+        assert [p['id'] for p in api_client.get(
+            '/api/properties/trending/', {'operation': 'rent'}).data] == [rent.pk]
+        # En Mérida solo la de alquiler tiene visitas recientes
+        assert [p['id'] for p in api_client.get(
+            '/api/properties/trending/', {'city': 'Mérida'}).data] == [rent.pk]
+        assert TrendingRanking.objects.filter(city='Puebla', operation='sale').exists()
+
+        recent.status = 'draft'
+        recent.save()
+        assert [p['id'] for p in api_client.get('/api/properties/trending/').data] == [rent.pk]
@@ -0,0 +1,157 @@
+"""Trending con decaimiento a partir de visitas por hora.
+
+``ViewCounter.flush`` suma cada lote de visitas al bucket de su hora
+(``PropertyViewBucket``). ``refresh`` (``manage.py update_trending``, por
+cron cada pocos minutos) procesa solo los buckets que cambiaron desde la
+corrida anterior (``views > scored_views``) y mantiene por propiedad
+
+    score = Σ visitas · 0.5 ** (edad del bucket / HALF_LIFE_HOURS)
+
+guardado junto al instante al que está calculado (``PropertyTrendingScore``):
+decaer es multiplicar por el mismo factor a todas, así que solo se reescriben
+las propiedades con visitas nuevas. Con eso arma el top ``RANKING_SIZE`` de
+las publicadas por operación y ciudad (``TrendingRanking``; ``''`` = todas),
+que ``/properties/trending/`` lee directo.
+
+Los buckets de más de ``RETENTION_HOURS`` (ya sumados) se borran, y los
+scores que decayeron bajo ``MIN_SCORE`` también.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import PropertyTrendingScore, PropertyViewBucket, TrendingRanking
+
+# Enviada tras recalcular los rankings
+trending_refreshed = Signal()
+
+DEFAULTS = {
+    'HALF_LIFE_HOURS': 24,
+    'RETENTION_HOURS': 7 * 24,
+    'RANKING_SIZE': 50,
+    'MIN_SCORE': 0.01,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PROPERTY_TRENDING', {})}
+
+
+def bucket_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def decay(since, now, half_life_hours):
+    """Factor de decaimiento de ``since`` a ``now``."""
+    hours = max((now - since).total_seconds(), 0) / 3600
+    return 0.5 ** (hours / half_life_hours)
+
+
+def record_views(pending, now=None):
+    """Suma ``{property_id: visitas}`` a los buckets de la hora actual."""
+    hour = bucket_hour(now or timezone.now())
+    PropertyViewBucket.objects.bulk_create(
+        [PropertyViewBucket(property_id=pk, hour=hour) for pk in pending],
+        ignore_conflicts=True,
+    )
+    increment = Case(
+        *[When(property_id=pk, then=Value(amount)) for pk, amount in pending.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    PropertyViewBucket.objects.filter(hour=hour, property_id__in=pending).update(
+        views=F('views') + increment
+    )
+
+
+def ranking(operation='', city=''):
+    """Ids del top precalculado; ``None`` si no hay ranking para esa combinación."""
+    return (TrendingRanking.objects.filter(operation=operation, city=city)
+            .values_list('property_ids', flat=True).first())
+
+
+def build_rankings(now, config):
+    """``{(operation, city): [property_id, ...]}`` de las publicadas por score a ``now``.
+
+    Borra de paso los scores que ya decayeron bajo ``MIN_SCORE``.
+    """
+    rows = PropertyTrendingScore.objects.values_list(
+        'property_id', 'score', 'scored_at',
+        'property__status', 'property__is_available', 'property__operation', 'property__city',
+    )
+    scored, stale = [], []
+    for pk, score, scored_at, status, is_available, operation, city in rows:
+        score *= decay(scored_at, now, config['HALF_LIFE_HOURS'])
+        if score < config['MIN_SCORE']:
+            stale.append(pk)
+        elif status == 'published' and is_available:
+            scored.append((-score, pk, operation, city))
+    PropertyTrendingScore.objects.filter(property_id__in=stale).delete()
+
+    rankings = defaultdict(list)
+    for _, pk, operation, city in sorted(scored):
+        for key in (('', ''), (operation, ''), ('', city), (operation, city)):
+            if len(rankings[key]) < config['RANKING_SIZE']:
+                rankings[key].append(pk)
+    return rankings
+
+
+def refresh(now=None, force=False):
+    """Suma los buckets nuevos a los scores y rehace los rankings.
+
+    Sin visitas nuevas el orden relativo no cambia (todas decaen igual): solo
+    se rehacen con ``force``. Devuelve ``(buckets procesados, rankings)``.
+    """
+    config = get_config()
+    now = now or timezone.now()
+    with transaction.atomic():
+        changed = list(
+            PropertyViewBucket.objects.filter(views__gt=F('scored_views'))
+            .select_for_update(skip_locked=True).order_by('pk')
+        )
+        property_ids = {bucket.property_id for bucket in changed}
+        scores = {
+            score.property_id: score
+            for score in PropertyTrendingScore.objects.filter(property_id__in=property_ids)
+            .select_for_update()
+        }
+        for score in scores.values():
+            score.score *= decay(score.scored_at, now, config['HALF_LIFE_HOURS'])
+            score.scored_at = now
+        created = []
+        for bucket in changed:
+            score = scores.get(bucket.property_id)
+            if score is None:
+                score = scores[bucket.property_id] = PropertyTrendingScore(
+                    property_id=bucket.property_id, score=0, scored_at=now)
+                created.append(score)
+            score.score += ((bucket.views - bucket.scored_views)
+                            * decay(bucket.hour, now, config['HALF_LIFE_HOURS']))
+            bucket.scored_views = bucket.views
+
+        PropertyViewBucket.objects.bulk_update(changed, ['scored_views'])
+        PropertyTrendingScore.objects.bulk_create(created)
+        PropertyTrendingScore.objects.bulk_update(
+            [scores[pk] for pk in property_ids - {score.pk for score in created}],
+            ['score', 'scored_at'],
+        )
+        PropertyViewBucket.objects.filter(
+            hour__lt=now - timedelta(hours=config['RETENTION_HOURS']),
+            views=F('scored_views'),
+        ).delete()
+        if not changed and not force:
+            return 0, 0
+
+        rankings = build_rankings(now, config)
+        TrendingRanking.objects.all().delete()
+        TrendingRanking.objects.bulk_create([
+            TrendingRanking(operation=operation, city=city, property_ids=ids, computed_at=now)
+            for (operation, city), ids in rankings.items()
+        ])
+    trending_refreshed.send(sender=refresh)
+    return len(changed), len(rankings)
@@ -1,24 +1,42 @@
-from django.db import models
+import io
+
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg, Min, Max
+from django_filters.utils import translate_validation
+from django.db.models import Case, IntegerField, Q, Value, When
+from .cache import cached_feed
+from .conditional import conditional
+from .counters import client_key, get_view_counter
+from . import (
+    analytics, facets, geo, importer, similar, stats as property_stats, suggest, trending,
+)
 from .models import Property
+from .pagination import KeysetPagination
+from .filters import PropertyFilterSet
+from .geo import PropertyGeoFilter
+from .search import PropertySearchFilter
 from .serializers import (
     PropertyListSerializer,
     PropertyDetailSerializer,
     PropertyCreateUpdateSerializer,
 )
 from apps.inquiries.serializers import InquiryCreateSerializer
+from apps.users.authentication import get_full_user
+
+
+FEEDS = ('featured', 'for_sale', 'for_rent', 'trending', 'recent')
 
 
 class IsAgentOrAdmin(IsAuthenticatedOrReadOnly):
     """Solo agentes/admin pueden crear/editar propiedades."""
 
     def has_permission(self, request, view):
-        if view.action in ['create', 'update', 'partial_update', 'destroy']:
+        if view.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_import']:
             return (
                 request.user.is_authenticated
                 and request.user.role in ['agent', 'admin']
@@ -27,20 +45,55 @@ class IsAgentOrAdmin(IsAuthenticatedOrReadOnly):
 
     def has_object_permission(self, request, view, obj):
         if view.action in ['update', 'partial_update', 'destroy']:
-            return obj.agent == request.user or request.user.role == 'admin'
+            return obj.agent_id == request.user.pk or request.user.role == 'admin'
         return True
 
 
+def in_rank_order(queryset, ids):
+    """``queryset`` filtrado a ``ids``, en ese orden."""
+    if not ids:
+        return queryset.none()
+    rank = Case(*[When(pk=pk, then=Value(i)) for i, pk in enumerate(ids)],
+                output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(rank)
+
+
+def _is_admin(user):
+    return user.is_authenticated and user.role == 'admin'
+
+
 class PropertyViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAgentOrAdmin]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = [
-        'operation', 'property_type', 'category', 'rooms',
-        'bathrooms', 'is_featured', 'city', 'state',
+    pagination_class = KeysetPagination
+    filter_backends = [
+        DjangoFilterBackend, PropertySearchFilter, PropertyGeoFilter,
+        filters.OrderingFilter,
     ]
+    filterset_class = PropertyFilterSet
     search_fields = ['title', 'description', 'address', 'city']
-    ordering_fields = ['price', 'published_at', 'views_count', 'created_at', 'area']
+    ordering_fields = ['price', 'published_at', 'views_count', 'created_at', 'area',
+                       'inquiry_count', 'inquiries_new', 'inquiries_contacted',
+                       'inquiries_qualified', 'inquiries_closed']
     lookup_field = 'slug'
+    # Queries máximas por acción (ver apps.common.querybudget). bulk_import
+    # crece con la cantidad de chunks y no tiene tope fijo; nearest repite la
+    # búsqueda ampliando celdas (hasta NEAREST_START_PRECISION vueltas).
+    query_budget = {
+        'list': {'queries': 7, 'repeated': 0},
+        # El request que dispara el flush de visitas suma 3 (o 5 en una transacción)
+        'retrieve': {'queries': 8, 'repeated': 0},
+        'search': {'queries': 6, 'repeated': 0},
+        'nearest': 14,
+        # similar: 2 más cuando arma el índice del proceso
+        'similar': 6,
+        # suggest: 2 cuando arma el índice del proceso, 0 después
+        'suggest': 2,
+        'stats': 2,
+        # analytics: 1 con el snapshot al día, 2 más al aplicar cambios
+        'analytics': 3,
+        'featured': 4, 'for_sale': 4, 'for_rent': 4, 'trending': 4, 'recent': 4,
+        'inquire': 10,
+    }
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -60,64 +113,174 @@ class PropertyViewSet(viewsets.ModelViewSet):
             if user.role == 'admin':
                 return base_qs
             return base_qs.filter(
-                Q(status='published', is_available=True) | Q(agent=user)
+                Q(status='published', is_available=True) | Q(agent_id=user.pk)
             )
 
         # Usuarios anónimos/clientes solo ven publicadas
         return base_qs.filter(status='published', is_available=True)
 
-    def retrieve(self, request, *args, **kwargs):
+    @conditional()
+    @cached_feed(anonymous_only=True)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @conditional(detail=True)
+    def retrieve(self, request, *args, pending_views=None, **kwargs):
         instance = self.get_object()
-        # No incrementar views si es el propio agente
-        if not (request.user.is_authenticated and request.user == instance.agent):
-            Property.objects.filter(pk=instance.pk).update(
-                views_count=models.F('views_count') + 1
-            )
-            instance.refresh_from_db()
+        if pending_views is None:
+            pending_views = self.record_view(request, instance.pk, instance.agent_id)
+        # Persistido + pendiente de flush, sin volver a leer la fila
+        instance.views_count += pending_views
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @staticmethod
+    def record_view(request, property_id, agent_id):
+        """Cuenta la visita (una por cliente en la ventana); devuelve las pendientes de flush."""
+        counter = get_view_counter()
+        # No incrementar views si es el propio agente
+        if not (request.user.is_authenticated and request.user.pk == agent_id):
+            counter.record(property_id, client_key(request))
+        return counter.pending(property_id)
+
     def perform_create(self, serializer):
-        serializer.save(agent=self.request.user)
+        serializer.save(agent=get_full_user(self.request.user))
 
     # --- Custom actions ---
 
+    def get_feed_queryset(self):
+        """Queryset del feed curado de la acción actual (featured, for_sale...)."""
+        queryset = self.get_queryset()
+        if self.action == 'featured':
+            return queryset.filter(is_featured=True, status='published')[:6]
+        if self.action == 'for_sale':
+            return queryset.filter(operation='sale')[:10]
+        if self.action == 'for_rent':
+            return queryset.filter(operation='rent')[:10]
+        if self.action == 'trending':
+            return self.get_trending_queryset(queryset)
+        return queryset.order_by('-published_at')[:10]
+
+    def get_trending_queryset(self, queryset):
+        """Top 10 del ranking precalculado (``apps.properties.trending``).
+
+        Sin ranking para ``?operation=``/``?city=`` (el job no corrió o no hay
+        visitas recientes) cae al orden por ``views_count``.
+        """
+        params = {key: self.request.query_params.get(key, '') for key in ('operation', 'city')}
+        ids = trending.ranking(**params)
+        if ids is None:
+            filters = {key: value for key, value in params.items() if value}
+            return queryset.filter(**filters).order_by('-views_count')[:10]
+        return in_rank_order(queryset, ids)[:10]
+
+    def feed_response(self, properties):
+        serializer = PropertyListSerializer(properties, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
+    @conditional()
+    @cached_feed()
     def featured(self, request):
         """Propiedades destacadas."""
-        featured = self.get_queryset().filter(
-            is_featured=True, status='published'
-        )[:6]
-        serializer = PropertyListSerializer(featured, many=True)
-        return Response(serializer.data)
+        return self.feed_response(self.get_feed_queryset())
 
     @action(detail=False, methods=['get'])
+    @conditional()
+    @cached_feed()
     def for_sale(self, request):
-        properties = self.get_queryset().filter(operation='sale')[:10]
-        serializer = PropertyListSerializer(properties, many=True)
-        return Response(serializer.data)
+        return self.feed_response(self.get_feed_queryset())
 
     @action(detail=False, methods=['get'])
+    @conditional()
+    @cached_feed()
     def for_rent(self, request):
-        properties = self.get_queryset().filter(operation='rent')[:10]
-        serializer = PropertyListSerializer(properties, many=True)
-        return Response(serializer.data)
+        return self.feed_response(self.get_feed_queryset())
 
     @action(detail=False, methods=['get'])
+    @conditional()
+    @cached_feed()
     def trending(self, request):
-        trending = self.get_queryset().order_by('-views_count')[:10]
-        serializer = PropertyListSerializer(trending, many=True)
-        return Response(serializer.data)
+        return self.feed_response(self.get_feed_queryset())
 
     @action(detail=False, methods=['get'])
+    @conditional()
+    @cached_feed()
     def recent(self, request):
-        recent = self.get_queryset().order_by('-published_at')[:10]
-        serializer = PropertyListSerializer(recent, many=True)
+        return self.feed_response(self.get_feed_queryset())
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Página de resultados + conteos por faceta en una respuesta.
+
+        Acepta los mismos parámetros que el listado (filtros, rangos,
+        ?search=, ?within=/?near=, ?ordering=).
+        """
+        base = self.get_queryset()
+        for backend in (PropertySearchFilter, PropertyGeoFilter):
+            base = backend().filter_queryset(request, base, self)
+        filterset = PropertyFilterSet(request.query_params, queryset=base, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        results = filters.OrderingFilter().filter_queryset(request, filterset.qs, self)
+        page = self.paginate_queryset(results)
+        serializer = PropertyListSerializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = facets.facet_counts(base, request.query_params)
+        return response
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, slug=None):
+        """Las N publicadas más parecidas (limit <= 20), de ``apps.properties.similar``."""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 6)), 1), 20)
+        except ValueError:
+            return Response({'detail': 'limit debe ser un entero'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        instance = self.get_object()
+        tag_ids = [tag.pk for tag in instance.tags.all()]
+        ids = similar.get_index().similar(instance, tag_ids, limit)
+        properties = in_rank_order(self.get_queryset(), ids)
+        return Response(PropertyListSerializer(properties, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Sugerencias para ?q= (limit <= MAX_LIMIT), de ``apps.properties.suggest``."""
+        config = suggest.get_config()
+        try:
+            limit = min(max(int(request.query_params.get('limit', config['LIMIT'])), 1),
+                        config['MAX_LIMIT'])
+        except ValueError:
+            return Response({'detail': 'limit debe ser un entero'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        query = request.query_params.get('q', '')
+        if not suggest.normalize_query(query):
+            return Response([])
+        return Response(suggest.get_index().suggest(query, limit))
+
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """Las N propiedades más cercanas a ?lat=&lng= (limit <= 50)."""
+        try:
+            lat, lng = geo.parse_point(
+                f"{request.query_params['lat']},{request.query_params['lng']}"
+            )
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except (KeyError, ValueError, DjangoValidationError):
+            return Response(
+                {'detail': 'Parámetros requeridos: lat, lng (y limit opcional)'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        properties = geo.nearest(self.get_queryset(), lat, lng, max(limit, 1))
+        serializer = PropertyListSerializer(properties, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def inquire(self, request, slug=None):
-        """Crear consulta sobre propiedad."""
+        """Crear consulta sobre propiedad (ver ``apps.inquiries.queue``)."""
         property_obj = self.get_object()
         serializer = InquiryCreateSerializer(
             data=request.data,
@@ -125,29 +288,58 @@ class PropertyViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        # Encolada: la consulta y el aviso al agente los procesa el worker
         return Response(
             {'success': True, 'message': 'Consulta enviada correctamente'},
-            status=status.HTTP_201_CREATED,
+            status=status.HTTP_202_ACCEPTED,
         )
 
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """Importa un CSV/JSONL (campo ``file``) con upsert por external_ref.
+
+        Los agentes importan a su nombre; el admin indica ``agent`` por fila.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['Este campo es requerido.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or importer.detect_format(upload.name)
+        if fmt not in importer.FORMATS:
+            return Response({'format': [f'Formatos válidos: {", ".join(importer.FORMATS)}']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        agent = None if _is_admin(request.user) else get_full_user(request.user)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = importer.PropertyImporter(agent=agent).run(importer.read_rows(stream, fmt))
+        return Response(report)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Estadísticas de propiedades — optimizado en 2 queries."""
-        published = Property.objects.filter(status='published')
-
-        aggregates = published.aggregate(
-            total=Count('id'),
-            for_sale=Count('id', filter=Q(operation='sale')),
-            for_rent=Count('id', filter=Q(operation='rent')),
-            avg_price=Avg('price'),
-            min_price=Min('price'),
-            max_price=Max('price'),
-        )
+        """Estadísticas de propiedades desde los rollups (2 queries fijas).
 
-        cities = list(
-            published.values('city')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:5]
-        )
+        ``?check=1`` (solo admin) compara además contra los agregados en vivo.
+        """
+        data = property_stats.read_stats()
+        if request.query_params.get('check') and _is_admin(request.user):
+            data['check'] = {
+                'live': property_stats.live_stats(),
+                'differences': property_stats.check(),
+            }
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Distribución de precios por grupo (``apps.properties.analytics``).
 
-        return Response({**aggregates, 'cities': cities})
\ No newline at end of file
+        ``?group_by=city|property_type|city,property_type`` (siempre por
+        operación) y filtros ``?operation=&city=&property_type=``.
+        """
+        group_by = [dim for dim in request.query_params.get('group_by', '').split(',') if dim]
+        if not set(group_by) <= {'city', 'property_type'}:
+            return Response({'group_by': ['Valores válidos: city, property_type']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        selected = {dim: request.query_params[dim] for dim in analytics.DIMENSIONS
+                    if request.query_params.get(dim)}
+        groups = analytics.get_analytics().query(group_by, **selected)
+        return Response({'bins': analytics.HISTOGRAM_BINS, 'groups': groups})
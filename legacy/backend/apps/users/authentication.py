@@ -0,0 +1,198 @@
+"""JWT sin query de usuario por request.
+
+Los tokens llevan los claims de autorización (``CLAIMS``: rol y flags de
+staff) y ``ClaimsJWTAuthentication`` arma con ellos un ``Principal``:
+``pk``, ``role``, ``is_agent``/``is_admin`` salen del token, sin tocar la
+base. Donde hace falta el ``User`` completo (asignarlo a una FK, serializar
+el perfil) se pide con ``get_full_user``, que lo busca en ``UserCache``: LRU
+acotada por proceso con TTL (``JWT_PRINCIPAL``).
+
+Los claims vigentes de cada usuario se publican en el caché ``CLAIMS_CACHE``
+al emitir tokens y cuando cambia el rol, ``is_active`` o los flags de staff
+(``signals``), durante la vida de un access token: los tokens con claims
+distintos dan 401 y el refresh (``TokenRefreshSerializer``) emite claims
+nuevos desde el usuario. Solo un caché compartido entre workers (Redis,
+Memcached) es confiable: si es local del proceso o le falta la clave
+(expiró o se desalojó) el token se verifica contra el ``User`` de
+``UserCache`` (activo y con los mismos claims), que como mucho tiene
+``USER_CACHE_TTL`` segundos de atraso en otros workers. Un token sin claims
+(emitido antes de este esquema) sigue autenticando con el ``User`` de la
+base.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+DEFAULTS = {
+    'USER_CACHE_SIZE': 1024,  # usuarios por proceso
+    'USER_CACHE_TTL': 60,  # segundos
+    'CLAIMS_CACHE': 'default',
+    # None: compartido salvo que el backend sea local del proceso
+    'CLAIMS_CACHE_SHARED': None,
+}
+CLAIMS = ('role', 'is_staff', 'is_superuser')
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'JWT_PRINCIPAL', {})}
+
+
+def user_claims(user):
+    return {claim: getattr(user, claim) for claim in CLAIMS}
+
+
+def add_claims(token, user):
+    token.payload.update(user_claims(user))
+    return token
+
+
+def _claims_key(user_id):
+    return f'auth:claims:{user_id}'
+
+
+def claims_cache():
+    return caches[get_config()['CLAIMS_CACHE']]
+
+
+def claims_cache_is_shared():
+    config = get_config()
+    if config['CLAIMS_CACHE_SHARED'] is not None:
+        return config['CLAIMS_CACHE_SHARED']
+    return settings.CACHES[config['CLAIMS_CACHE']]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def publish_claims(user_id, claims):
+    """Claims vigentes del usuario; los tokens con otros dejan de valer."""
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    claims_cache().set(_claims_key(user_id), claims, int(lifetime))
+
+
+def revoke(user):
+    """Tras un cambio de claims o ``is_active`` (``signals``)."""
+    get_user_cache().invalidate(user.pk)
+    claims = user_claims(user) if user.is_active else {'is_active': False}
+    publish_claims(user.pk, claims)
+
+
+class UserCache:
+    """``User`` activos por pk, los ``max_size`` más recientes por ``ttl`` segundos."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # pk -> (expira, user)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_config()
+        return cls(config['USER_CACHE_SIZE'], config['USER_CACHE_TTL'])
+
+    def get(self, pk):
+        """Copia del ``User`` (cada request puede modificar la suya); ``None`` si no está activo."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(pk)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(pk)
+                return copy.copy(entry[1])
+            self._entries.pop(pk, None)
+        user = User.objects.filter(pk=pk, is_active=True).first()
+        if user is None:
+            return None
+        with self._lock:
+            self._entries[pk] = (now + self.ttl, user)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy.copy(user)
+
+    def invalidate(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                _user_cache = UserCache.from_settings()
+    return _user_cache
+
+
+class Principal(TokenUser):
+    """Usuario autenticado armado solo con los claims del token."""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', 'client')
+
+    @property
+    def is_agent(self):
+        return self.role == 'agent'
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @cached_property
+    def user(self):
+        return get_user_cache().get(self.pk)
+
+
+def get_full_user(user):
+    """El ``User`` del modelo para ``request.user`` (``Principal`` o no)."""
+    if isinstance(user, Principal):
+        if user.user is None:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        return user.user
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no identifica al usuario')
+        current = claims_cache().get(_claims_key(user_id))
+        if current is not None and any(
+                validated_token.get(claim, True) != value for claim, value in current.items()):
+            raise InvalidToken('Los permisos del usuario cambiaron; renovar el token')
+        principal = Principal(validated_token)
+        if current is None or not claims_cache_is_shared():
+            # Sin claims confiables se verifica contra el User (queda en principal.user)
+            user = principal.user
+            if user is None:
+                raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+            if any(validated_token.get(claim) != value
+                   for claim, value in user_claims(user).items()):
+                raise InvalidToken('Los permisos del usuario cambiaron; renovar el token')
+        return principal
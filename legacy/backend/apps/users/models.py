@@ -8,9 +8,14 @@ class User(AbstractUser):
         ('client', 'Cliente'),
     ]
     
+    # Fuentes de derivados (apps.common.images)
+    image_sources = ('avatar',)
+
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='client')
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                      help_text='Derivados del avatar (apps.common.images)')
     website = models.URLField(blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     company = models.CharField(max_length=200, blank=True, null=True)
@@ -1,21 +1,53 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from dj_rest_auth.serializers import UserDetailsSerializer
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import add_claims, publish_claims, user_claims
 
 User = get_user_model()
 
 class UserSerializer(UserDetailsSerializer):
     role_display = serializers.CharField(source='get_role_display', read_only=True)
+    avatar_variants = serializers.JSONField(source='image_variants.avatar',
+                                            read_only=True, default=None)
     
     class Meta(UserDetailsSerializer.Meta):
         fields = UserDetailsSerializer.Meta.fields + (
-            'role', 'role_display', 'bio', 'avatar', 'website', 
+            'role', 'role_display', 'bio', 'avatar', 'avatar_variants', 'website', 
             'phone', 'company', 'created_at'
         )
         read_only_fields = ('created_at',)
 
 class AgentSerializer(serializers.ModelSerializer):
+    avatar_variants = serializers.JSONField(source='image_variants.avatar',
+                                            read_only=True, default=None)
+
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 
-                  'email', 'avatar', 'bio', 'phone', 'company']
\ No newline at end of file
+                  'email', 'avatar', 'avatar_variants', 'bio', 'phone', 'company']
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """Login: los tokens llevan los claims de autorización (``authentication.CLAIMS``)."""
+
+    @classmethod
+    def get_token(cls, user):
+        publish_claims(user.pk, user_claims(user))
+        return add_claims(super().get_token(user), user)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refresh con los claims actuales del usuario (si cambió el rol, el token nuevo ya lo trae)."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        # De la base, no de UserCache: una copia vieja en este worker
+        # reescribiría los claims que acaba de publicar revoke()
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        publish_claims(user.pk, user_claims(user))
+        return super().validate({**attrs, 'refresh': str(add_claims(refresh, user))})
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.common import images
+from . import authentication
+from .models import User
+
+AUTH_FIELDS = ('is_active', *authentication.CLAIMS)
+
+
+@receiver(pre_save, sender=User)
+def dedupe_avatar(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.dedupe_upload(instance.avatar, 'avatars')
+
+
+@receiver(pre_save, sender=User)
+def detect_auth_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Marca si cambió algo que va en los claims del token (o ``is_active``)."""
+    instance._auth_changed = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(AUTH_FIELDS):
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*AUTH_FIELDS).first()
+    instance._auth_changed = stored is not None and any(
+        stored[field] != getattr(instance, field) for field in AUTH_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def schedule_avatar_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.schedule(instance)
+
+
+@receiver(post_save, sender=User)
+def refresh_principal(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_auth_changed', False):
+        authentication.revoke(instance)
+    else:
+        authentication.get_user_cache().invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_principal(sender, instance, **kwargs):
+    authentication.get_user_cache().invalidate(instance.pk)
+    authentication.publish_claims(instance.pk, {'is_active': False})
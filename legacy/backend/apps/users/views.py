@@ -1,6 +1,8 @@
+from dj_rest_auth import views as rest_auth_views
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from .authentication import get_full_user
 from .models import User
 from .serializers import UserSerializer
 
@@ -11,7 +13,24 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj == request.user or request.user.role == 'admin'
+        return obj.pk == request.user.pk or request.user.role == 'admin'
+
+
+class FullUserMixin:
+    """Vistas de dj-rest-auth: usan ``request.user`` como ``User`` (no ``Principal``)."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            request.user = get_full_user(request.user)
+
+
+class UserDetailsView(FullUserMixin, rest_auth_views.UserDetailsView):
+    pass
+
+
+class PasswordChangeView(FullUserMixin, rest_auth_views.PasswordChangeView):
+    pass
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -31,5 +50,5 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
         """Perfil del usuario autenticado."""
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(get_full_user(request.user))
         return Response(serializer.data)
\ No newline at end of file
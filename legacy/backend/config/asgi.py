@@ -0,0 +1,21 @@
+"""
+ASGI config del proyecto.
+
+Necesario para las vistas async (``/api/async/...``); el resto de la API
+funciona igual que con WSGI::
+
+    uvicorn config.asgi:application
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
+
+from apps.properties import similar, suggest  # noqa: E402
+
+similar.warm()
+suggest.warm()
@@ -1,6 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,11 +40,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.common.dbrouter.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.common.querybudget.QueryBudgetMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -70,6 +72,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database (Sección 1.2)
 DATABASES = {
@@ -80,9 +83,62 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='inmo_password'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Conexiones persistentes, verificadas antes de reusarse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+
+def _replica(entry):
+    """``host[:puerto][/base]``; lo que falte se toma de ``default``."""
+    location, _, name = entry.partition('/')
+    host, _, port = location.partition(':')
+    primary = DATABASES['default']
+    return {
+        **primary,
+        'HOST': host or primary['HOST'],
+        'PORT': port or primary['PORT'],
+        'NAME': name or primary['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+
+# Réplicas de lectura (apps/common/dbrouter.py): DB_REPLICAS=host1,host2:5433
+for _index, _entry in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{_index}'] = _replica(_entry)
+
+DATABASE_ROUTERS = ['apps.common.dbrouter.PrimaryReplicaRouter']
+DATABASE_REPLICAS = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'APPS': ['properties', 'categories', 'users'],
+    # Segundos que un cliente lee del primario después de escribir
+    'STICKY_SECONDS': config('DB_STICKY_SECONDS', default=5, cast=int),
+    'RETRY_SECONDS': 30,
+    # Marcas de escritura reciente: caché compartido entre workers
+    'CACHE': 'feeds',
+}
+
+# Cache
+# ``feeds``: respuestas de feeds/listados (apps/properties/cache.py), LRU
+# acotado. Con varios workers debe ser un backend compartido (Redis con
+# maxmemory-policy allkeys-lru) para que las invalidaciones lleguen a todos,
+# también las de procesos aparte (process_inquiries, update_trending,
+# import_properties); con LocMemCache el check properties.W001 avisa y una
+# página queda vieja hasta TIMEOUT segundos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'feeds': {
+        'BACKEND': config('FEEDS_CACHE_BACKEND',
+                          default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('FEEDS_CACHE_LOCATION', default='property-feeds'),
+        'TIMEOUT': config('FEEDS_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
 # Custom User Model (Sección 3.1)
 AUTH_USER_MODEL = 'users.User'
 
@@ -104,6 +160,9 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
     },
@@ -119,7 +178,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration (Sección 6.1)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -133,6 +192,47 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Presupuesto de queries por acción (apps/common/querybudget.py)
+QUERY_BUDGET = {
+    'ENABLED': True,
+    'SAMPLE_RATE': config('QUERY_BUDGET_SAMPLE_RATE', default=0.01, cast=float),
+}
+
+# Derivados de imágenes (apps/common/images.py): pool de procesos fuera del request
+IMAGE_DERIVATIVES = {
+    'ASYNC': config('IMAGE_DERIVATIVES_ASYNC', default=True, cast=bool),
+    'WORKERS': config('IMAGE_DERIVATIVES_WORKERS', default=2, cast=int),
+    # Hosts externos permitidos como fuente (las URLs de la galería las cargan agentes)
+    'ALLOWED_HOSTS': config('IMAGE_DERIVATIVES_ALLOWED_HOSTS', default='', cast=Csv()),
+}
+
+# Contador de visitas con buffer (apps/properties/counters.py)
+PROPERTY_VIEW_COUNTER = {
+    'STORE': 'apps.properties.counters.MemoryViewStore',
+    'FLUSH_INTERVAL': 30,  # segundos
+    'FLUSH_THRESHOLD': 100,  # visitas pendientes
+    'DEDUPE_WINDOW': 30 * 60,  # segundos
+}
+
+# Trending con decaimiento (apps/properties/trending.py); cron: manage.py update_trending
+PROPERTY_TRENDING = {
+    'HALF_LIFE_HOURS': 24,
+    'RETENTION_HOURS': 7 * 24,
+    'RANKING_SIZE': 50,
+}
+
+# Índice de similares en memoria (apps/properties/similar.py)
+SIMILAR_PROPERTIES = {
+    'WARM_ON_STARTUP': config('SIMILAR_WARM_ON_STARTUP', default=True, cast=bool),
+    'MAX_AGE': config('SIMILAR_MAX_AGE', default=600, cast=int),
+}
+
+# Índice de sugerencias del buscador (apps/properties/suggest.py)
+SUGGESTIONS = {
+    'WARM_ON_STARTUP': config('SUGGESTIONS_WARM_ON_STARTUP', default=True, cast=bool),
+    'MAX_AGE': config('SUGGESTIONS_MAX_AGE', default=600, cast=int),
+}
+
 # JWT Configuration (Sección 6.1)
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -140,6 +240,15 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.serializers.TokenRefreshSerializer',
+    'TOKEN_USER_CLASS': 'apps.users.authentication.Principal',
+}
+
+# Principal desde los claims del token (ver apps/users/authentication.py)
+JWT_PRINCIPAL = {
+    'USER_CACHE_SIZE': config('JWT_USER_CACHE_SIZE', default=1024, cast=int),
+    'USER_CACHE_TTL': config('JWT_USER_CACHE_TTL', default=60, cast=int),
 }
 
 # CORS Configuration (Sección 6.1)
@@ -159,6 +268,13 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
+# Cola de consultas (ver apps/inquiries/queue.py); worker: manage.py process_inquiries
+INQUIRY_QUEUE = {
+    'ASYNC': config('INQUIRY_QUEUE_ASYNC', default=True, cast=bool),
+    'DEDUPE_WINDOW': config('INQUIRY_DEDUPE_WINDOW', default=30 * 60, cast=int),
+    'DIGEST_INTERVAL': config('INQUIRY_DIGEST_INTERVAL', default=5 * 60, cast=int),
+}
+
 # Allauth Configuration
 SITE_ID = 1
 ACCOUNT_AUTHENTICATION_METHOD = 'username_email'
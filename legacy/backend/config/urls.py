@@ -7,6 +7,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
     TokenVerifyView,
 )
+from apps.users.views import PasswordChangeView, UserDetailsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,6 +16,9 @@ urlpatterns = [
     path('api/', include([
         # Properties
         path('properties/', include('apps.properties.urls')),
+
+        # Lectura async de propiedades (servir con ASGI: config/asgi.py)
+        path('async/properties/', include('apps.properties.async_urls')),
         
         # Categories
         path('categories/', include('apps.categories.urls')),
@@ -26,6 +30,10 @@ urlpatterns = [
         path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
         path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
         path('auth/verify/', TokenVerifyView.as_view(), name='token_verify'),
+        # Antes que dj_rest_auth.urls: necesitan el User completo
+        path('auth/user/', UserDetailsView.as_view(), name='rest_user_details'),
+        path('auth/password/change/', PasswordChangeView.as_view(),
+             name='rest_password_change'),
         path('auth/', include('dj_rest_auth.urls')),
         path('auth/registration/', include('dj_rest_auth.registration.urls')),
         
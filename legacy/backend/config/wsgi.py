@@ -0,0 +1,15 @@
+"""
+WSGI config del proyecto (``gunicorn config.wsgi:application``).
+"""
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_wsgi_application()
+
+from apps.properties import similar, suggest  # noqa: E402
+
+similar.warm()
+suggest.warm()
@@ -17,4 +17,58 @@ def user():
         username='testuser',
         email='test@test.com',
         password='pass123'
-    )
\ No newline at end of file
+    )
+
+@pytest.fixture(autouse=True)
+def view_counter():
+    from apps.properties.counters import get_view_counter
+    counter = get_view_counter()
+    counter.reset()
+    yield counter
+    counter.reset()
+
+
+@pytest.fixture(autouse=True)
+def feeds_cache():
+    from django.core.cache import caches
+    cache = caches['feeds']
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def user_cache():
+    # El rollback de cada test no pasa por los signals que invalidan
+    from django.core.cache import cache
+    from apps.users.authentication import get_user_cache
+    users = get_user_cache()
+    users.clear()
+    cache.clear()
+    yield users
+    users.clear()
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def query_budget():
+    """Falla el test si algún request excede el ``query_budget`` de su acción."""
+    from apps.common import querybudget
+    with querybudget.record() as profiles:
+        yield profiles
+    exceeded = [profile for profile in profiles if profile.violations()]
+    if exceeded:
+        lines = []
+        for profile in exceeded:
+            lines.append(f'{profile} exceeded={profile.violations()}')
+            lines += [f'    {count}x {sql}' for sql, count in profile.repeated_statements().items()]
+        pytest.fail('Presupuesto de queries excedido:\n' + '\n'.join(lines), pytrace=False)
+
+
+@pytest.fixture(autouse=True)
+def price_analytics():
+    # El snapshot del proceso no se entera del rollback de cada test
+    from apps.properties import analytics
+    analytics.reset()
+    yield
+    analytics.reset()